@@ -0,0 +1,101 @@
+"""
+Password authentication.
+
+Passwords are stored as bcrypt hashes in users.password_hash. The cost
+(log2 rounds) comes from MAGEN_BCRYPT_ROUNDS so slow till PCs can use a
+cheaper one; benchmarks/bench_login_cost.py shows what each cost takes.
+A successful login rehashes the password when its stored cost differs
+from the configured one, and turns a legacy plaintext row (users.password,
+from before hashing) into a hash, so costs and old rows converge as
+people sign in.
+
+Verification deliberately takes the full hash cost and holds no database
+lock while hashing; windows call authenticate() from a worker thread
+(qt_auth.py), never the Qt thread.
+"""
+import hmac
+import os
+
+import bcrypt
+
+from database import DB_FILE, connection, transaction
+
+BCRYPT_ROUNDS = int(os.environ.get("MAGEN_BCRYPT_ROUNDS", "12"))
+
+_dummy_hash = None
+
+
+def hash_password(password, rounds=None):
+    rounds = BCRYPT_ROUNDS if rounds is None else rounds
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def hash_rounds(password_hash):
+    """The cost stored in a '$2b$12$...' hash."""
+    return int(password_hash.split('$')[2])
+
+
+def check_password(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False  # not a bcrypt hash
+
+
+def _burn_hash_time(password):
+    # Unknown usernames cost as much as wrong passwords, so timing does not
+    # reveal which usernames exist.
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("not a password")
+    check_password(password, _dummy_hash)
+
+
+def authenticate(username, password, rounds=None, db_file=DB_FILE):
+    """
+    Returns {'id', 'username', 'role'} for valid credentials, else None.
+    Upgrades the stored hash on success when its cost is not `rounds`
+    (default BCRYPT_ROUNDS) or the row still holds a plaintext password.
+    """
+    rounds = BCRYPT_ROUNDS if rounds is None else rounds
+    with connection(db_file) as conn:
+        row = conn.execute(
+            "SELECT id, role, password, password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+    if row is None:
+        _burn_hash_time(password)
+        return None
+
+    user_id, role, plaintext, password_hash = row
+    if password_hash:
+        if not check_password(password, password_hash):
+            return None
+        upgrade = hash_rounds(password_hash) != rounds
+    else:
+        if not plaintext or not hmac.compare_digest(plaintext.encode('utf-8'), password.encode('utf-8')):
+            _burn_hash_time(password)
+            return None
+        upgrade = True
+
+    if upgrade:
+        new_hash = hash_password(password, rounds)
+        with transaction(db_file) as conn:
+            # Only if nobody changed the password meanwhile.
+            conn.execute(
+                "UPDATE users SET password_hash = ?, password = '' WHERE id = ? AND password_hash IS ?",
+                (new_hash, user_id, password_hash),
+            )
+    return {'id': user_id, 'username': username, 'role': role}
+
+
+def hash_legacy_passwords(conn, rounds=None):
+    """Hashes every plaintext password on `conn` and blanks it. Returns the number of users updated."""
+    rows = conn.execute(
+        "SELECT id, password FROM users WHERE password_hash IS NULL AND password <> ''"
+    ).fetchall()
+    for user_id, plaintext in rows:
+        conn.execute(
+            "UPDATE users SET password_hash = ?, password = '' WHERE id = ?",
+            (hash_password(plaintext, rounds), user_id),
+        )
+    return len(rows)
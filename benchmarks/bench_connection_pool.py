@@ -0,0 +1,86 @@
+"""
+Connection and commit overhead: per-call sqlite3.connect() with default
+settings (the old pattern) against the shared tuned pool in database.py.
+
+    python benchmarks/bench_connection_pool.py [iterations]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ConnectionPool
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product TEXT, quantity REAL, price REAL, total REAL, date TEXT
+    )
+"""
+ROW = ("PMS", 20.0, 180.0, 3600.0, "2024-01-01")
+
+
+def timed(label, iterations, fn):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed / iterations * 1e6:10.1f} us/op  ({iterations} ops)")
+    return elapsed
+
+
+def bench_legacy(db_file, iterations):
+    def read():
+        conn = sqlite3.connect(db_file)
+        conn.execute("SELECT quantity FROM sales WHERE id = 1").fetchone()
+        conn.close()
+
+    def write():
+        conn = sqlite3.connect(db_file)
+        conn.execute("INSERT INTO sales (product, quantity, price, total, date) VALUES (?, ?, ?, ?, ?)", ROW)
+        conn.commit()
+        conn.close()
+
+    return timed("legacy connect+read", iterations, read), timed("legacy connect+commit", iterations, write)
+
+
+def bench_pool(db_file, iterations):
+    pool = ConnectionPool(db_file)
+
+    def read():
+        with pool.connection() as conn:
+            conn.execute("SELECT quantity FROM sales WHERE id = 1").fetchone()
+
+    def write():
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO sales (product, quantity, price, total, date) VALUES (?, ?, ?, ?, ?)", ROW)
+
+    results = timed("pooled read", iterations, read), timed("pooled commit", iterations, write)
+    pool.close_all()
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+        for db_file in (legacy_db, pooled_db):
+            conn = sqlite3.connect(db_file)
+            conn.execute(SCHEMA)
+            conn.execute("INSERT INTO sales (product, quantity, price, total, date) VALUES (?, ?, ?, ?, ?)", ROW)
+            conn.commit()
+            conn.close()
+
+        legacy_read, legacy_write = bench_legacy(legacy_db, iterations)
+        pooled_read, pooled_write = bench_pool(pooled_db, iterations)
+
+    print(f"\nread speedup:   {legacy_read / pooled_read:6.1f}x")
+    print(f"commit speedup: {legacy_write / pooled_write:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Customer search as typed into the Customers window: the old
+`name LIKE '%kw%' OR phone LIKE '%kw%'` scan against the trigram FTS5
+index from search_index, for a few keystrokes of a name, a phone fragment
+and a search with no match.
+
+    python benchmarks/bench_customer_search.py [customers]
+
+Builds a throwaway database in a temporary directory.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db, get_pool
+from search_index import search_customers
+
+FIRST = ("Amina", "Brian", "Chebet", "David", "Esther", "Faith", "George", "Hassan", "Irene", "James")
+LAST = ("Otieno", "Wanjiru", "Kamau", "Mwangi", "Njoroge", "Achieng", "Kiprop", "Mutua", "Onyango", "Wambui")
+TOWNS = ("Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Thika", "Machakos", "Nyeri")
+
+OLD_SEARCH_SQL = "SELECT * FROM customers WHERE name LIKE ? OR phone LIKE ?"
+
+SEARCHES = ("Wan", "Wanj", "Wanjiru", "Wanjiru 4217", "0722 81", "Kisumu Mutua", "Zzyzx")
+
+
+def fill(conn, customers):
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO customers (name, phone, address) VALUES (?, ?, ?)",
+        (
+            (f"{FIRST[i % 10]} {LAST[i // 10 % 10]} {i}", f"07{i * 7919 % 100000000:08d}", TOWNS[i % 8])
+            for i in range(customers)
+        ),
+    )
+    conn.execute("COMMIT")
+
+
+def measure(label, fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {best * 1e3:8.2f} ms  {len(rows):4d} rows")
+
+
+def main(customers=100000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        init_db(db_file)
+        with get_pool(db_file).connection() as conn:
+            fill(conn, customers)
+            print(f"{customers} customers")
+            for text in SEARCHES:
+                measure(f"LIKE scan  {text!r}", lambda: conn.execute(OLD_SEARCH_SQL, (f"%{text}%",) * 2).fetchall())
+                measure(f"FTS5       {text!r}", lambda: search_customers(conn, text))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,57 @@
+"""
+Login latency at each bcrypt cost, to choose MAGEN_BCRYPT_ROUNDS for a
+till. Run it on the machine in question: for every cost it times hashing
+a password (adding a user, rehashing on login) and auth.authenticate()
+end to end against a throwaway database, which is what a cashier waits
+for after pressing Login.
+
+    python benchmarks/bench_login_cost.py [min_rounds] [max_rounds]
+
+Each step up doubles the time; pick the highest cost that keeps login
+comfortably under a second on the slowest till.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import authenticate, hash_password
+from database import init_db, transaction
+
+PASSWORD = "correct horse battery staple"
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(min_rounds=8, max_rounds=14):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        init_db(db_file)
+        print(f"{'cost':>4}  {'hash':>10}  {'login':>10}  {'failed login':>12}")
+        for rounds in range(min_rounds, max_rounds + 1):
+            # Fewer samples at high costs so the run stays short.
+            repeat = max(3, 2 ** (15 - rounds) // 8)
+            username = f"cost{rounds}"
+            with transaction(db_file) as conn:
+                conn.execute(
+                    "INSERT INTO users (username, password, password_hash, role) VALUES (?, '', ?, 'Cashier')",
+                    (username, hash_password(PASSWORD, rounds)),
+                )
+            hashing = timed(lambda: hash_password(PASSWORD, rounds), repeat)
+            login = timed(lambda: authenticate(username, PASSWORD, rounds, db_file), repeat)
+            failed = timed(lambda: authenticate(username, "wrong", rounds, db_file), repeat)
+            print(f"{rounds:>4}  {hashing * 1e3:8.1f} ms  {login * 1e3:8.1f} ms  {failed * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,54 @@
+"""
+Invoice rendering throughput with and without the pdf_generator template
+cache. "cold" clears the cache before every document, which is what every
+call used to pay (style sheets, table styles, header and a full logo
+decode); "warm" reuses one template per branch.
+
+    python benchmarks/bench_pdf_templates.py [documents]
+
+Run from the repository root so logo.png is found.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_generator
+
+SALE = {
+    'invoice_number': 1,
+    'delivery_note_number': 1,
+    'product': 'PMS',
+    'quantity': 20.0,
+    'price': 180.0,
+    'total': 3600.0,
+    'date': '2024-01-01',
+    'customer_name': 'Benchmark Customer',
+}
+
+
+def run(label, documents, out_dir, clear_each_time):
+    pdf_generator.clear_template_cache()
+    start = time.perf_counter()
+    for number in range(1, documents + 1):
+        if clear_each_time:
+            pdf_generator.clear_template_cache()
+        pdf_generator.generate_invoice_pdf_document(
+            number, SALE, os.path.join(out_dir, f"Invoice_{number}.pdf")
+        )
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {documents / elapsed:8.1f} documents/s  ({elapsed / documents * 1e3:.1f} ms each)")
+    return elapsed
+
+
+def main(documents=200):
+    with tempfile.TemporaryDirectory() as out_dir:
+        cold = run("cold (rebuilt per document)", documents, out_dir, clear_each_time=True)
+        warm = run("warm (cached template)", documents, out_dir, clear_each_time=False)
+    print(f"speed-up: {cold / warm:.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,142 @@
+"""
+Sales report loading: the old fetchall() + str() per cell (what filling a
+QTableWidget cost before any Qt objects were made) against keyset pages
+from report_queries, first page and a page deep in the report.
+
+Then a one-day range inside the whole history: its first and last pages
+in both directions, and, for comparison, the orders the reports no longer
+offer for a date range (ID, Product, Supplier), which can only read their
+indexes past the range or sort the range for every page.
+
+    python benchmarks/bench_report_paging.py [rows]
+
+Builds a throwaway database in a temporary directory.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import epoch_day, init_db, get_pool
+from report_queries import PAGE_SIZE, purchases_report, sales_report
+
+PRODUCTS = ("PMS", "AGO", "IK", "Gas")
+HISTORY_DAYS = 4 * 365
+
+
+def fill(conn, rows):
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO sale_lines (product, quantity, price, total, date, customer_name) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (PRODUCTS[i % 4], 10.0, 180.0, 1800.0, f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", f"Customer {i % 500}")
+            for i in range(rows)
+        ),
+    )
+    conn.execute("COMMIT")
+
+
+def fill_history(conn, rows):
+    """`rows` sales and purchases spread evenly over HISTORY_DAYS, in date order."""
+    first_day = epoch_day("2021-01-01")
+    day = lambda i: (date(1970, 1, 1) + timedelta(days=first_day + i * HISTORY_DAYS // rows)).isoformat()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO sale_lines (product, quantity, price, total, date, customer_name) VALUES (?, ?, ?, ?, ?, ?)",
+        ((PRODUCTS[i % 4], 10.0, 180.0, 1800.0, day(i), f"Customer {i % 500}") for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO purchases (product, quantity, unit_price, total, supplier, date) VALUES (?, ?, ?, ?, ?, ?)",
+        ((PRODUCTS[i % 4], 1000.0, 150.0, 150000.0, f"Supplier {i % 40}", day(i)) for i in range(rows)),
+    )
+    conn.execute("COMMIT")
+
+
+def last_page_key(conn, query):
+    """Key of the row one short page before the end of `query`, i.e. what the model passes for the last page."""
+    keys = query.key_expressions()
+    direction = " DESC" if query.descending else ""
+    sql = (
+        f"SELECT {', '.join(keys)} FROM {query.table} WHERE {query.where} "
+        f"ORDER BY {', '.join(key + direction for key in keys)} LIMIT 1 OFFSET ?"
+    )
+    count = conn.execute(query.count_sql(), query.params).fetchone()[0]
+    return conn.execute(sql, query.params + (max(count - PAGE_SIZE // 2, 0),)).fetchone()
+
+
+def unoffered_page(conn, query, keys, after_key):
+    """A keyset page of `query` ordered by `keys`, the way ReportQuery paged them before they were dropped."""
+    sql = (
+        f"SELECT {', '.join(expr for _, expr in query.columns)} FROM {query.table} "
+        f"WHERE +{query.range_column} BETWEEN ? AND ? AND ({', '.join(keys)}) > ({', '.join('?' * len(keys))}) "
+        f"ORDER BY {', '.join(keys)} LIMIT ?"
+    )
+    return conn.execute(sql, query.params + after_key + (PAGE_SIZE,)).fetchall()
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed * 1e3:9.2f} ms  peak {peak / 1e6:7.2f} MB")
+    return result
+
+
+def main(rows=200000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        init_db(db_file)
+        with get_pool(db_file).connection() as conn:
+            fill(conn, rows)
+            start_day, end_day = epoch_day("2024-01-01"), epoch_day("2024-12-31")
+            query = sales_report(start_day, end_day)
+
+            def fetch_all_cells():
+                data = conn.execute(query.page_sql(), query.params + (-1,)).fetchall()
+                return [[str(value) for value in row[:len(query.columns)]] for row in data]
+
+            def walk_to(page):
+                key = None
+                for _ in range(page):
+                    _, key = query.fetch_page(conn, key)
+                return key
+
+            measure(f"fetchall + str per cell ({rows} rows)", fetch_all_cells)
+            measure("first keyset page", lambda: query.fetch_page(conn))
+            deep_key = walk_to(rows // PAGE_SIZE // 2)
+            measure("keyset page half way down", lambda: query.fetch_page(conn, deep_key))
+            descending = query.sorted(5, descending=True)
+            measure("first page sorted by date desc", lambda: descending.fetch_page(conn))
+
+        history_file = os.path.join(tmp, "history.db")
+        init_db(history_file)
+        with get_pool(history_file).connection() as conn:
+            fill_history(conn, rows)
+            day = epoch_day("2022-06-15")
+            print(f"\none day inside {HISTORY_DAYS} days of history ({rows} sales and purchases)")
+            for label, report in (("sales", sales_report(day, day)), ("purchases", purchases_report(day, day))):
+                for descending in (False, True):
+                    query = report.sorted(report.sort_column, descending)
+                    order = "desc" if descending else "asc"
+                    measure(f"{label} first page, date {order}", lambda: query.fetch_page(conn))
+                    key = last_page_key(conn, query)
+                    measure(f"{label} last page, date {order}", lambda: query.fetch_page(conn, key))
+
+            sales, purchases = sales_report(day, day), purchases_report(day, day)
+            for label, query, keys, after_key in (
+                ("sales by ID", sales, ("id",), (0,)),
+                ("sales by product", sales, ("product", "sale_day", "id"), ("AGO", day, 0)),
+                ("purchases by supplier", purchases, ("supplier", "id"), ("Supplier 1", 0)),
+            ):
+                measure(f"not offered: {label}", lambda: unoffered_page(conn, query, keys, after_key))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
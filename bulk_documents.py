@@ -0,0 +1,274 @@
+"""
+Headless bulk regeneration of invoices, delivery notes and LPOs, e.g. for
+auditor reprints. Rows are streamed from SQLite and rendered in batches
+across a process pool. Finished files are appended to a journal in the
+output directory, so re-running the same command after an interruption
+picks up where it stopped.
+
+    python bulk_documents.py invoice --from 2024-01-01 --to 2024-01-31
+    python bulk_documents.py delivery_note --ids 12 13 14
+    python bulk_documents.py lpo --out reprints/lpos --workers 4
+
+Does not import PyQt5.
+"""
+import argparse
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from database import DB_FILE, PRAGMAS, configure_connection, epoch_day
+from document_service import DELIVERY_NOTE, INVOICE, LPO, LPO_BRANCH_INFO, render_batch
+
+BATCH_SIZE = 25
+FETCH_SIZE = 500
+
+# One row per sale line, grouped back into one document per sale header.
+SALES_SQL = """
+    SELECT h.id, h.invoice_number, h.delivery_note_number, h.total, h.date, h.customer_name,
+           l.id, l.product, l.quantity, l.price, l.total
+    FROM sale_headers h
+    JOIN sale_lines l ON l.header_id = h.id
+    WHERE h.{number_column} IS NOT NULL {filters}
+    ORDER BY h.id, l.id
+"""
+
+SALES_COUNT_SQL = """
+    SELECT COUNT(*) FROM sale_headers h
+    WHERE h.{number_column} IS NOT NULL {filters}
+"""
+
+PURCHASES_SQL = """
+    SELECT id, lpo_path, product, quantity, unit_price, total, supplier, date
+    FROM purchases
+    WHERE 1 = 1 {filters}
+    ORDER BY id
+"""
+
+
+def open_read_only(db_file):
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    return configure_connection(conn, {k: v for k, v in PRAGMAS.items() if k != "journal_mode"})
+
+
+def build_filters(day_column, args, id_column="id"):
+    filters, params = [], []
+    if args.date_from:
+        filters.append(f"{day_column} >= ?")
+        params.append(epoch_day(args.date_from))
+    if args.date_to:
+        filters.append(f"{day_column} <= ?")
+        params.append(epoch_day(args.date_to))
+    if args.ids:
+        filters.append(f"{id_column} IN ({', '.join('?' * len(args.ids))})")
+        params.extend(args.ids)
+    return "".join(f" AND {f}" for f in filters), params
+
+
+def lpo_number(purchase_id, lpo_path):
+    """LPO number printed on a purchase: from its lpo_path, else the purchase id (older rows)."""
+    match = re.search(r"LPO_(\d+)", lpo_path or "")
+    return int(match.group(1)) if match else purchase_id
+
+
+def fetch_rows(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def document_requests(conn, kind, out_dir, args):
+    """
+    Streams (kind, number, data, file_path, options) for every selected
+    purchase or sale (one document per sale header, with all its lines).
+    Also returns the number of documents selected, for progress reporting.
+    """
+    if kind == LPO:
+        filters, params = build_filters("purchase_day", args)
+        sql = PURCHASES_SQL.format(filters=filters)
+        total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+        return total, lpo_requests(fetch_rows(conn, sql, params), out_dir)
+
+    number_column = "invoice_number" if kind == INVOICE else "delivery_note_number"
+    filters, params = build_filters("h.sale_day", args, id_column="h.id")
+    total = conn.execute(SALES_COUNT_SQL.format(number_column=number_column, filters=filters), params).fetchone()[0]
+    sql = SALES_SQL.format(number_column=number_column, filters=filters)
+    return total, sale_requests(fetch_rows(conn, sql, params), kind, out_dir)
+
+
+def lpo_requests(rows, out_dir):
+    for purchase_id, lpo_path, product, quantity, unit_price, total_amount, supplier, date in rows:
+        number = lpo_number(purchase_id, lpo_path)
+        data = {
+            "customer_name": supplier,
+            "date": date,
+            "items": [{"product": product, "quantity": quantity, "price": unit_price, "total": total_amount}],
+        }
+        yield LPO, number, data, os.path.join(out_dir, f"LPO_{number}.pdf"), {"branch_info": LPO_BRANCH_INFO}
+
+
+def sale_requests(rows, kind, out_dir):
+    for header, lines in itertools.groupby(rows, key=lambda row: row[:6]):
+        sale_id, invoice_number, delivery_note_number, total_amount, date, customer_name = header
+        data = {
+            "id": sale_id,
+            "invoice_number": invoice_number,
+            "delivery_note_number": delivery_note_number,
+            "total": total_amount,
+            "date": date,
+            "customer_name": customer_name,
+            "items": [
+                {"id": line_id, "product": product, "quantity": quantity, "price": price, "total": line_total}
+                for line_id, product, quantity, price, line_total in (line[6:] for line in lines)
+            ],
+        }
+        if kind == INVOICE:
+            yield INVOICE, invoice_number, data, os.path.join(out_dir, f"Invoice_{invoice_number}.pdf"), {}
+        else:
+            yield (DELIVERY_NOTE, delivery_note_number, data,
+                   os.path.join(out_dir, f"DeliveryNote_{delivery_note_number}.pdf"), {})
+
+
+def batches(requests, size):
+    batch = []
+    for request in requests:
+        batch.append(request)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Journal:
+    """Append-only list of finished files, one path per line."""
+
+    def __init__(self, path, reset=False):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path) and not reset:
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = open(path, "w" if reset else "a", encoding="utf-8")
+
+    def record(self, file_paths):
+        for file_path in file_paths:
+            self._file.write(file_path + "\n")
+            self.done.add(file_path)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.rendered = 0
+        self.skipped = 0
+        self.failures = []
+        self.started = time.perf_counter()
+
+    def show(self):
+        finished = self.rendered + self.skipped + len(self.failures)
+        rate = self.rendered / max(time.perf_counter() - self.started, 1e-9)
+        sys.stdout.write(
+            f"\r[{finished}/{self.total}] rendered {self.rendered}, skipped {self.skipped}, "
+            f"failed {len(self.failures)} ({rate:.1f} docs/s)"
+        )
+        sys.stdout.flush()
+
+
+def collect(finished, in_flight, journal, progress):
+    for future in finished:
+        batch = in_flight.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [(request[3], f"worker failed: {e}") for request in batch]
+        journal.record(file_path for file_path, error in results if error is None)
+        for file_path, error in results:
+            if error is None:
+                progress.rendered += 1
+            else:
+                progress.failures.append((file_path, error))
+    progress.show()
+
+
+def run(kind, out_dir, args):
+    os.makedirs(out_dir, exist_ok=True)
+    journal = Journal(os.path.join(out_dir, f".bulk_{kind}.journal"), reset=args.restart)
+    conn = open_read_only(args.db)
+
+    try:
+        total, requests = document_requests(conn, kind, out_dir, args)
+        progress = Progress(total)
+
+        def pending():
+            for request in requests:
+                if request[3] in journal.done:
+                    progress.skipped += 1
+                else:
+                    yield request
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            # Keep a bounded number of batches in flight so memory stays flat
+            # however many rows are selected.
+            in_flight = {}
+            max_in_flight = (args.workers or os.cpu_count() or 1) * 2
+            for batch in batches(pending(), args.batch_size):
+                in_flight[pool.submit(render_batch, batch)] = batch
+                if len(in_flight) >= max_in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished, in_flight, journal, progress)
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished, in_flight, journal, progress)
+    except KeyboardInterrupt:
+        print(f"\nℹ️ Interrupted. Re-run the same command to resume ({len(journal.done)} files recorded).")
+        return 130
+    except sqlite3.Error as e:
+        print(f"\n❌ Database error: {e}")
+        return 2
+    finally:
+        journal.close()
+        conn.close()
+
+    progress.show()
+    print()
+    for file_path, error in progress.failures:
+        print(f"❌ {file_path}: {error}")
+    if progress.failures:
+        return 1
+    print(f"✅ {kind} documents written to {out_dir}")
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Regenerate invoices, delivery notes or LPOs in bulk.")
+    parser.add_argument("kind", choices=[INVOICE, DELIVERY_NOTE, LPO])
+    parser.add_argument("--from", dest="date_from", help="first date (yyyy-MM-dd)")
+    parser.add_argument("--to", dest="date_to", help="last date (yyyy-MM-dd)")
+    parser.add_argument("--ids", nargs="+", type=int, help="only these sale header / purchase ids")
+    parser.add_argument("--out", help="output directory (default: reprints/<kind>)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the journal and render everything again")
+    parser.add_argument("--db", default=DB_FILE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out_dir = args.out or os.path.join("reprints", args.kind)
+    return run(args.kind, out_dir, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Streaming CSV export.
+
+Rows go from a single sqlite3 cursor to the csv writer in fetchmany()
+batches, so an export holds one batch in memory however many rows it has.
+Paths ending in .gz are gzip-compressed on the fly. The file is written
+next to its destination and only moved into place once complete, so a
+cancelled or failed export never leaves a truncated CSV behind.
+
+Plain sqlite3, no Qt: qt_export.py runs these on a background thread for
+the windows.
+"""
+import csv
+import gzip
+import os
+
+EXPORT_BATCH = 5000
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def open_output(path, compress=None):
+    """Text handle for `path`; gzip when `compress` is set, or by default when it ends in .gz."""
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export_csv(conn, sql, params, headers, path, compress=None, batch_size=EXPORT_BATCH,
+               progress=None, is_cancelled=None):
+    """
+    Writes `headers` and every row of `sql` to `path` and returns the number
+    of rows written. `progress(rows_written)` is called after each batch;
+    `is_cancelled()` is checked between batches and raises ExportCancelled.
+    """
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+    partial = f"{path}.part"
+    rows_written = 0
+    try:
+        with open_output(partial, compress) as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            cursor = conn.execute(sql, params)
+            try:
+                while True:
+                    if is_cancelled is not None and is_cancelled():
+                        raise ExportCancelled()
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    rows_written += len(rows)
+                    if progress is not None:
+                        progress(rows_written)
+            finally:
+                cursor.close()
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return rows_written
+
+
+def count_rows(conn, count_sql, params=()):
+    return conn.execute(count_sql, params).fetchone()[0]
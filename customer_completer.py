@@ -0,0 +1,76 @@
+import bisect
+
+from PyQt5.QtCore import QStringListModel, Qt
+from PyQt5.QtWidgets import QCompleter
+
+from query_executor import query_executor
+from search_index import COMPLETION_LIMIT, complete_customer_names
+
+
+class CustomerCompleter(QCompleter):
+    """
+    Completes customer names in a QLineEdit from the database as they are
+    typed, instead of loading every customer up front.
+
+    Each edit asks for the first COMPLETION_LIMIT names starting with the
+    typed prefix (an index range on the NOCASE name index). When a prefix
+    has fewer matches than that, the model already holds all of them, so
+    longer prefixes are filtered by QCompleter without another query.
+    """
+
+    def __init__(self, line_edit):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.names = QStringListModel(self)
+        self.setModel(self.names)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setCompletionMode(QCompleter.PopupCompletion)
+        line_edit.setCompleter(self)
+        line_edit.textEdited.connect(self.fetch_matches)
+
+        # Prefix the model holds matches for, and whether that is all of them.
+        self.prefix = None
+        self.has_all_matches = False
+
+    def fetch_matches(self, text):
+        prefix = text.strip()
+        if not prefix:
+            return
+        if self.has_all_matches and prefix.lower().startswith(self.prefix.lower()):
+            return
+        query_executor().submit(
+            (self, "matches"), complete_customer_names, prefix,
+            on_result=lambda names, prefix=prefix: self.show_matches(prefix, names),
+            on_error=lambda error: print(f"❌ Customer lookup failed: {error}"),
+        )
+
+    def show_matches(self, prefix, names):
+        text = self.line_edit.text().strip()
+        if not text.lower().startswith(prefix.lower()):
+            return  # typed past or away from this prefix while it ran
+        self.prefix = prefix
+        self.has_all_matches = len(names) < COMPLETION_LIMIT
+        self.names.setStringList(names)
+        if self.line_edit.hasFocus():
+            self.setCompletionPrefix(text)
+            self.complete()
+
+    def add_name(self, name):
+        """Puts a newly created customer into the current matches, in order, if it belongs there."""
+        if self.prefix is None or not name.lower().startswith(self.prefix.lower()):
+            return
+        names = self.names.stringList()
+        if name in names:
+            return
+        row = bisect.bisect([n.lower() for n in names], name.lower())
+        if row == len(names) and not self.has_all_matches:
+            return  # sorts after the names fetched; a query will find it
+        self.names.insertRows(row, 1)
+        self.names.setData(self.names.index(row), name)
+
+    def invalidate(self):
+        """Drops the cached matches (a customer was renamed or removed) so the next edit queries again."""
+        query_executor().cancel_owner(self)
+        self.prefix = None
+        self.has_all_matches = False
+        self.names.setStringList([])
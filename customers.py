@@ -1,13 +1,25 @@
 import sys
-import sqlite3
-import csv
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QFormLayout, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QHBoxLayout, QFileDialog, QLabel
+    QTableWidget, QTableWidgetItem, QMessageBox, QHBoxLayout, QLabel
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
+from database import connection
+from events import CUSTOMERS_CHANGED, publish
+from query_executor import query_executor
+from qt_export import ask_csv_path, start_csv_export
+from report_queries import CUSTOMER_HISTORY_SQL, CUSTOMER_STATEMENT_SQL, HISTORY_HEADERS, STATEMENT_HEADERS
+from search_index import MIN_SEARCH_CHARS, SEARCH_DEBOUNCE_MS, search_customers
 from themes import apply_gradient_theme
 
+CUSTOMERS_SQL = "SELECT id, name, phone, address FROM customers ORDER BY id"
+
+def fetch_customers(conn):
+    return conn.execute(CUSTOMERS_SQL).fetchall()
+
+def fetch_matching_customers(conn, keyword):
+    return search_customers(conn, keyword)
+
 class CustomersWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -16,9 +28,6 @@ class CustomersWindow(QWidget):
         self.setGeometry(150, 150, 700, 500)
         self.init_ui()
 
-    def get_connection(self):
-        return sqlite3.connect('magen.db')
-
     def init_ui(self):
         layout = QVBoxLayout()
 
@@ -50,17 +59,28 @@ class CustomersWindow(QWidget):
         button_layout.addWidget(self.export_button)
         layout.addLayout(button_layout)
 
+        # Documents for the selected customer
+        document_layout = QHBoxLayout()
+        self.statement_button = QPushButton("Export Statement")
+        self.history_button = QPushButton("Export Purchase History")
+        document_layout.addWidget(self.statement_button)
+        document_layout.addWidget(self.history_button)
+        layout.addLayout(document_layout)
+
         # Search bar
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by name or phone...")
-        self.search_button = QPushButton("Search")
+        self.search_input.setPlaceholderText("Search by name, phone or address...")
         self.clear_search_button = QPushButton("Clear")
         search_layout.addWidget(self.search_input)
-        search_layout.addWidget(self.search_button)
         search_layout.addWidget(self.clear_search_button)
         layout.addLayout(search_layout)
 
+        # Searches once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+
         # Table
         self.table = QTableWidget()
         self.table.setColumnCount(4)
@@ -75,8 +95,12 @@ class CustomersWindow(QWidget):
         self.update_button.clicked.connect(self.update_customer)
         self.delete_button.clicked.connect(self.delete_customer)
         self.export_button.clicked.connect(self.export_to_csv)
-        self.search_button.clicked.connect(self.search_customers)
-        self.clear_search_button.clicked.connect(self.load_customers)
+        self.statement_button.clicked.connect(self.export_statement)
+        self.history_button.clicked.connect(self.export_history)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.search_customers)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.clear_search_button.clicked.connect(self.search_input.clear)
         self.table.itemSelectionChanged.connect(self.load_selected_customer)
 
         self.load_customers()
@@ -102,33 +126,36 @@ class CustomersWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Full Name and Phone are required.")
             return
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO customers (name, address, phone)
-            VALUES (?, ?, ?)
-        """, (name, address, phone))
-
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO customers (name, address, phone)
+                VALUES (?, ?, ?)
+            """, (name, address, phone))
 
+        publish(CUSTOMERS_CHANGED, {'name': name})
         self.clear_inputs()
-        self.load_customers()
+        self.search_customers()
         QMessageBox.information(self, "Success", "Customer added successfully.")
 
     def load_customers(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM customers")
-        customers = cursor.fetchall()
-        conn.close()
-
-        self.table.setRowCount(0)
-        for row_data in customers:
-            row_index = self.table.rowCount()
-            self.table.insertRow(row_index)
+        self.run_query(fetch_customers)
+
+    def run_query(self, fn, *args):
+        query_executor().submit(
+            (self, "customers"), fn, *args,
+            on_result=self.show_customers,
+            on_error=lambda error: QMessageBox.warning(self, "Database Error", f"Failed to load customers:\n{error}"),
+        )
+
+    def show_customers(self, customers):
+        self.table.setUpdatesEnabled(False)
+        self.table.clearContents()
+        self.table.setRowCount(len(customers))
+        for row_index, row_data in enumerate(customers):
             for col, data in enumerate(row_data):
-                self.table.setItem(row_index, col, QTableWidgetItem(str(data)))
+                self.table.setItem(row_index, col, QTableWidgetItem("" if data is None else str(data)))
+        self.table.setUpdatesEnabled(True)
 
     def load_selected_customer(self):
         selected_ranges = self.table.selectedRanges()
@@ -153,18 +180,17 @@ class CustomersWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Full Name and Phone are required.")
             return
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE customers
-            SET name = ?, phone = ?, address = ?
-            WHERE id = ?
-        """, (name, phone, address, customer_id))
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE customers
+                SET name = ?, phone = ?, address = ?
+                WHERE id = ?
+            """, (name, phone, address, customer_id))
 
+        publish(CUSTOMERS_CHANGED)
         self.clear_inputs()
-        self.load_customers()
+        self.search_customers()
         QMessageBox.information(self, "Success", "Customer updated successfully.")
 
     def delete_customer(self):
@@ -179,49 +205,61 @@ class CustomersWindow(QWidget):
                                        "Are you sure you want to delete this customer?",
                                        QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
-            conn.commit()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
 
+            publish(CUSTOMERS_CHANGED)
             self.clear_inputs()
-            self.load_customers()
+            self.search_customers()
             QMessageBox.information(self, "Deleted", "Customer deleted successfully.")
 
+    def search_as_you_type(self):
+        keyword = self.search_input.text().strip()
+        if not keyword or len(keyword) >= MIN_SEARCH_CHARS:
+            self.search_customers()
+
     def search_customers(self):
+        self.search_timer.stop()
         keyword = self.search_input.text().strip()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM customers
-            WHERE name LIKE ? OR phone LIKE ?
-        """, (f"%{keyword}%", f"%{keyword}%"))
-        customers = cursor.fetchall()
-        conn.close()
-
-        self.table.setRowCount(0)
-        for row_data in customers:
-            row_index = self.table.rowCount()
-            self.table.insertRow(row_index)
-            for col, data in enumerate(row_data):
-                self.table.setItem(row_index, col, QTableWidgetItem(str(data)))
+        if keyword:
+            self.run_query(fetch_matching_customers, keyword)
+        else:
+            self.load_customers()
+
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
 
     def export_to_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save CSV", "", "CSV Files (*.csv)")
+        path = ask_csv_path(self, "Save CSV")
         if path:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM customers")
-            customers = cursor.fetchall()
-            conn.close()
+            start_csv_export(
+                self, CUSTOMERS_SQL, (), ["ID", "Name", "Phone", "Address"], path,
+                count_sql="SELECT COUNT(*) FROM customers",
+            )
+
+    def export_statement(self):
+        self.export_customer_rows("Statement", CUSTOMER_STATEMENT_SQL, STATEMENT_HEADERS, "sale_headers")
+
+    def export_history(self):
+        self.export_customer_rows("History", CUSTOMER_HISTORY_SQL, HISTORY_HEADERS, "sale_lines")
 
-            with open(path, "w", newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(["ID", "Name", "Phone", "Address"])
-                writer.writerows(customers)
+    def export_customer_rows(self, document, sql, headers, table):
+        selected_ranges = self.table.selectedRanges()
+        if not selected_ranges:
+            QMessageBox.warning(self, "Selection Error", "Please select a customer first.")
+            return
 
-            QMessageBox.information(self, "Export Complete", f"Customer data exported to {path}")
+        row = selected_ranges[0].topRow()
+        customer_id = int(self.table.item(row, 0).text())
+        name = self.table.item(row, 1).text()
+        path = ask_csv_path(self, f"Save {document}", f"{name} {document}.csv")
+        if path:
+            start_csv_export(
+                self, sql, (customer_id,), headers, path,
+                count_sql=f"SELECT COUNT(*) FROM {table} WHERE customer_id = ?", count_params=(customer_id,),
+            )
 
     def clear_inputs(self):
         self.full_name_input.clear()
@@ -1,7 +1,10 @@
 from PyQt5 import QtWidgets, QtCore, QtGui 
 import pyqtgraph as pg
-import sqlite3
-from datetime import datetime
+from datetime import datetime, date
+from database import epoch_day
+from query_executor import query_executor
+from qt_events import event_bridge
+from rollups import summary_totals, daily_totals
 from sales import SalesWindow
 from purchases import PurchasesWindow
 from customers import CustomersWindow
@@ -14,7 +17,17 @@ from PyQt5.QtWidgets import (
     QLabel, QPushButton, QListWidget, QMessageBox
 )
 
-DB_PATH = "magen.db"
+def fetch_dashboard_totals(conn, end_day, days=7):
+    """Runs on a query worker: all-time totals plus the last `days` days, from the rollups."""
+    sales_total, purchases_total = summary_totals(conn)
+    rows = daily_totals(conn, end_day - days + 1, end_day)
+    return (
+        sales_total,
+        purchases_total,
+        list(range(1, len(rows) + 1)),
+        [sales or 0 for _, sales, _ in rows],
+        [purchases or 0 for _, _, purchases in rows],
+    )
 
 class DashboardWindow(QtWidgets.QMainWindow):
     def __init__(self):
@@ -59,10 +72,6 @@ class DashboardWindow(QtWidgets.QMainWindow):
         self.marquee_timer.timeout.connect(self.scroll_marquee)
         self.marquee_timer.start(150)
 
-        self.alert_refresh_timer = QtCore.QTimer()
-        self.alert_refresh_timer.timeout.connect(self.update_marquee_text)
-        self.alert_refresh_timer.start(10000)
-
         # Navigation buttons
         buttons = ["Dashboard", "Sales", "Purchases", "Customers", "Suppliers", "Reports", "Toggle Theme", "Logout"]
         for btn_text in buttons:
@@ -106,15 +115,15 @@ class DashboardWindow(QtWidgets.QMainWindow):
         summary_layout = QtWidgets.QHBoxLayout()
         summary_layout.setSpacing(20)
 
-        sales_total, purchases_total = self.get_summary_totals()
         stock_levels = get_current_stock_levels()
         total_stock_items = sum(stock_levels.values())
 
+        # Filled in by refresh_summary_cards once the worker query returns.
         self.sales_card, self.sales_value_label = self.create_summary_card(
-            "Total Sales", f"Ksh {sales_total:,.2f}", "#0A2647"
+            "Total Sales", "Ksh …", "#0A2647"
         )
         self.purchases_card, self.purchases_value_label = self.create_summary_card(
-            "Total Purchases", f"Ksh {purchases_total:,.2f}", "#144272"
+            "Total Purchases", "Ksh …", "#144272"
         )
         self.stock_card, self.stock_value_label = self.create_summary_card(
             "Current Stock Units", f"{total_stock_items} Lts", "#205295"
@@ -167,13 +176,8 @@ class DashboardWindow(QtWidgets.QMainWindow):
         self.graph_widget.showGrid(x=True, y=True)
         self.graph_widget.addLegend()
 
-        # Placeholder data for now
-        days = list(range(1, 8))
-        sales_data = [150, 200, 180, 250, 300, 280, 320]
-        purchases_data = [100, 150, 130, 200, 180, 170, 210]
-
-        self.graph_widget.plot(days, sales_data, pen=pg.mkPen(color='b', width=2), name='Sales')
-        self.graph_widget.plot(days, purchases_data, pen=pg.mkPen(color='g', width=2), name='Purchases')
+        self.sales_curve = self.graph_widget.plot([], [], pen=pg.mkPen(color='b', width=2), name='Sales')
+        self.purchases_curve = self.graph_widget.plot([], [], pen=pg.mkPen(color='g', width=2), name='Purchases')
         self.graph_widget.setFixedHeight(350)
 
         self.content_layout.addWidget(self.graph_widget)
@@ -182,10 +186,24 @@ class DashboardWindow(QtWidgets.QMainWindow):
         self.body_layout.addWidget(self.content)
         self.main_layout.addLayout(self.body_layout)
 
-        # Auto-refresh every 15 seconds
-        self.summary_refresh_timer = QtCore.QTimer()
-        self.summary_refresh_timer.timeout.connect(self.refresh_summary_cards)
-        self.summary_refresh_timer.start(15000)
+        # Refresh when sales, purchases or stock change (here or on another
+        # till) instead of polling. Bursts of events collapse into one refresh.
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(250)
+        self.refresh_timer.timeout.connect(self.refresh_summary_cards)
+        self.refresh_timer.timeout.connect(self.update_marquee_text)
+
+        bridge = event_bridge()
+        bridge.sale_recorded.connect(self.schedule_refresh)
+        bridge.purchase_recorded.connect(self.schedule_refresh)
+        bridge.stock_changed.connect(self.schedule_refresh)
+        bridge.database_changed.connect(self.schedule_refresh)
+
+        self.refresh_summary_cards()
+
+    def schedule_refresh(self, _payload=None):
+        self.refresh_timer.start()
 
     def update_datetime(self):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -210,33 +228,24 @@ class DashboardWindow(QtWidgets.QMainWindow):
 
         return card, value_label
 
-    def get_summary_totals(self):
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT SUM(total) FROM sales")
-            sales_total = cursor.fetchone()[0] or 0
-
-            cursor.execute("SELECT SUM(total) FROM purchases")
-            purchases_total = cursor.fetchone()[0] or 0
-
-            conn.close()
-            return sales_total, purchases_total
-
-        except Exception as e:
-            print(f"Error fetching summary totals: {e}")
-            return 0, 0
-
     def refresh_summary_cards(self):
-        sales_total, purchases_total = self.get_summary_totals()
-        self.sales_value_label.setText(f"Ksh {sales_total:,.2f}")
-        self.purchases_value_label.setText(f"Ksh {purchases_total:,.2f}")
+        query_executor().submit(
+            (self, "summary"), fetch_dashboard_totals, epoch_day(date.today()),
+            on_result=self.show_summary_totals,
+            on_error=lambda error: print(f"Error fetching summary totals: {error}"),
+        )
 
         stock_levels = get_current_stock_levels()
         total_stock_items = sum(stock_levels.values())
         self.stock_value_label.setText(f"{total_stock_items} Lts")
 
+    def show_summary_totals(self, totals):
+        sales_total, purchases_total, days, sales_data, purchases_data = totals
+        self.sales_value_label.setText(f"Ksh {sales_total:,.2f}")
+        self.purchases_value_label.setText(f"Ksh {purchases_total:,.2f}")
+        self.sales_curve.setData(days, sales_data)
+        self.purchases_curve.setData(days, purchases_data)
+
     def update_marquee_text(self):
         alerts = get_low_stock_alerts()
         if alerts:
@@ -275,6 +284,10 @@ class DashboardWindow(QtWidgets.QMainWindow):
         elif page_name == "Logout":
             self.close()
 
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
+
     def generate_z_report(self):
         import generate_z_report
         generate_z_report.generate_z_report()
@@ -1,87 +1,231 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date as _date
+
+DB_FILE = 'magen.db'
+
+# Connection tuning applied to every pooled connection. WAL lets report
+# readers run alongside till writes, NORMAL sync is durable in WAL mode
+# while avoiding an fsync per commit.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,       # 16 MB page cache (negative = KiB)
+    "mmap_size": 268435456,     # 256 MB memory-mapped I/O
+    "busy_timeout": 5000,       # wait up to 5s for another till's lock
+    "temp_store": "MEMORY",
+}
 
-def get_connection():
-    return sqlite3.connect('magen.db')
 
-def create_tables():
-    conn = get_connection()
+def configure_connection(conn, pragmas=PRAGMAS):
     cursor = conn.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+    return conn
+
+
+class ConnectionPool:
+    """
+    Thread-aware pool of tuned SQLite connections.
+
+    A thread keeps the same connection for as long as it holds one, so
+    nested acquire() calls (e.g. a service calling stock_manager inside a
+    transaction) share it. Once released the connection goes back to the
+    idle list and can be handed to any other thread.
+    """
+
+    def __init__(self, db_file=DB_FILE, max_idle=8, read_only=False, setup=None):
+        self.db_file = db_file
+        self.max_idle = max_idle
+        self.read_only = read_only
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Run once on the first connection handed out, e.g. schema migration.
+        self._setup = setup
+        self._setup_lock = threading.Lock()
+
+    def _connect(self):
+        if self.read_only:
+            conn = sqlite3.connect(
+                f"file:{self.db_file}?mode=ro", uri=True,
+                check_same_thread=False, isolation_level=None
+            )
+            pragmas = {k: v for k, v in PRAGMAS.items() if k != "journal_mode"}
+        else:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            pragmas = PRAGMAS
+        return configure_connection(conn, pragmas)
+
+    def acquire(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+
+        self._local.conn = conn
+        self._local.depth = 1
+
+        if self._setup is not None:
+            try:
+                self._run_setup(conn)
+            except BaseException:
+                self.release(conn)
+                raise
+        return conn
+
+    def _run_setup(self, conn):
+        with self._setup_lock:
+            if self._setup is not None:
+                self._setup(conn)
+                self._setup = None
+
+    def release(self, conn):
+        if getattr(self._local, "conn", None) is not conn:
+            raise RuntimeError("Connection released by a thread that does not hold it")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.conn = None
+
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the block in a single write transaction. If the thread is already
+        inside one, the block joins it instead of starting a new one.
+        """
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.on_commit = []
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._local.on_commit = None
+                raise
+            callbacks, self._local.on_commit = self._local.on_commit, None
+            for callback in callbacks:
+                callback()
+
+    def on_commit(self, callback):
+        """
+        Runs `callback` once the calling thread's current transaction commits
+        (dropped if it rolls back), or immediately when no transaction is open.
+        """
+        pending = getattr(self._local, "on_commit", None)
+        if pending is not None:
+            pending.append(callback)
+        else:
+            callback()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file=DB_FILE, read_only=False):
+    key = (db_file, read_only)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                setup = None if read_only else ensure_schema
+                pool = _pools[key] = ConnectionPool(db_file, read_only=read_only, setup=setup)
+    return pool
+
+
+def connection(db_file=DB_FILE):
+    """Context manager yielding a pooled autocommit connection."""
+    return get_pool(db_file).connection()
+
+
+def transaction(db_file=DB_FILE):
+    """Context manager yielding a pooled connection inside BEGIN IMMEDIATE ... COMMIT."""
+    return get_pool(db_file).transaction()
+
+
+def on_commit(callback, db_file=DB_FILE):
+    get_pool(db_file).on_commit(callback)
+
+
+def close_all_connections():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def get_connection():
+    """
+    Standalone tuned connection for scripts that manage their own lifetime
+    (callers must close it). Application code should use connection().
+    """
+    return configure_connection(sqlite3.connect(DB_FILE))
+
+_EPOCH = _date(1970, 1, 1)
+
+def epoch_day(value):
+    """
+    'yyyy-MM-dd' (optionally with a time part) or a date -> days since
+    1970-01-01, matching the sale_day / purchase_day generated columns.
+    """
+    if isinstance(value, str):
+        value = _date.fromisoformat(value[:10])
+    return (value - _EPOCH).days
+
+def init_db(db_file=DB_FILE):
+    """
+    Brings the database to the latest schema version (see migrations.py) and
+    returns the version it started from.
+    """
+    conn = configure_connection(sqlite3.connect(db_file, isolation_level=None))
+    try:
+        return ensure_schema(conn)
+    finally:
+        conn.close()
+
+def ensure_schema(conn):
+    from migrations import migrate
+    return migrate(conn)
+
+# Kept for older scripts that still call it.
+create_tables = init_db
 
-    # Sales Table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product TEXT,
-        quantity REAL,
-        price REAL,
-        total REAL,
-        date TEXT,
-        lpo_path TEXT,
-        invoice_path TEXT,
-        delivery_note_path TEXT,
-        receipt_path TEXT,
-        customer_name TEXT
-    )
-    """)
-
-    # Purchases Table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS purchases (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product TEXT,
-        quantity REAL,
-        unit_price REAL,
-        total REAL,
-        supplier TEXT,
-        date TEXT,
-        lpo_path TEXT,
-        invoice_path TEXT,
-        delivery_note_path TEXT,
-        receipt_path TEXT
-    )
-    """)
-
-    # Customers Table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS customers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        full_name TEXT,
-        phone TEXT,
-        email TEXT,
-        address TEXT
-    )
-    """)
-
-    # Suppliers Table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS suppliers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        supplier_name TEXT,
-        contact_person TEXT,
-        phone TEXT,
-        email TEXT,
-        address TEXT,
-        products_supplied TEXT
-    )
-    """)
-    # Stock table for automated stock tracking
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stock (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product TEXT UNIQUE,
-            quantity REAL DEFAULT 0
-        )
-    """)
-
-    # Prepopulate stock with products if not already
-    products = ["PMS", "AGO", "IK", "Gas"]
-    for product in products:
-        cursor.execute("INSERT OR IGNORE INTO stock (product, quantity) VALUES (?, ?)", (product, 0))
-
-    conn.commit()
-    conn.close()
-
-# Create tables automatically when the script is run
 if __name__ == "__main__":
-    create_tables()
+    init_db()
     print("All tables created or verified successfully.")
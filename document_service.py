@@ -0,0 +1,195 @@
+"""
+Background rendering of invoices, delivery notes and LPOs.
+
+Documents are rendered by pdf_generator in a pool of worker processes, so a
+cashier is free as soon as the sale commits and end-of-month runs use every
+core. Each submission returns a DocumentJob whose status can be polled; when
+it finishes DOCUMENT_READY or DOCUMENT_FAILED is published on the event bus
+(see qt_events.py for the Qt signals) and its own callback, if any, runs.
+
+This module must stay importable without Qt: worker processes import it.
+"""
+import itertools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait as wait_for
+
+from events import DOCUMENT_FAILED, DOCUMENT_READY, publish
+
+INVOICE = "invoice"
+DELIVERY_NOTE = "delivery_note"
+LPO = "lpo"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Letterhead printed on LPOs.
+LPO_BRANCH_INFO = {
+    "name": "Magen Fuel Enterprise",
+    "address": "P.O Box 12345-00100, Nairobi, Kenya",
+    "contacts": "Tel: +254 700 123456 | Email: info@magenfuel.co.ke"
+}
+
+MAX_WORKERS = int(os.environ.get("MAGEN_DOCUMENT_WORKERS", "0")) or None  # None = one per core
+
+
+def render_document(kind, number, data, file_path, options):
+    """Runs in a worker process. Returns the path written."""
+    import pdf_generator
+
+    renderers = {
+        INVOICE: pdf_generator.generate_invoice_pdf_document,
+        DELIVERY_NOTE: pdf_generator.generate_delivery_note_pdf_document,
+        LPO: pdf_generator.generate_lpo_pdf_document,
+    }
+    renderers[kind](number, data, file_path, **options)
+    return file_path
+
+
+def render_batch(batch):
+    """
+    Runs in a worker process: renders a list of (kind, number, data,
+    file_path, options) in one task. The batch's QR codes are generated
+    together first, so every document in it draws from the QR cache.
+    Returns [(file_path, error message or None), ...].
+    """
+    import pdf_generator
+    import qr_codes
+
+    qr_codes.prefetch(
+        options.get('qr_data') or pdf_generator.default_qr_data(number, data)
+        for _, number, data, _, options in batch
+    )
+    results = []
+    for kind, number, data, file_path, options in batch:
+        try:
+            render_document(kind, number, data, file_path, options)
+            results.append((file_path, None))
+        except Exception as e:
+            results.append((file_path, str(e)))
+    return results
+
+
+class DocumentJob:
+    def __init__(self, job_id, kind, number, file_path, future, index=None):
+        self.job_id = job_id
+        self.kind = kind
+        self.number = number
+        self.file_path = file_path
+        self.future = future
+        # Position in a render_batch result when the future renders several documents.
+        self.index = index
+
+    @property
+    def status(self):
+        if self.future.running():
+            return RUNNING
+        if not self.future.done():
+            return QUEUED
+        if self.future.cancelled() or self.error is not None:
+            return FAILED
+        return DONE
+
+    @property
+    def error(self):
+        if not self.future.done() or self.future.cancelled():
+            return None
+        error = self.future.exception()
+        if error is None and self.index is not None:
+            message = self.future.result()[self.index][1]
+            if message is not None:
+                error = RuntimeError(message)
+        return error
+
+    def __repr__(self):
+        return f"<DocumentJob {self.job_id} {self.kind} {self.number} {self.status}>"
+
+
+class DocumentService:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self.jobs = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _pool(self):
+        # Started on first use so importing the module never forks workers.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, kind, number, data, file_path, on_done=None, **options):
+        """
+        Queues one document. `on_done(job)` runs on a background thread once it
+        finishes either way; UI code should listen for DOCUMENT_READY /
+        DOCUMENT_FAILED through the Qt bridge instead.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        future = self._pool().submit(render_document, kind, number, data, file_path, options)
+        job = DocumentJob(next(self._ids), kind, number, file_path, future)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        future.add_done_callback(lambda _: self._finished(job, on_done))
+        return job
+
+    def submit_batch(self, requests, on_done=None):
+        """
+        Queues (kind, number, data, file_path, options) requests as one
+        render_batch task, so they render in the same worker and share its QR
+        cache. Returns a DocumentJob per request; each finishes (and runs
+        `on_done`) when the batch does.
+        """
+        requests = list(requests)
+        for request in requests:
+            os.makedirs(os.path.dirname(os.path.abspath(request[3])), exist_ok=True)
+        future = self._pool().submit(render_batch, requests)
+        jobs = [
+            DocumentJob(next(self._ids), kind, number, file_path, future, index)
+            for index, (kind, number, _, file_path, _) in enumerate(requests)
+        ]
+        with self._lock:
+            for job in jobs:
+                self.jobs[job.job_id] = job
+        for job in jobs:
+            future.add_done_callback(lambda _, job=job: self._finished(job, on_done))
+        return jobs
+
+    def _finished(self, job, on_done):
+        with self._lock:
+            self.jobs.pop(job.job_id, None)
+        publish(DOCUMENT_READY if job.status == DONE else DOCUMENT_FAILED, job)
+        if on_done is not None:
+            on_done(job)
+
+    def submit_sale_documents(self, sale, save_dir, **options):
+        """Queues the invoice and delivery note for a sale returned by sale_service.record_sale, as one batch."""
+        invoice_number = sale['invoice_number']
+        delivery_note_number = sale['delivery_note_number']
+        return tuple(self.submit_batch([
+            (INVOICE, invoice_number, sale, os.path.join(save_dir, f"Invoice_{invoice_number}.pdf"), options),
+            (
+                DELIVERY_NOTE, delivery_note_number, sale,
+                os.path.join(save_dir, f"DeliveryNote_{delivery_note_number}.pdf"), options
+            ),
+        ]))
+
+    def pending(self):
+        """Jobs still queued or rendering."""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def wait(self, jobs, timeout=None):
+        return wait_for([job.future for job in jobs], timeout=timeout)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+document_service = DocumentService()
@@ -0,0 +1,96 @@
+"""
+In-process change notifications.
+
+Write paths publish what they changed (after their transaction commits) and
+windows subscribe instead of polling the database on timers. Commits made by
+other processes, e.g. another till on the same database file, are caught by
+DataVersionWatcher and published as DATABASE_CHANGED. qt_events.py bridges
+these onto Qt signals for the windows.
+"""
+import sqlite3
+import threading
+import traceback
+
+from database import DB_FILE, on_commit
+
+SALE_RECORDED = "sale_recorded"
+PURCHASE_RECORDED = "purchase_recorded"
+STOCK_CHANGED = "stock_changed"
+CUSTOMERS_CHANGED = "customers_changed"
+DATABASE_CHANGED = "database_changed"
+DOCUMENT_READY = "document_ready"
+DOCUMENT_FAILED = "document_failed"
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(topic, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def publish(self, topic, payload=None):
+        """
+        Calls every subscriber of `topic` on the publishing thread. A failing
+        subscriber is reported and skipped; it must not fail the write that
+        published the event.
+        """
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, []))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception:
+                print(f"❌ Error in '{topic}' subscriber:")
+                traceback.print_exc()
+
+
+bus = EventBus()
+subscribe = bus.subscribe
+unsubscribe = bus.unsubscribe
+publish = bus.publish
+
+
+def publish_on_commit(topic, payload=None, db_file=DB_FILE):
+    """Publishes once the calling thread's transaction commits (nothing on rollback)."""
+    on_commit(lambda: bus.publish(topic, payload), db_file)
+
+
+class DataVersionWatcher:
+    """
+    Detects commits made through any other connection via PRAGMA
+    data_version, which reads a counter from the connection's own state and
+    never touches a table, so it is cheap enough to poll every second or two.
+    Local writes also move it; subscribers should treat DATABASE_CHANGED as
+    "re-read if you care" and coalesce refreshes.
+    """
+
+    def __init__(self, db_file=DB_FILE, event_bus=bus):
+        self.db_file = db_file
+        self.bus = event_bus
+        self._conn = None
+        self._data_version = None
+
+    def check(self):
+        """Publishes DATABASE_CHANGED and returns True if anything was committed since the last check."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and data_version != self._data_version
+        self._data_version = data_version
+        if changed:
+            self.bus.publish(DATABASE_CHANGED)
+        return changed
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
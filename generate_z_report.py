@@ -1,41 +1,38 @@
-import sqlite3
 from datetime import datetime
-from fpdf import FPDF
 import os
 
-DB_FILE = 'magen.db'
+from database import connection, epoch_day
+
+# Reads the day's sales_daily rollup rows (one per product, see rollups.py).
+# The window aggregate carries the day total on every product row and the
+# transaction count is the number of sale headers (baskets) that day, so the
+# whole Z report comes back from a single query.
+Z_REPORT_SQL = """
+    SELECT product, quantity, amount,
+           SUM(amount) OVER (),
+           (SELECT COUNT(*) FROM sale_headers WHERE sale_day = ?1)
+    FROM sales_daily
+    WHERE day = ?1
+    ORDER BY product
+"""
+
+def fetch_day_summary(conn, day):
+    """Returns ([(product, quantity, amount), ...], total_sales, total_transactions) for a day."""
+    rows = conn.execute(Z_REPORT_SQL, (epoch_day(day),)).fetchall()
+    if not rows:
+        return [], 0, 0
+    product_summary = [(product, qty, amt) for product, qty, amt, _, _ in rows]
+    return product_summary, rows[0][3] or 0, rows[0][4] or 0
 
 def generate_z_report(auto_print=False):
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+    from fpdf import FPDF
 
+    try:
         # Get today's date
         today_str = datetime.now().strftime('%Y-%m-%d')
 
-        # Fetch total sales for today
-        cursor.execute("""
-            SELECT SUM(total) FROM sales
-            WHERE DATE(date) = ?
-        """, (today_str,))
-        total_sales = cursor.fetchone()[0] or 0
-
-        # Fetch breakdown per product
-        cursor.execute("""
-            SELECT product, SUM(quantity), SUM(total) FROM sales
-            WHERE DATE(date) = ?
-            GROUP BY product
-        """, (today_str,))
-        product_summary = cursor.fetchall()
-
-        # Optional: Fetch sales count
-        cursor.execute("""
-            SELECT COUNT(*) FROM sales
-            WHERE DATE(date) = ?
-        """, (today_str,))
-        total_transactions = cursor.fetchone()[0] or 0
-
-        conn.close()
+        with connection() as conn:
+            product_summary, total_sales, total_transactions = fetch_day_summary(conn, today_str)
 
         # Prepare report directory
         report_dir = os.path.join(os.getcwd(), "documents", "reports")
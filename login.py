@@ -1,11 +1,11 @@
 import sys
-import sqlite3
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
     QVBoxLayout, QMessageBox, QGraphicsOpacityEffect
 )
 from PyQt5.QtGui import QPixmap, QFont
 from PyQt5.QtCore import Qt, QPropertyAnimation, pyqtSignal
+from qt_auth import start_login
 
 class LoginWindow(QMainWindow):
     login_success = pyqtSignal()
@@ -70,22 +70,28 @@ class LoginWindow(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Please enter both username and password.")
             return
 
-        try:
-            conn = sqlite3.connect('magen.db')
-            cursor = conn.cursor()
+        # The password check takes a deliberate fraction of a second, so it
+        # runs in the background while the window stays responsive.
+        self.login_button.setEnabled(False)
+        self.login_button.setText("Signing in...")
+        start_login(username, password, self.on_login_success, self.on_login_rejected, self.on_login_error)
 
-            cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, password))
-            user = cursor.fetchone()
-            conn.close()
+    def reset_login_button(self):
+        self.login_button.setEnabled(True)
+        self.login_button.setText("Login")
 
-            if user:
-                self.login_success.emit()
-                self.close()
-            else:
-                QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
+    def on_login_success(self, user):
+        self.reset_login_button()
+        self.login_success.emit()
+        self.close()
 
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Database Error", str(e))
+    def on_login_rejected(self):
+        self.reset_login_button()
+        QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
+
+    def on_login_error(self, error):
+        self.reset_login_button()
+        QMessageBox.critical(self, "Database Error", error)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
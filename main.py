@@ -1,7 +1,9 @@
 import sys
 from PyQt5 import QtWidgets, QtGui, QtCore
-from database import init_db
+from database import init_db, close_all_connections
 from dashboard import DashboardWindow
+from document_service import document_service
+from qt_auth import start_login
 
 
 class LoginWindow(QtWidgets.QWidget):
@@ -61,20 +63,27 @@ class LoginWindow(QtWidgets.QWidget):
         username = self.username_input.text()
         password = self.password_input.text()
 
-        import sqlite3
-        conn = sqlite3.connect('magen.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-        user = c.fetchone()
-        conn.close()
-
-        if user:
-            self.message_label.setStyleSheet("color: lightgreen; font-weight: bold;")
-            self.message_label.setText("Login successful! Redirecting...")
-            QtCore.QTimer.singleShot(1000, self.open_dashboard)
-        else:
-            self.message_label.setStyleSheet("color: red; font-weight: bold;")
-            self.message_label.setText("Invalid username or password.")
+        # bcrypt takes a deliberate fraction of a second; check in the
+        # background so the window keeps painting.
+        self.login_button.setEnabled(False)
+        self.message_label.setStyleSheet("color: white; font-weight: bold;")
+        self.message_label.setText("Signing in...")
+        start_login(username, password, self.on_login_success, self.on_login_rejected, self.on_login_error)
+
+    def on_login_success(self, user):
+        self.message_label.setStyleSheet("color: lightgreen; font-weight: bold;")
+        self.message_label.setText("Login successful! Redirecting...")
+        QtCore.QTimer.singleShot(1000, self.open_dashboard)
+
+    def on_login_rejected(self):
+        self.login_button.setEnabled(True)
+        self.message_label.setStyleSheet("color: red; font-weight: bold;")
+        self.message_label.setText("Invalid username or password.")
+
+    def on_login_error(self, error):
+        self.login_button.setEnabled(True)
+        self.message_label.setStyleSheet("color: red; font-weight: bold;")
+        self.message_label.setText(f"Login failed: {error}")
 
     def open_dashboard(self):
         self.dashboard = DashboardWindow()
@@ -85,6 +94,8 @@ if __name__ == "__main__":
     init_db()  # Ensures your database and tables are ready on first run
 
     app = QtWidgets.QApplication(sys.argv)
+    app.aboutToQuit.connect(close_all_connections)
+    app.aboutToQuit.connect(document_service.shutdown)
     window = LoginWindow()
     window.show()
     sys.exit(app.exec_())
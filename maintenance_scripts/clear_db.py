@@ -5,7 +5,8 @@ conn = sqlite3.connect("magen.db")
 cursor = conn.cursor()
 
 # List of tables to clear (excluding 'users')
-tables = ["stock", "customers", "suppliers", "purchases", "sales"]
+# The stock ledger and its checkpoints go before the balances they add up to.
+tables = ["stock_movements", "stock_checkpoints", "stock", "customers", "suppliers", "purchases", "sale_lines", "sale_headers"]
 
 # Disable foreign key checks for clearing
 cursor.execute("PRAGMA foreign_keys = OFF;")
@@ -3,7 +3,14 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QTableWidget,
     QTableWidgetItem, QPushButton, QLineEdit, QMessageBox, QHBoxLayout
 )
-from database import get_connection
+from database import connection
+from query_executor import query_executor
+
+REORDER_LEVELS_SQL = "SELECT product, quantity, reorder_level FROM stock"
+
+
+def load_reorder_levels(conn):
+    return conn.execute(REORDER_LEVELS_SQL).fetchall()
 
 class ReorderLevelManager(QWidget):
     def __init__(self):
@@ -39,12 +46,13 @@ class ReorderLevelManager(QWidget):
         self.load_data()
 
     def load_data(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT product, quantity, reorder_level FROM stock")
-        data = cursor.fetchall()
-        conn.close()
+        query_executor().submit(
+            (self, "reorder_levels"), load_reorder_levels,
+            on_result=self.show_data,
+            on_error=self.report_failed,
+        )
 
+    def show_data(self, data):
         self.table.setRowCount(len(data))
         for row_idx, row_data in enumerate(data):
             for col_idx, value in enumerate(row_data):
@@ -52,6 +60,9 @@ class ReorderLevelManager(QWidget):
 
         self.table.resizeColumnsToContents()
 
+    def report_failed(self, error):
+        QMessageBox.critical(self, "Database Error", f"Failed to load reorder levels:\n{error}")
+
     def update_reorder_level(self):
         product = self.product_input.text().strip()
         reorder_level = self.reorder_input.text().strip()
@@ -66,28 +77,27 @@ class ReorderLevelManager(QWidget):
             QMessageBox.warning(self, "Input Error", "Reorder level must be a number.")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM stock WHERE product = ?", (product,))
-        result = cursor.fetchone()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE stock SET reorder_level = ? WHERE product = ?",
+                (reorder_level, product)
+            )
+            updated = cursor.rowcount
 
-        if not result:
+        if not updated:
             QMessageBox.warning(self, "Error", f"Product '{product}' not found in stock.")
-            conn.close()
             return
 
-        cursor.execute(
-            "UPDATE stock SET reorder_level = ? WHERE product = ?",
-            (reorder_level, product)
-        )
-        conn.commit()
-        conn.close()
-
         QMessageBox.information(self, "Success", f"Reorder level for '{product}' updated successfully.")
         self.product_input.clear()
         self.reorder_input.clear()
         self.load_data()
 
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = ReorderLevelManager()
@@ -0,0 +1,538 @@
+"""
+Versioned schema migrations keyed on PRAGMA user_version.
+
+migrate() reads one integer and returns straight away when the database is
+already at LATEST_VERSION. A brand-new database is created directly at the
+latest schema (LATEST_SCHEMA) instead of replaying every migration; an older
+database has each pending migration applied once, in order, inside its own
+transaction.
+
+To change the schema: add a function decorated with @migration(N) that
+takes an existing database from version N-1 to N, and update LATEST_SCHEMA
+so fresh databases match.
+"""
+import sqlite3
+
+from auth import hash_legacy_passwords, hash_password
+from rollups import backfill as backfill_rollups, create_rollup_tables
+from search_index import create_search_indexes, rebuild as rebuild_search_indexes
+from sequences import create_sequence_tables
+from supplier_products import create_supplier_product_tables, rebuild as rebuild_supplier_products
+
+DEFAULT_PRODUCTS = ["PMS", "AGO", "IK", "Gas"]
+
+MIGRATIONS = []
+
+
+def migration(version):
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return register
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_version(conn, version):
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+
+
+def add_missing_columns(conn, table, columns):
+    existing = table_columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def rename_legacy_column(conn, table, old, new):
+    existing = table_columns(conn, table)
+    if old in existing and new not in existing:
+        conn.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+
+
+def seed_defaults(conn):
+    conn.executemany(
+        "INSERT OR IGNORE INTO stock (product, quantity) VALUES (?, 0)",
+        [(product,) for product in DEFAULT_PRODUCTS]
+    )
+    if not conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        conn.execute(
+            "INSERT INTO users (username, password, password_hash, role) VALUES (?, '', ?, ?)",
+            ("admin", hash_password("admin123"), "Admin")
+        )
+
+
+# ---------------------------------------------------------------------------
+# Latest schema, used as-is for brand-new databases.
+# ---------------------------------------------------------------------------
+
+LATEST_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT,
+    password_hash TEXT,
+    role TEXT DEFAULT 'employee',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    phone TEXT,
+    email TEXT,
+    address TEXT
+);
+
+CREATE TABLE suppliers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_name TEXT,
+    contact_person TEXT,
+    phone TEXT,
+    email TEXT,
+    address TEXT,
+    products_supplied TEXT
+);
+
+CREATE TABLE stock (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT UNIQUE,
+    quantity REAL DEFAULT 0,
+    reorder_level REAL DEFAULT 500
+);
+
+CREATE TABLE sale_headers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_number INTEGER,
+    delivery_note_number INTEGER,
+    customer_name TEXT,
+    date TEXT,
+    total REAL,
+    line_count INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    sale_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL,
+    customer_id INTEGER
+);
+
+CREATE TABLE sale_lines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT,
+    quantity REAL,
+    price REAL,
+    total REAL,
+    date TEXT,
+    lpo_path TEXT,
+    invoice_path TEXT,
+    delivery_note_path TEXT,
+    receipt_path TEXT,
+    customer_name TEXT,
+    invoice_number INTEGER,
+    delivery_note_number INTEGER,
+    sale_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL,
+    header_id INTEGER REFERENCES sale_headers(id),
+    customer_id INTEGER
+);
+
+CREATE VIEW sales AS
+SELECT id, product, quantity, price, total, date, lpo_path, invoice_path, delivery_note_path,
+       receipt_path, customer_name, invoice_number, delivery_note_number, sale_day
+FROM sale_lines;
+
+CREATE TABLE purchases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT,
+    quantity REAL,
+    unit_price REAL,
+    total REAL,
+    supplier TEXT,
+    date TEXT,
+    lpo_path TEXT,
+    invoice_path TEXT,
+    delivery_note_path TEXT,
+    receipt_path TEXT,
+    purchase_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL
+);
+
+CREATE TABLE stock_movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('opening', 'sale', 'purchase', 'adjustment', 'transfer')),
+    quantity REAL NOT NULL,
+    reference TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+);
+
+CREATE TABLE stock_checkpoints (
+    product TEXT NOT NULL,
+    movement_id INTEGER NOT NULL,
+    balance REAL NOT NULL,
+    taken_at TEXT NOT NULL,
+    PRIMARY KEY (product, movement_id)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_sales_day ON sale_lines(sale_day);
+CREATE INDEX idx_sales_product_day ON sale_lines(product, sale_day);
+CREATE INDEX idx_sale_lines_header ON sale_lines(header_id);
+CREATE INDEX idx_sale_headers_day ON sale_headers(sale_day);
+CREATE INDEX idx_sale_headers_customer ON sale_headers(customer_id, sale_day);
+CREATE INDEX idx_sale_lines_customer ON sale_lines(customer_id, sale_day);
+CREATE INDEX idx_purchases_day ON purchases(purchase_day);
+CREATE INDEX idx_purchases_supplier ON purchases(supplier);
+CREATE INDEX idx_customers_name ON customers(name);
+CREATE INDEX idx_customers_name_nocase ON customers(name COLLATE NOCASE);
+CREATE INDEX idx_stock_movements_product ON stock_movements(product, id);
+CREATE INDEX idx_stock_checkpoints_taken ON stock_checkpoints(product, taken_at);
+"""
+
+
+def create_latest_schema(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in LATEST_SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        create_sequence_tables(conn)
+        create_rollup_tables(conn)
+        create_search_indexes(conn)
+        create_supplier_product_tables(conn)
+        seed_defaults(conn)
+        set_version(conn, LATEST_VERSION)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Migrations for existing databases.
+# ---------------------------------------------------------------------------
+
+@migration(1)
+def baseline(conn):
+    """
+    Brings any database created by the old create_tables / init_db /
+    fix_* scripts to one consistent schema.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT,
+            password_hash TEXT,
+            role TEXT DEFAULT 'employee',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    add_missing_columns(conn, "users", [
+        ("password", "TEXT"),
+        ("password_hash", "TEXT"),
+        ("role", "TEXT DEFAULT 'employee'"),
+        ("created_at", "TIMESTAMP"),
+    ])
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            phone TEXT,
+            email TEXT,
+            address TEXT
+        )
+    """)
+    rename_legacy_column(conn, "customers", "full_name", "name")
+    add_missing_columns(conn, "customers", [
+        ("phone", "TEXT"),
+        ("email", "TEXT"),
+        ("address", "TEXT"),
+    ])
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_name TEXT,
+            contact_person TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            products_supplied TEXT
+        )
+    """)
+    rename_legacy_column(conn, "suppliers", "name", "supplier_name")
+    rename_legacy_column(conn, "suppliers", "contact", "contact_person")
+    add_missing_columns(conn, "suppliers", [
+        ("contact_person", "TEXT"),
+        ("phone", "TEXT"),
+        ("email", "TEXT"),
+        ("address", "TEXT"),
+        ("products_supplied", "TEXT"),
+    ])
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT UNIQUE,
+            quantity REAL DEFAULT 0
+        )
+    """)
+    add_missing_columns(conn, "stock", [("reorder_level", "REAL DEFAULT 500")])
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT,
+            quantity REAL,
+            price REAL,
+            total REAL,
+            date TEXT
+        )
+    """)
+    add_missing_columns(conn, "sales", [
+        ("lpo_path", "TEXT"),
+        ("invoice_path", "TEXT"),
+        ("delivery_note_path", "TEXT"),
+        ("receipt_path", "TEXT"),
+        ("customer_name", "TEXT"),
+        ("invoice_number", "INTEGER"),
+        ("delivery_note_number", "INTEGER"),
+        ("sale_day", "INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL"),
+    ])
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS purchases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT,
+            quantity REAL,
+            unit_price REAL,
+            total REAL,
+            supplier TEXT,
+            date TEXT
+        )
+    """)
+    add_missing_columns(conn, "purchases", [
+        ("lpo_path", "TEXT"),
+        ("invoice_path", "TEXT"),
+        ("delivery_note_path", "TEXT"),
+        ("receipt_path", "TEXT"),
+        ("purchase_day", "INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL"),
+    ])
+
+    for name in ("idx_sales_date", "idx_sales_product_date", "idx_purchases_date"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_day ON sales(sale_day)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_product_day ON sales(product, sale_day)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchases_day ON purchases(purchase_day)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchases_supplier ON purchases(supplier)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name)")
+
+    create_sequence_tables(conn)
+    seed_defaults(conn)
+
+
+@migration(2)
+def stock_ledger(conn):
+    """
+    Append-only stock movements ledger with periodic balance checkpoints.
+    stock.quantity stays as the materialized balance; current balances are
+    carried into the ledger as opening movements.
+    """
+    conn.execute("""
+        CREATE TABLE stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('opening', 'sale', 'purchase', 'adjustment', 'transfer')),
+            quantity REAL NOT NULL,
+            reference TEXT,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE stock_checkpoints (
+            product TEXT NOT NULL,
+            movement_id INTEGER NOT NULL,
+            balance REAL NOT NULL,
+            taken_at TEXT NOT NULL,
+            PRIMARY KEY (product, movement_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX idx_stock_movements_product ON stock_movements(product, id)")
+    conn.execute("CREATE INDEX idx_stock_checkpoints_taken ON stock_checkpoints(product, taken_at)")
+    conn.execute("""
+        INSERT INTO stock_movements (product, kind, quantity, reference)
+        SELECT product, 'opening', quantity, 'migration'
+        FROM stock
+        WHERE quantity IS NOT NULL AND quantity != 0
+        ORDER BY product
+    """)
+
+
+# Rollup sources as of version 3; migration 4 renames sales to sale_lines
+# (SQLite rewrites the trigger bodies on rename).
+ROLLUPS_V3 = [
+    ("sales_daily", "sales", "sale_day", "product", "total"),
+    ("purchases_daily", "purchases", "purchase_day", "supplier", "total"),
+]
+
+
+@migration(3)
+def daily_rollups(conn):
+    """Trigger-maintained sales_daily / purchases_daily rollups, backfilled from history."""
+    create_rollup_tables(conn, ROLLUPS_V3)
+    backfill_rollups(conn, ROLLUPS_V3)
+
+
+@migration(4)
+def basket_sales(conn):
+    """
+    Multi-line sales: sales becomes sale_lines, each line belonging to a
+    sale_headers row that carries the invoice / delivery note numbers. Every
+    existing sale becomes a one-line basket with the same id. A read-only
+    sales view keeps the old column set for ad-hoc tools.
+    """
+    conn.execute("ALTER TABLE sales RENAME TO sale_lines")
+    conn.execute("ALTER TABLE sale_lines ADD COLUMN header_id INTEGER REFERENCES sale_headers(id)")
+    conn.execute("""
+        CREATE TABLE sale_headers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_number INTEGER,
+            delivery_note_number INTEGER,
+            customer_name TEXT,
+            date TEXT,
+            total REAL,
+            line_count INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            sale_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO sale_headers (id, invoice_number, delivery_note_number, customer_name, date, total, line_count)
+        SELECT id, invoice_number, delivery_note_number, customer_name, date, total, 1
+        FROM sale_lines
+    """)
+    conn.execute("UPDATE sale_lines SET header_id = id")
+    conn.execute("CREATE INDEX idx_sale_lines_header ON sale_lines(header_id)")
+    conn.execute("CREATE INDEX idx_sale_headers_day ON sale_headers(sale_day)")
+    conn.execute("""
+        CREATE VIEW sales AS
+        SELECT id, product, quantity, price, total, date, lpo_path, invoice_path, delivery_note_path,
+               receipt_path, customer_name, invoice_number, delivery_note_number, sale_day
+        FROM sale_lines
+    """)
+
+
+@migration(5)
+def search_indexes(conn):
+    """Trigram FTS5 indexes over customers and suppliers for search-as-you-type, filled from the tables."""
+    create_search_indexes(conn)
+    rebuild_search_indexes(conn)
+
+
+@migration(6)
+def customer_name_completion(conn):
+    """Case-insensitive name index so the sale window can complete customer names by prefix."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)")
+
+
+@migration(7)
+def sale_customer_ids(conn):
+    """
+    Sales point at their customer by id. customer_id is added to
+    sale_headers and sale_lines and filled by matching customer_name;
+    names that never made it into customers (older tills) get a customer
+    row first. customer_name stays as the name printed at the time of sale.
+
+    customer_id is a plain column, not a foreign key (foreign_keys is off
+    on every connection): deleting a customer keeps their sales, which then
+    show the stored customer_name.
+    """
+    conn.execute("ALTER TABLE sale_headers ADD COLUMN customer_id INTEGER")
+    conn.execute("ALTER TABLE sale_lines ADD COLUMN customer_id INTEGER")
+    conn.execute("""
+        INSERT INTO customers (name)
+        SELECT DISTINCT customer_name FROM sale_headers h
+        WHERE customer_name <> ''
+          AND NOT EXISTS (SELECT 1 FROM customers c WHERE c.name = h.customer_name)
+    """)
+    conn.execute("""
+        UPDATE sale_headers
+        SET customer_id = (SELECT MIN(c.id) FROM customers c WHERE c.name = sale_headers.customer_name)
+    """)
+    conn.execute("""
+        UPDATE sale_lines
+        SET customer_id = (SELECT h.customer_id FROM sale_headers h WHERE h.id = sale_lines.header_id)
+    """)
+    conn.execute("CREATE INDEX idx_sale_headers_customer ON sale_headers(customer_id, sale_day)")
+    conn.execute("CREATE INDEX idx_sale_lines_customer ON sale_lines(customer_id, sale_day)")
+
+
+@migration(8)
+def supplier_product_map(conn):
+    """supplier_products (product, supplier_id), parsed from each supplier's products_supplied text."""
+    create_supplier_product_tables(conn)
+    rebuild_supplier_products(conn)
+
+
+@migration(9)
+def hashed_passwords(conn):
+    """
+    Replaces plaintext users.password values with bcrypt hashes. Older
+    databases declare password NOT NULL, so it is blanked rather than
+    nulled.
+    """
+    hash_legacy_passwords(conn)
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """
+    Brings the database on `conn` (an autocommit connection) to LATEST_VERSION
+    and returns the version it started from.
+    """
+    version = get_version(conn)
+    if version == LATEST_VERSION:
+        return version
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this app supports ({LATEST_VERSION})."
+        )
+
+    if version == 0 and not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+        create_latest_schema(conn)
+        return version
+
+    for target, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fn(conn)
+            set_version(conn, target)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    conn.execute("ANALYZE")
+    return version
+
+
+if __name__ == "__main__":
+    import sys
+    from database import DB_FILE
+
+    db_file = sys.argv[1] if len(sys.argv) > 1 else DB_FILE
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    start = migrate(conn)
+    conn.close()
+    if start == LATEST_VERSION:
+        print(f"ℹ️ {db_file} is already at schema version {LATEST_VERSION}.")
+    else:
+        print(f"✅ {db_file} migrated from schema version {start} to {LATEST_VERSION}.")
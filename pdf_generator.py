@@ -4,11 +4,14 @@ from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
+from reportlab.lib.units import cm, inch
 from datetime import datetime
 import qrcode
 import io
 import os
+import threading
+
+from qr_codes import qr_drawing
 
 def format_currency(amount):
     return f"Ksh. {amount:,.2f}"
@@ -22,7 +25,16 @@ def add_paid_watermark(canvas, doc):
     canvas.drawCentredString(0, 0, "PAID")
     canvas.restoreState()
 
+def sale_items(sale_data):
+    """Lines of a sale: its 'items' list (baskets), or the sale itself for single-product sales."""
+    return sale_data.get('items') or [sale_data]
+
+def default_qr_data(number, data):
+    """Payload encoded when a document is generated without explicit qr_data."""
+    return f"{number}-{data['customer_name']}-{data['date']}"
+
 def generate_qr_code(data):
+    """PNG of a QR code, for callers that need an image file; documents use qr_codes.qr_drawing."""
     qr = qrcode.QRCode(box_size=4, border=2)
     qr.add_data(data)
     qr.make(fit=True)
@@ -32,48 +44,159 @@ def generate_qr_code(data):
     buf.seek(0)
     return buf
 
-def add_company_header(elements, styles, branch_info=None, doc_type="Document", doc_number=None):
-    logo_path = os.path.join(os.getcwd(), "logo.png")
-    if os.path.exists(logo_path):
-        img = Image(logo_path, width=3.5*cm, height=3.5*cm)
-    else:
-        img = Paragraph("", styles['Normal'])
-
-    header_right = []
-    header_right.append(Paragraph("<b>Magen Business Enterprise</b>", styles['Title']))
-
-    if branch_info:
-        header_right.append(Paragraph(branch_info["name"], styles['Normal']))
-        header_right.append(Paragraph(branch_info["address"], styles['Normal']))
-        header_right.append(Paragraph(branch_info["contacts"], styles['Normal']))
-    else:
-        header_right.append(Paragraph("P.O Box 3936-40100, Kisumu, Kenya", styles['Normal']))
-        header_right.append(Paragraph("Tel: +254727292536 | Email: info@magenbusiness.co.ke", styles['Normal']))
-
-    header_table = Table(
-        [[img, header_right]],
-        colWidths=[4.5*cm, 11.5*cm]
-    )
-
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (1, 0), (-1, -1), 'LEFT'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 1),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 1),
-        ('TOPPADDING', (0, 0), (-1, -1), 1),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-    ]))
-
-    elements.append(header_table)
+# Printed logo size and the resolution it is pre-scaled to.
+LOGO_SIZE = 3.5*cm
+LOGO_DPI = 300
+
+TABLE_HEADER_COLORS = {
+    "invoice": "#0A4D68",
+    "delivery_note": "#14532d",
+    "lpo": "#5B21B6",
+}
+
+
+def load_logo(logo_path, size=LOGO_SIZE, dpi=LOGO_DPI):
+    """
+    Decodes the logo once and downsamples it to what `size` needs at `dpi`,
+    so each PDF embeds a small image instead of the full-size original.
+    """
+    from PIL import Image as PILImage
+
+    pixels = int(round(size / inch * dpi))
+    with PILImage.open(logo_path) as logo:
+        logo.thumbnail((pixels, pixels), PILImage.LANCZOS)
+        buf = io.BytesIO()
+        logo.save(buf, format='PNG', optimize=True)
+    buf.seek(0)
+    # lazy=0 keeps the decoded image on the flowable for every later build.
+    return Image(buf, width=size, height=size, lazy=0)
+
+
+class DocumentTemplate:
+    """
+    Resources shared by every document printed for one branch: style
+    sheets, table styles, the company header (with the pre-scaled logo),
+    signature blocks and footers. Built once per branch_info by
+    get_template() and reused; none of it may be modified per document.
+    """
+
+    def __init__(self, branch_info=None):
+        self.styles = getSampleStyleSheet()
+        self.signature_style = ParagraphStyle(name="Signature", fontSize=12, spaceAfter=20)
+        self.footer_style = ParagraphStyle(name="Footer", alignment=1, fontSize=10, textColor=colors.grey)
+
+        self.table_styles = {
+            kind: TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(color)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ])
+            for kind, color in TABLE_HEADER_COLORS.items()
+        }
+
+        self.header = self._build_header(branch_info)
+        self.signatures = {
+            "invoice": self._paragraphs(self.signature_style, [
+                "Customer Signature: ___________________________",
+                "Authorized Signature: ___________________________",
+            ]),
+            "delivery_note": self._paragraphs(self.signature_style, [
+                "Customer Signature: ___________________________",
+                "Driver Signature: ___________________________",
+            ]),
+            "lpo": self._paragraphs(self.signature_style, [
+                "Authorized Signature: ___________________________",
+                "Customer Signature: ___________________________",
+            ]),
+        }
+        self.footers = {
+            "invoice": self._paragraphs(self.footer_style, [
+                "Thank you for your business.",
+                "Magen Business Enterprise | Reliable. Efficient. Affordable.",
+            ]),
+            "delivery_note": self._paragraphs(self.footer_style, [
+                "Goods delivered in good condition.",
+                "Magen Fuel Enterprise | Reliable. Efficient. Affordable.",
+            ]),
+        }
+        self.footers["lpo"] = self.footers["invoice"]
+
+    @staticmethod
+    def _paragraphs(style, lines):
+        return [Paragraph(line, style) for line in lines]
+
+    def _build_header(self, branch_info):
+        styles = self.styles
+        logo_path = os.path.join(os.getcwd(), "logo.png")
+        if os.path.exists(logo_path):
+            img = load_logo(logo_path)
+        else:
+            img = Paragraph("", styles['Normal'])
+
+        header_right = []
+        header_right.append(Paragraph("<b>Magen Business Enterprise</b>", styles['Title']))
+
+        if branch_info:
+            header_right.append(Paragraph(branch_info["name"], styles['Normal']))
+            header_right.append(Paragraph(branch_info["address"], styles['Normal']))
+            header_right.append(Paragraph(branch_info["contacts"], styles['Normal']))
+        else:
+            header_right.append(Paragraph("P.O Box 3936-40100, Kisumu, Kenya", styles['Normal']))
+            header_right.append(Paragraph("Tel: +254727292536 | Email: info@magenbusiness.co.ke", styles['Normal']))
+
+        header_table = Table(
+            [[img, header_right]],
+            colWidths=[4.5*cm, 11.5*cm]
+        )
+
+        header_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (1, 0), (-1, -1), 'LEFT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 1),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 1),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ]))
+        return header_table
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(branch_info=None):
+    """The cached DocumentTemplate for a branch (None = head office)."""
+    key = tuple(sorted(branch_info.items())) if branch_info else None
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = _templates[key] = DocumentTemplate(branch_info)
+    return template
+
+
+def clear_template_cache():
+    """Drops cached templates, e.g. after logo.png or branch details change."""
+    with _templates_lock:
+        _templates.clear()
+
+
+def add_company_header(elements, styles=None, branch_info=None, doc_type="Document", doc_number=None):
+    elements.append(get_template(branch_info).header)
     elements.append(Spacer(1, 12))
 
 def generate_invoice_pdf_document(invoice_number, sale_data, filename, paid=False, branch_info=None, qr_data=None, include_t_and_c=False):
     doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    template = get_template(branch_info)
+    styles = template.styles
     elements = []
 
     if qr_data is None:
-        qr_data = f"{invoice_number}-{sale_data['customer_name']}-{sale_data['date']}"
+        qr_data = default_qr_data(invoice_number, sale_data)
 
     add_company_header(elements, styles, branch_info, "Invoice", invoice_number)
 
@@ -81,44 +204,32 @@ def generate_invoice_pdf_document(invoice_number, sale_data, filename, paid=Fals
     elements.append(Paragraph(f"<b>Transaction Date:</b> {sale_data['date']}", styles['Normal']))
     elements.append(Spacer(1, 12))
 
-    data = [
-        ["Product", "Quantity (Litres)", "Price per Unit", "Total"],
-        [
-            sale_data['product'],
-            str(sale_data['quantity']),
-            format_currency(float(sale_data['price'])),
-            format_currency(float(sale_data['total']))
-        ]
-    ]
+    items = sale_items(sale_data)
+    data = [["Product", "Quantity (Litres)", "Price per Unit", "Total"]]
+    for item in items:
+        data.append([
+            item['product'],
+            str(item['quantity']),
+            format_currency(float(item['price'])),
+            format_currency(float(item['total']))
+        ])
+    if len(items) > 1:
+        data.append(["", "", "Invoice Total", format_currency(sum(float(item['total']) for item in items))])
 
     table = Table(data, colWidths=[140, 100, 120, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0A4D68")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
+    table.setStyle(template.table_styles["invoice"])
 
     elements.append(table)
     elements.append(Spacer(1, 24))
 
-    signature_style = ParagraphStyle(name="Signature", fontSize=12, spaceAfter=20)
-    elements.append(Paragraph("Customer Signature: ___________________________", signature_style))
-    elements.append(Paragraph("Authorized Signature: ___________________________", signature_style))
+    elements.extend(template.signatures["invoice"])
     elements.append(Spacer(1, 12))
 
     if qr_data:
-        qr_buf = generate_qr_code(qr_data)
-        qr_img = Image(qr_buf, width=4*cm, height=4*cm)
-        qr_img.hAlign = 'RIGHT'
-        elements.append(qr_img)
+        elements.append(qr_drawing(qr_data, 4*cm))
         elements.append(Spacer(1, 12))
 
-    footer_style = ParagraphStyle(name="Footer", alignment=1, fontSize=10, textColor=colors.grey)
-    elements.append(Paragraph("Thank you for your business.", footer_style))
-    elements.append(Paragraph("Magen Business Enterprise | Reliable. Efficient. Affordable.", footer_style))
+    elements.extend(template.footers["invoice"])
 
     if paid:
         doc.build(elements, onFirstPage=add_paid_watermark)
@@ -145,11 +256,12 @@ def generate_invoice_pdf_document(invoice_number, sale_data, filename, paid=Fals
 
 def generate_delivery_note_pdf_document(delivery_note_number, sale_data, filename, branch_info=None, qr_data=None):
     doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    template = get_template(branch_info)
+    styles = template.styles
     elements = []
 
     if qr_data is None:
-        qr_data = f"{delivery_note_number}-{sale_data['customer_name']}-{sale_data['date']}"
+        qr_data = default_qr_data(delivery_note_number, sale_data)
 
     add_company_header(elements, styles, branch_info, "Delivery Note", delivery_note_number)
 
@@ -157,50 +269,36 @@ def generate_delivery_note_pdf_document(delivery_note_number, sale_data, filenam
     elements.append(Paragraph(f"<b>Transaction Date:</b> {sale_data['date']}", styles['Normal']))
     elements.append(Spacer(1, 12))
 
-    data = [
-        ["Product", "Quantity (Litres)"],
-        [sale_data['product'], str(sale_data['quantity'])]
-    ]
+    data = [["Product", "Quantity (Litres)"]]
+    for item in sale_items(sale_data):
+        data.append([item['product'], str(item['quantity'])])
 
     table = Table(data, colWidths=[250, 250])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#14532d")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
+    table.setStyle(template.table_styles["delivery_note"])
 
     elements.append(table)
     elements.append(Spacer(1, 24))
 
-    signature_style = ParagraphStyle(name="Signature", fontSize=12, spaceAfter=20)
-    elements.append(Paragraph("Customer Signature: ___________________________", signature_style))
-    elements.append(Paragraph("Driver Signature: ___________________________", signature_style))
+    elements.extend(template.signatures["delivery_note"])
     elements.append(Spacer(1, 12))
 
     if qr_data:
-        qr_buf = generate_qr_code(qr_data)
-        qr_img = Image(qr_buf, width=4*cm, height=4*cm)
-        qr_img.hAlign = 'RIGHT'
-        elements.append(qr_img)
+        elements.append(qr_drawing(qr_data, 4*cm))
         elements.append(Spacer(1, 12))
 
-    footer_style = ParagraphStyle(name="Footer", alignment=1, fontSize=10, textColor=colors.grey)
-    elements.append(Paragraph("Goods delivered in good condition.", footer_style))
-    elements.append(Paragraph("Magen Fuel Enterprise | Reliable. Efficient. Affordable.", footer_style))
+    elements.extend(template.footers["delivery_note"])
 
     doc.build(elements)
 
 # New: Generate LPO PDF document
 def generate_lpo_pdf_document(lpo_number, lpo_data, filename, branch_info=None, qr_data=None):
     doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    template = get_template(branch_info)
+    styles = template.styles
     elements = []
 
     if qr_data is None:
-        qr_data = f"{lpo_number}-{lpo_data['customer_name']}-{lpo_data['date']}"
+        qr_data = default_qr_data(lpo_number, lpo_data)
 
     add_company_header(elements, styles, branch_info, "Local Purchase Order", lpo_number)
 
@@ -218,32 +316,18 @@ def generate_lpo_pdf_document(lpo_number, lpo_data, filename, branch_info=None,
         ])
 
     table = Table(data, colWidths=[140, 100, 120, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5B21B6")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
+    table.setStyle(template.table_styles["lpo"])
 
     elements.append(table)
     elements.append(Spacer(1, 24))
 
-    signature_style = ParagraphStyle(name="Signature", fontSize=12, spaceAfter=20)
-    elements.append(Paragraph("Authorized Signature: ___________________________", signature_style))
-    elements.append(Paragraph("Customer Signature: ___________________________", signature_style))
+    elements.extend(template.signatures["lpo"])
     elements.append(Spacer(1, 12))
 
     if qr_data:
-        qr_buf = generate_qr_code(qr_data)
-        qr_img = Image(qr_buf, width=4*cm, height=4*cm)
-        qr_img.hAlign = 'RIGHT'
-        elements.append(qr_img)
+        elements.append(qr_drawing(qr_data, 4*cm))
         elements.append(Spacer(1, 12))
 
-    footer_style = ParagraphStyle(name="Footer", alignment=1, fontSize=10, textColor=colors.grey)
-    elements.append(Paragraph("Thank you for your business.", footer_style))
-    elements.append(Paragraph("Magen Business Enterprise | Reliable. Efficient. Affordable.", footer_style))
+    elements.extend(template.footers["lpo"])
 
     doc.build(elements)
@@ -4,14 +4,25 @@ from PyQt5.QtWidgets import (
     QMessageBox, QComboBox, QDateEdit, QFormLayout
 )
 from PyQt5.QtCore import QDate
-import sqlite3
 import sys
 import os
 
-from pdf_generator import generate_lpo_pdf_document
+from database import transaction
+from events import PURCHASE_RECORDED, publish_on_commit
+from document_service import document_service, LPO as LPO_DOCUMENT, LPO_BRANCH_INFO
+from sequences import allocator, LPO
+from stock_manager import increment_stock
+from supplier_products import suppliers_for_product
+from qt_events import event_bridge
+from query_executor import query_executor
 from themes import apply_gradient_theme
 
-DATABASE_NAME = "magen.db"
+def fetch_supplier_names(conn, product):
+    """Suppliers of `product`; every supplier when none is recorded for it yet."""
+    return (
+        suppliers_for_product(conn, product)
+        or [row[0] for row in conn.execute("SELECT supplier_name FROM suppliers ORDER BY supplier_name")]
+    )
 
 class PurchasesWindow(QWidget):
     def __init__(self):
@@ -21,18 +32,25 @@ class PurchasesWindow(QWidget):
         self.init_ui()
         apply_gradient_theme(self)
 
+        bridge = event_bridge()
+        bridge.document_ready.connect(self.on_document_ready)
+        bridge.document_failed.connect(self.on_document_failed)
+        self.pending_documents = {}
+
     def fetch_suppliers(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT supplier_name FROM suppliers")
-        suppliers = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return suppliers
-
-    def generate_lpo_pdf(self, purchase_id, product, quantity, unit_price, total, supplier, date):
+        query_executor().submit(
+            (self, "suppliers"), fetch_supplier_names, self.product_input.currentText(),
+            on_result=self.show_suppliers,
+            on_error=lambda error: QMessageBox.warning(self, "Database Error", f"Failed to load suppliers:\n{error}"),
+        )
+
+    def show_suppliers(self, names):
+        self.supplier_input.clear()
+        self.supplier_input.addItems(names)
+
+    def generate_lpo_pdf(self, lpo_number, file_path, product, quantity, unit_price, total, supplier, date):
         if not os.path.exists("purchases_lpos"):
             os.makedirs("purchases_lpos")
-        file_path = f"purchases_lpos/LPO_{purchase_id}.pdf"
 
         lpo_data = {
             "customer_name": supplier,
@@ -47,18 +65,19 @@ class PurchasesWindow(QWidget):
             ]
         }
 
-        generate_lpo_pdf_document(
-            lpo_number=purchase_id,
-            lpo_data=lpo_data,
-            filename=file_path,
-            branch_info={
-                "name": "Magen Fuel Enterprise",
-                "address": "P.O Box 12345-00100, Nairobi, Kenya",
-                "contacts": "Tel: +254 700 123456 | Email: info@magenfuel.co.ke"
-            }
+        job = document_service.submit(
+            LPO_DOCUMENT, lpo_number, lpo_data, file_path,
+            branch_info=LPO_BRANCH_INFO
         )
+        self.pending_documents[job.job_id] = job
+
+    def on_document_ready(self, job):
+        if self.pending_documents.pop(job.job_id, None) is not None:
+            QMessageBox.information(self, "LPO Generated", f"LPO PDF generated at:\n{job.file_path}")
 
-        QMessageBox.information(self, "LPO Generated", f"LPO PDF generated at:\n{file_path}")
+    def on_document_failed(self, job):
+        if self.pending_documents.pop(job.job_id, None) is not None:
+            QMessageBox.warning(self, "LPO Error", f"Failed to generate {job.file_path}:\n{job.error}")
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -67,6 +86,7 @@ class PurchasesWindow(QWidget):
 
         self.product_input = QComboBox()
         self.product_input.addItems(["PMS", "AGO", "IK", "Gas"])
+        self.product_input.currentTextChanged.connect(lambda _product: self.fetch_suppliers())
         form_layout.addRow("Select Product:", self.product_input)
 
         self.quantity_input = QLineEdit()
@@ -78,7 +98,7 @@ class PurchasesWindow(QWidget):
         form_layout.addRow("Unit Price:", self.unit_price_input)
 
         self.supplier_input = QComboBox()
-        self.supplier_input.addItems(self.fetch_suppliers())
+        self.fetch_suppliers()
         form_layout.addRow("Select Supplier:", self.supplier_input)
 
         self.date_picker = QDateEdit(calendarPopup=True)
@@ -109,32 +129,33 @@ class PurchasesWindow(QWidget):
             unit_price_val = float(unit_price)
             total = quantity_val * unit_price_val
 
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
+            allocator.reserve(LPO)
+            lpo_number = None
+            try:
+                with transaction() as conn:
+                    cursor = conn.cursor()
 
-            cursor.execute("""
-                INSERT INTO purchases (product, quantity, unit_price, total, supplier, date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (product, quantity_val, unit_price_val, total, supplier, date))
+                    lpo_number = allocator.take(conn, LPO)
+                    lpo_path = f"purchases_lpos/LPO_{lpo_number}.pdf"
 
-            purchase_id = cursor.lastrowid
+                    cursor.execute("""
+                        INSERT INTO purchases (product, quantity, unit_price, total, supplier, date, lpo_path)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (product, quantity_val, unit_price_val, total, supplier, date, lpo_path))
 
-            cursor.execute("SELECT quantity FROM stock WHERE product = ?", (product,))
-            result = cursor.fetchone()
-            if result:
-                new_quantity = result[0] + quantity_val
-                cursor.execute("UPDATE stock SET quantity = ? WHERE product = ?", (new_quantity, product))
-            else:
-                default_reorder_level = 450
-                cursor.execute(
-                    "INSERT INTO stock (product, quantity, reorder_level) VALUES (?, ?, ?)",
-                    (product, quantity_val, default_reorder_level)
-                )
+                    purchase_id = cursor.lastrowid
 
-            conn.commit()
-            conn.close()
+                    increment_stock(conn, product, quantity_val, f"purchase:{purchase_id}")
+                    publish_on_commit(PURCHASE_RECORDED, {
+                        'id': purchase_id, 'lpo_number': lpo_number, 'product': product,
+                        'quantity': quantity_val, 'total': total, 'supplier': supplier, 'date': date
+                    })
+            except Exception:
+                if lpo_number is not None:
+                    allocator.put_back(LPO, lpo_number)
+                raise
 
-            self.generate_lpo_pdf(purchase_id, product, quantity_val, unit_price_val, total, supplier, date)
+            self.generate_lpo_pdf(lpo_number, lpo_path, product, quantity_val, unit_price_val, total, supplier, date)
 
             QMessageBox.information(self, "Success", "Purchase recorded and stock updated successfully.")
             self.clear_fields()
@@ -142,6 +163,10 @@ class PurchasesWindow(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error saving purchase: {e}")
 
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
+
     def clear_fields(self):
         self.quantity_input.clear()
         self.unit_price_input.clear()
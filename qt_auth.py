@@ -0,0 +1,55 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from auth import authenticate
+
+
+class LoginSignals(QObject):
+    succeeded = pyqtSignal(object)
+    rejected = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class LoginTask(QRunnable):
+    """Runs auth.authenticate() off the Qt thread; the bcrypt check takes the whole hash cost."""
+
+    def __init__(self, username, password):
+        super().__init__()
+        self.username = username
+        self.password = password
+        self.signals = LoginSignals()
+
+    def run(self):
+        try:
+            user = authenticate(self.username, self.password)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        if user is None:
+            self.signals.rejected.emit()
+        else:
+            self.signals.succeeded.emit(user)
+
+
+_thread_pool = None
+
+
+def login_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(1)
+    return _thread_pool
+
+
+def start_login(username, password, on_success, on_rejected, on_error):
+    """
+    Checks the credentials in the background. Exactly one of
+    on_success(user), on_rejected() or on_error(message) is then called on
+    the Qt thread.
+    """
+    task = LoginTask(username, password)
+    task.signals.succeeded.connect(on_success)
+    task.signals.rejected.connect(on_rejected)
+    task.signals.failed.connect(on_error)
+    login_thread_pool().start(task)
+    return task
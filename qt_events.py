@@ -0,0 +1,47 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+import events
+
+# How often to look for commits made by other tills (PRAGMA data_version).
+DATA_VERSION_POLL_MS = 2000
+
+
+class QtEventBridge(QObject):
+    """
+    Re-emits event bus topics as Qt signals. Signals are delivered queued to
+    widgets living in the GUI thread, so publishing from a worker thread is
+    safe.
+    """
+    sale_recorded = pyqtSignal(object)
+    purchase_recorded = pyqtSignal(object)
+    stock_changed = pyqtSignal(object)
+    customers_changed = pyqtSignal(object)
+    database_changed = pyqtSignal(object)
+    document_ready = pyqtSignal(object)
+    document_failed = pyqtSignal(object)
+
+    def __init__(self, poll_interval=DATA_VERSION_POLL_MS, parent=None):
+        super().__init__(parent)
+        for topic in (
+            events.SALE_RECORDED, events.PURCHASE_RECORDED, events.STOCK_CHANGED,
+            events.CUSTOMERS_CHANGED, events.DATABASE_CHANGED,
+            events.DOCUMENT_READY, events.DOCUMENT_FAILED,
+        ):
+            events.subscribe(topic, getattr(self, topic).emit)
+
+        self.watcher = events.DataVersionWatcher()
+        self.watcher.check()
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.watcher.check)
+        self.poll_timer.start(poll_interval)
+
+
+_bridge = None
+
+
+def event_bridge():
+    """The application's bridge, created on first use (needs a QApplication)."""
+    global _bridge
+    if _bridge is None:
+        _bridge = QtEventBridge()
+    return _bridge
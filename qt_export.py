@@ -0,0 +1,149 @@
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+
+from csv_export import ExportCancelled, count_rows, export_csv
+from database import DB_FILE, get_pool
+
+PDF_FILTER = "PDF Files (*.pdf)"
+
+CSV_FILTER = "CSV Files (*.csv);;Compressed CSV (*.csv.gz)"
+
+
+def ask_csv_path(parent, title, default_filename=""):
+    """Save dialog for an export; choosing the compressed filter gives a .csv.gz path."""
+    path, selected_filter = QFileDialog.getSaveFileName(parent, title, default_filename, CSV_FILTER)
+    if path and selected_filter.endswith("(*.csv.gz)") and not path.lower().endswith(".gz"):
+        path += ".gz"
+    return path
+
+
+class ExportSignals(QObject):
+    counted = pyqtSignal(int)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class ExportTask(QRunnable):
+    """
+    Runs `export(conn, progress, is_cancelled)` (a csv_export or report_pdf
+    writer returning the number of rows) on a worker thread with a
+    read-only pooled connection. The connection reads one WAL snapshot for
+    the whole export, so tills can keep committing while it runs.
+    """
+
+    def __init__(self, export, path, count_sql=None, count_params=(), db_file=DB_FILE):
+        super().__init__()
+        self.export = export
+        self.path = path
+        self.count_sql = count_sql
+        self.count_params = count_params
+        self.db_file = db_file
+        self.signals = ExportSignals()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self):
+        try:
+            with get_pool(self.db_file, read_only=True).connection() as conn:
+                with self._lock:
+                    self._conn = conn
+                try:
+                    conn.execute("BEGIN")  # one snapshot for the count and the rows
+                    if self.count_sql:
+                        self.signals.counted.emit(count_rows(conn, self.count_sql, self.count_params))
+                    rows = self.export(conn, self.signals.progress.emit, lambda: self._cancelled)
+                    conn.execute("COMMIT")
+                finally:
+                    with self._lock:
+                        self._conn = None
+        except Exception as e:
+            if self._cancelled or isinstance(e, ExportCancelled):
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.path, rows)
+
+
+_thread_pool = None
+
+
+def export_thread_pool():
+    """One export at a time, kept off query_executor so long exports never hold up window reads."""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(1)
+    return _thread_pool
+
+
+def start_export(parent, title, export, path, count_sql=None, count_params=()):
+    """
+    Starts a background export with a progress dialog (its Cancel button
+    stops the export) and reports the outcome with a message box.
+    """
+    task = ExportTask(export, path, count_sql, count_params)
+
+    dialog = QProgressDialog(f"Exporting to {os.path.basename(path)}...", "Cancel", 0, 0, parent)
+    dialog.setWindowTitle(title)
+    dialog.setWindowModality(Qt.NonModal)
+    dialog.setMinimumDuration(500)
+    dialog.canceled.connect(task.cancel)
+
+    def counted(total):
+        dialog.setMaximum(max(total, 1))
+
+    def progress(rows):
+        if dialog.maximum():
+            dialog.setValue(min(rows, dialog.maximum()))
+        dialog.setLabelText(f"Exporting to {os.path.basename(path)}... {rows:,} rows")
+
+    def finished(file_path, rows):
+        dialog.reset()
+        QMessageBox.information(parent, "Export Complete", f"{rows:,} rows exported to:\n{file_path}")
+
+    def failed(error):
+        dialog.reset()
+        QMessageBox.critical(parent, "Error", f"{title} failed:\n{error}")
+
+    task.signals.counted.connect(counted)
+    task.signals.progress.connect(progress)
+    task.signals.finished.connect(finished)
+    task.signals.failed.connect(failed)
+    task.signals.cancelled.connect(dialog.reset)
+
+    export_thread_pool().start(task)
+    return task
+
+
+def start_csv_export(parent, sql, params, headers, path, count_sql=None, count_params=()):
+    def export(conn, progress, is_cancelled):
+        return export_csv(conn, sql, params, headers, path, progress=progress, is_cancelled=is_cancelled)
+
+    return start_export(parent, "Export CSV", export, path, count_sql, count_params)
+
+
+def start_pdf_export(parent, sql, params, headers, path, title, subtitle="", amount_column=None,
+                     count_sql=None, count_params=()):
+    # Imported here so windows that only export CSV never load reportlab.
+    from report_pdf import export_report_pdf
+
+    def export(conn, progress, is_cancelled):
+        return export_report_pdf(
+            conn, sql, params, headers, path, title, subtitle, amount_column,
+            progress=progress, is_cancelled=is_cancelled,
+        )
+
+    return start_export(parent, "Export PDF", export, path, count_sql, count_params)
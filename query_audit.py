@@ -0,0 +1,112 @@
+"""
+EXPLAIN QUERY PLAN audit for the hot queries of the app.
+
+Runs every registered query through EXPLAIN QUERY PLAN and exits non-zero
+when any of them falls back to a full SCAN of a table or index.
+
+    python query_audit.py [path/to/magen.db]
+"""
+import sys
+import sqlite3
+
+from database import DB_FILE
+from generate_z_report import Z_REPORT_SQL
+from rollups import MONTHLY_PURCHASES_SQL, MONTHLY_SALES_SQL
+from report_queries import (
+    CUSTOMER_HISTORY_SQL, CUSTOMER_STATEMENT_SQL, PAGE_SIZE, PURCHASES_SUMMARY_SQL, SALES_SUMMARY_SQL,
+    purchases_report, sales_report,
+)
+from sale_service import BASKET_LINES_SQL, CUSTOMER_ID_SQL
+from search_index import COMPLETION_LIMIT, CUSTOMER_COMPLETION_SQL
+from stock_manager import CHECKPOINT_BEFORE_SQL, MOVEMENTS_SINCE_SQL
+from supplier_products import SUPPLIERS_FOR_PRODUCT_SQL
+
+# Sample date range (epoch days, January 2024) and a year for the rollups.
+START_DAY, END_DAY, YEAR_END_DAY = 19723, 19753, 20088
+
+
+def report_page_queries(label, report):
+    """
+    The first page and a following page of `report` in every order the
+    reports window can sort it by, exactly as ReportQuery builds them.
+    """
+    queries = {}
+    for column in sorted(report.sort_keys):
+        for descending in (False, True):
+            query = report.sorted(column, descending)
+            order = f"{label} by {query.headers[column]}{' descending' if descending else ''}"
+            after_key = (0,) * len(query.key_expressions())
+            queries[f"{order}, first page"] = (query.page_sql(), query.params + (PAGE_SIZE,))
+            queries[f"{order}, next page"] = (query.page_sql(after_key), query.params + after_key + (PAGE_SIZE,))
+    return queries
+
+
+# name -> (sql, sample parameters), taken from the modules that run them.
+HOT_QUERIES = {
+    **report_page_queries("sales report", sales_report(START_DAY, END_DAY)),
+    **report_page_queries("purchases report", purchases_report(START_DAY, END_DAY)),
+    "sales report summary": (SALES_SUMMARY_SQL, (START_DAY, END_DAY)),
+    "purchases report summary": (PURCHASES_SUMMARY_SQL, (START_DAY, END_DAY)),
+    "Z report day summary": (Z_REPORT_SQL, (START_DAY,)),
+    "monthly sales from rollup": (MONTHLY_SALES_SQL, (START_DAY, YEAR_END_DAY)),
+    "monthly purchases from rollup": (MONTHLY_PURCHASES_SQL, (START_DAY, YEAR_END_DAY)),
+    "sale customer lookup by name": (CUSTOMER_ID_SQL, ("Customer",)),
+    "sale lines of a basket": (BASKET_LINES_SQL, (1,)),
+    "customer name completion": (CUSTOMER_COMPLETION_SQL, ("Cust%", COMPLETION_LIMIT)),
+    "customer statement": (CUSTOMER_STATEMENT_SQL, (1,)),
+    "customer purchase history": (CUSTOMER_HISTORY_SQL, (1,)),
+    "suppliers of a product": (SUPPLIERS_FOR_PRODUCT_SQL, ("AGO",)),
+    "stock checkpoint before a point in time": (CHECKPOINT_BEFORE_SQL, ("PMS", "2024-01-31 23:59:59")),
+    "stock movements since a checkpoint": (MOVEMENTS_SINCE_SQL, ("PMS", 0, "2024-01-31 23:59:59")),
+}
+
+
+def explain(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def audit(conn, queries=None):
+    """Returns {name: (plan_lines, is_scan)} for every registered query."""
+    results = {}
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        plan = explain(conn, sql, params)
+        # Scans of a materialized CTE read the small table the query built itself.
+        materialized = {line.split()[1] for line in plan if line.startswith("MATERIALIZE ")}
+        scans = [
+            line for line in plan
+            if line.startswith("SCAN") and "CONSTANT ROW" not in line and "(subquery" not in line
+            and line.split()[1] not in materialized
+        ]
+        results[name] = (plan, bool(scans))
+    return results
+
+
+def main(db_file=DB_FILE):
+    conn = None
+    failures = 0
+    try:
+        # Read-only, so a mistyped path fails instead of creating an empty database.
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        for name, (plan, is_scan) in audit(conn).items():
+            status = "SCAN" if is_scan else "ok"
+            print(f"[{status:^4}] {name}")
+            for line in plan:
+                print(f"         {line}")
+            failures += is_scan
+    except sqlite3.Error as e:
+        print(f"❌ Query plan audit of '{db_file}' failed: {e}")
+        print("   Check that the database exists, is readable and is a Magen database.")
+        return 2
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} hot quer{'y' if failures == 1 else 'ies'} fell back to a full scan.")
+        return 1
+    print("\n✅ All hot queries use an index.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
@@ -0,0 +1,132 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import DB_FILE, get_pool
+
+# Report and dashboard reads only; more threads would just queue on the disk.
+MAX_QUERY_THREADS = 2
+
+
+class QuerySignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class QueryTask(QRunnable):
+    """
+    Runs `fn(conn, *args)` on a worker thread with a read-only pooled
+    connection (mode=ro) and emits its return value through `signals`.
+    Only plain data should be returned; widgets are updated by the
+    finished handler back on the GUI thread.
+    """
+
+    def __init__(self, fn, *args, db_file=DB_FILE):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.db_file = db_file
+        self.signals = QuerySignals()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._cancelled = False
+
+    def cancel(self):
+        """Stops the query if it is running (sqlite3 interrupt) or drops it if still queued."""
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self):
+        if self._cancelled:
+            self.signals.cancelled.emit()
+            return
+        try:
+            with get_pool(self.db_file, read_only=True).connection() as conn:
+                with self._lock:
+                    self._conn = conn
+                try:
+                    result = self.fn(conn, *self.args)
+                finally:
+                    with self._lock:
+                        self._conn = None
+        except Exception as e:
+            if self._cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+            return
+        if self._cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
+
+
+class QueryExecutor:
+    """
+    Thread pool for window reads.
+
+    Tasks are submitted under a key such as (window, "sales_report"); a new
+    submission under the same key cancels the previous one, so clicking
+    "Load" twice never delivers stale rows, and cancel_owner(window) drops
+    everything a closing window still has in flight.
+    """
+
+    def __init__(self, db_file=DB_FILE, max_threads=MAX_QUERY_THREADS):
+        self.db_file = db_file
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None):
+        task = QueryTask(fn, *args, db_file=self.db_file)
+        if on_result is not None:
+            task.signals.finished.connect(on_result)
+        if on_error is not None:
+            task.signals.failed.connect(on_error)
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *_, key=key, task=task: self._forget(key, task))
+
+        with self._lock:
+            previous = self._tasks.get(key)
+            self._tasks[key] = task
+        if previous is not None:
+            previous.cancel()
+        self.thread_pool.start(task)
+        return task
+
+    def _forget(self, key, task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def cancel(self, key):
+        with self._lock:
+            task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_owner(self, owner):
+        """Cancels every task submitted with a key of the form (owner, ...)."""
+        with self._lock:
+            keys = [key for key in self._tasks if isinstance(key, tuple) and key and key[0] is owner]
+            tasks = [self._tasks.pop(key) for key in keys]
+        for task in tasks:
+            task.cancel()
+
+    def wait(self, msecs=-1):
+        return self.thread_pool.waitForDone(msecs)
+
+
+_executor = None
+
+
+def query_executor():
+    """The application's executor, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor
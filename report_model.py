@@ -0,0 +1,146 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from query_executor import query_executor
+from report_queries import PAGE_SIZE
+
+# Pages of rows kept in memory; older ones are dropped and fetched again
+# from their saved keys if the user scrolls back to them.
+MAX_CACHED_PAGES = 10
+
+
+class ReportTableModel(QAbstractTableModel):
+    """
+    Read-only table model over a report_queries.ReportQuery.
+
+    Rows are fetched a page at a time as the view scrolls (canFetchMore /
+    fetchMore) using keyset pagination. Only the last key of each page is
+    kept for the whole report; the rows themselves live in a small LRU of
+    pages, so memory stays flat however many rows the report has. Header
+    clicks re-run the query with ORDER BY on the column's index.
+
+    Pages are read on query_executor workers. New pages are appended when
+    they arrive; a page dropped from the LRU shows blank cells until its
+    re-read comes back. Results for an earlier query are discarded.
+    """
+
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = None
+        self._pages = OrderedDict()     # page number -> rows
+        self._page_keys = []            # page number -> key of its last row
+        self._loading = set()           # page numbers being read
+        self._generation = 0            # bumped by set_query() to drop stale pages
+        self._row_count = 0
+        self._exhausted = True
+
+    def set_query(self, query):
+        query_executor().cancel_owner(self)
+        self.beginResetModel()
+        self.query = query
+        self._generation += 1
+        self._pages.clear()
+        self._page_keys = []
+        self._loading.clear()
+        self._row_count = 0
+        self._exhausted = query is None
+        self.endResetModel()
+
+    def clear(self):
+        self.set_query(None)
+
+    def _request_page(self, page):
+        if page in self._loading:
+            return
+        self._loading.add(page)
+        after_key = self._page_keys[page - 1] if page else None
+        query_executor().submit(
+            (self, page), self.query.fetch_page, after_key, PAGE_SIZE,
+            on_result=lambda result, generation=self._generation: self._page_loaded(generation, page, *result),
+            on_error=lambda error, generation=self._generation: self._page_failed(generation, page, error),
+        )
+
+    def _page_loaded(self, generation, page, rows, last_key):
+        if generation != self._generation:
+            return
+        self._loading.discard(page)
+        self._pages[page] = rows
+        while len(self._pages) > MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+
+        if page < len(self._page_keys):
+            # A page re-read after leaving the LRU.
+            first = page * PAGE_SIZE
+            last = min(first + PAGE_SIZE, self._row_count) - 1
+            if last >= first:
+                self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+            return
+
+        if rows:
+            self._page_keys.append(last_key)
+        if len(rows) < PAGE_SIZE:
+            self._exhausted = True
+        if rows:
+            self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+            self._row_count += len(rows)
+            self.endInsertRows()
+
+    def _page_failed(self, generation, page, error):
+        if generation != self._generation:
+            return
+        self._loading.discard(page)
+        if page >= len(self._page_keys):
+            self._exhausted = True
+        self.load_failed.emit(error)
+
+    def _row(self, row):
+        page, offset = divmod(row, PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is None:
+            self._request_page(page)
+            return None
+        self._pages.move_to_end(page)
+        # Rows deleted since the page was first read leave it short.
+        return rows[offset] if offset < len(rows) else None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and len(self._page_keys) not in self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._request_page(len(self._page_keys))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.query is None:
+            return 0
+        return len(self.query.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row = self._row(index.row())
+        if row is None or row[index.column()] is None:
+            return ""
+        return str(row[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal and self.query is not None:
+            return self.query.headers[section]
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if self.query is None:
+            return
+        query = self.query.sorted(column, descending=order == Qt.DescendingOrder)
+        if query is not None:
+            self.set_query(query)
@@ -0,0 +1,196 @@
+"""
+Multi-page report PDFs.
+
+Rows are read from one cursor in chunks and each chunk becomes a platypus
+LongTable (header row repeated on every page). The story is consumed as it
+is built, so only the chunk being laid out is in memory, whatever the size
+of the report; what grows is reportlab's compressed page streams for the
+PDF itself. Every page gets the report title and column context at the
+top and a footer with its page number, the sum of the amount column for
+that page and the running total; the last page ends with the grand total.
+
+Rows are single-line with fixed heights and chunks hold a whole number of
+pages, so chunk boundaries always fall on page breaks and the header never
+repeats mid-page.
+
+Plain sqlite3 and reportlab, no Qt: qt_export.py runs it off the UI thread.
+"""
+import os
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.platypus import BaseDocTemplate, Frame, LongTable, PageTemplate, Table, TableStyle
+
+from csv_export import ExportCancelled
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 1.5*cm
+HEADER_HEIGHT = 1.6*cm
+FOOTER_HEIGHT = 1.2*cm
+ROW_HEIGHT = 16
+FONT_SIZE = 8
+PAGES_PER_CHUNK = 10
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.beige]),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
+])
+
+
+class Amount(str):
+    """Formatted cell text that keeps its number, so the page footer can add it up."""
+
+    def __new__(cls, value):
+        amount = super().__new__(cls, f"{value:,.2f}")
+        amount.value = value
+        return amount
+
+
+class FlowableStream(list):
+    """
+    A list for doc.build() that is refilled from a generator as the build
+    consumes it, so the whole story never exists at once.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        while super().__len__() < 2:
+            flowable = next(self._source, None)
+            if flowable is None:
+                break
+            self.append(flowable)
+        return super().__len__()
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def rows_per_page():
+    body_height = PAGE_SIZE[1] - 2 * MARGIN - HEADER_HEIGHT - FOOTER_HEIGHT
+    # One row of every page is the repeated column header; keep a point
+    # spare so rounding never pushes the last row over.
+    return int((body_height - 1) // ROW_HEIGHT) - 1
+
+
+def export_report_pdf(conn, sql, params, headers, path, title, subtitle="", amount_column=None,
+                      progress=None, is_cancelled=None):
+    """
+    Writes the rows of `sql` to a paginated PDF at `path` and returns the
+    number of rows. `amount_column` is the index of the column summed into
+    page and grand totals. `progress(rows_done)` runs after each chunk;
+    `is_cancelled()` is checked between chunks and raises ExportCancelled.
+    """
+    width = PAGE_SIZE[0] - 2 * MARGIN
+    col_widths = [width / len(headers)] * len(headers)
+    chunk_rows = rows_per_page() * PAGES_PER_CHUNK
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+    totals = {'page': 0.0, 'running': 0.0, 'grand': 0.0, 'rows': 0}
+
+    class PageTotalTable(LongTable):
+        # Split pieces are created with self.__class__, so every piece drawn
+        # on a page adds its own rows to that page's total.
+        def draw(self):
+            super().draw()
+            if amount_column is not None:
+                for row in self._cellvalues:
+                    cell = row[amount_column]
+                    if isinstance(cell, Amount):
+                        totals['page'] += cell.value
+
+    def draw_header(canv, doc):
+        canv.saveState()
+        top = PAGE_SIZE[1] - MARGIN
+        canv.setFont("Helvetica-Bold", 14)
+        canv.drawString(MARGIN, top - 14, title)
+        canv.setFont("Helvetica", 9)
+        canv.drawRightString(PAGE_SIZE[0] - MARGIN, top - 12, f"Generated {generated}")
+        if subtitle:
+            canv.drawString(MARGIN, top - 30, subtitle)
+        canv.restoreState()
+
+    def draw_footer(canv, doc):
+        canv.saveState()
+        canv.setFont("Helvetica", 9)
+        y = MARGIN - 0.2*cm
+        canv.drawString(MARGIN, y, f"Page {doc.page}")
+        if amount_column is not None:
+            totals['running'] += totals['page']
+            canv.drawRightString(
+                PAGE_SIZE[0] - MARGIN, y,
+                f"Page total: {totals['page']:,.2f}    Running total: {totals['running']:,.2f}"
+            )
+            totals['page'] = 0.0
+        canv.restoreState()
+
+    def chunks():
+        header_row = list(headers)
+        cursor = conn.execute(sql, params)
+        try:
+            while True:
+                if is_cancelled is not None and is_cancelled():
+                    raise ExportCancelled()
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                data = [header_row]
+                for row in rows:
+                    cells = [cell_text(value) for value in row]
+                    if amount_column is not None and row[amount_column] is not None:
+                        cells[amount_column] = Amount(float(row[amount_column]))
+                        totals['grand'] += cells[amount_column].value
+                    data.append(cells)
+                table = PageTotalTable(data, colWidths=col_widths, rowHeights=ROW_HEIGHT, repeatRows=1)
+                table.setStyle(TABLE_STYLE)
+                totals['rows'] += len(rows)
+                yield table
+                if progress is not None:
+                    progress(totals['rows'])
+        finally:
+            cursor.close()
+        # Built while the last chunk is still waiting to be laid out, so the
+        # grand total comes from the rows read rather than the pages drawn.
+        if amount_column is not None:
+            grand_total = Table(
+                [["Grand total", f"{totals['grand']:,.2f}"]],
+                colWidths=[col_widths[0] * 2, col_widths[amount_column]], hAlign='RIGHT',
+            )
+            grand_total.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+                ('LINEABOVE', (0, 0), (-1, 0), 1, colors.black),
+            ]))
+            yield grand_total
+
+    frame = Frame(
+        MARGIN, MARGIN + FOOTER_HEIGHT, width, PAGE_SIZE[1] - 2 * MARGIN - HEADER_HEIGHT - FOOTER_HEIGHT,
+        leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0,
+    )
+    partial = f"{path}.part"
+    doc = BaseDocTemplate(partial, pagesize=PAGE_SIZE, title=title, pageCompression=1)
+    doc.addPageTemplates([PageTemplate(id='report', frames=[frame], onPage=draw_header, onPageEnd=draw_footer)])
+    try:
+        doc.build(FlowableStream(chunks()))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return totals['rows']
@@ -0,0 +1,297 @@
+"""
+Report queries, paged by key instead of by OFFSET.
+
+A ReportQuery is SELECT <columns> FROM <table> WHERE <where> ORDER BY
+<sort key>, id. Each page starts with a row-value comparison against the
+last key of the previous page, e.g. WHERE (sale_day, id) > (?, ?), so a
+page costs one index seek however deep into the report it is.
+
+A date-ranged report has two lower bounds after its first page, the
+range start and the key, and SQLite takes only one of them into the
+index search; left to choose, it seeks to the range start and re-reads
+every earlier page. The range start is therefore written with a unary
+plus (+sale_day >= ?) on those pages, which keeps its meaning but not its
+index, while the end of the range still stops the search (mirrored when
+sorting descending). That only works when the sort key leads with the
+range column, so a date-ranged report is sortable by date alone: any
+other order would read index entries outside the range to fill a narrow
+range's pages.
+
+Plain sqlite3, no Qt: report_model.py shows these in the reports window,
+and csv_export streams them through export_statement().
+"""
+
+from datetime import date, timedelta
+
+PAGE_SIZE = 200
+
+
+class ReportQuery:
+    def __init__(self, table, columns, where="1 = 1", params=(), sort_keys=None,
+                 sort_column=None, descending=False, key_column="id",
+                 range_column=None, description=""):
+        """
+        `columns` is a list of (header, sql expression). `sort_keys` maps a
+        column index to the indexed expressions that order it; the key
+        column is always appended as the tie-breaker. With `range_column`
+        the report selects `range_column BETWEEN ? AND ?` over the two
+        `params` instead of `where`, and every sort key must lead with it
+        (see the module docstring). `description` says what the filter
+        selects, for printed reports.
+        """
+        if range_column is not None:
+            where = f"{range_column} BETWEEN ? AND ?"
+            if any(keys[0] != range_column for keys in (sort_keys or {}).values()):
+                raise ValueError(f"Every sort key of a report ranged on {range_column} must lead with it.")
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.params = tuple(params)
+        self.sort_keys = sort_keys or {}
+        self.sort_column = sort_column
+        self.descending = descending
+        self.key_column = key_column
+        self.range_column = range_column
+        self.description = description
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def sortable(self, column):
+        return column in self.sort_keys
+
+    def sorted(self, column, descending=False):
+        """The same report ordered by `column`, or None if it has no index to sort by."""
+        if not self.sortable(column):
+            return None
+        return ReportQuery(
+            self.table, self.columns, self.where, self.params, self.sort_keys,
+            sort_column=column, descending=descending, key_column=self.key_column,
+            range_column=self.range_column, description=self.description,
+        )
+
+    def key_expressions(self):
+        keys = list(self.sort_keys.get(self.sort_column, ()))
+        if self.key_column not in keys:
+            keys.append(self.key_column)
+        return keys
+
+    def page_where(self, after_key=None):
+        if after_key is None or self.range_column is None:
+            return self.where
+        # The key replaces the range bound on its own side in the index search.
+        lower, upper = f"{self.range_column} >= ?", f"{self.range_column} <= ?"
+        if self.descending:
+            upper = "+" + upper
+        else:
+            lower = "+" + lower
+        return f"{lower} AND {upper}"
+
+    def page_sql(self, after_key=None, select_keys=True):
+        keys = self.key_expressions()
+        select = ", ".join([expr for _, expr in self.columns] + (keys if select_keys else []))
+        where = f"({self.page_where(after_key)})"
+        if after_key is not None:
+            comparison = "<" if self.descending else ">"
+            where += f" AND ({', '.join(keys)}) {comparison} ({', '.join('?' * len(keys))})"
+        direction = " DESC" if self.descending else ""
+        order_by = ", ".join(key + direction for key in keys)
+        return f"SELECT {select} FROM {self.table} WHERE {where} ORDER BY {order_by} LIMIT ?"
+
+    def fetch_page(self, conn, after_key=None, limit=PAGE_SIZE):
+        """
+        Up to `limit` rows after `after_key` (None for the first page).
+        Returns (rows, last key) where each row holds only the visible
+        columns; pass the last key back to get the next page.
+        """
+        params = self.params + (tuple(after_key) if after_key is not None else ()) + (limit,)
+        fetched = conn.execute(self.page_sql(after_key), params).fetchall()
+        if not fetched:
+            return [], after_key
+        width = len(self.columns)
+        return [row[:width] for row in fetched], fetched[-1][width:]
+
+    def iter_rows(self, conn, page_size=PAGE_SIZE):
+        """Every row of the report, one page in memory at a time."""
+        after_key = None
+        while True:
+            rows, after_key = self.fetch_page(conn, after_key, page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+
+    def export_statement(self):
+        """(sql, params) for the whole report in one cursor, in the current sort order."""
+        return self.page_sql(select_keys=False), self.params + (-1,)
+
+    def count_sql(self):
+        return f"SELECT COUNT(*) FROM {self.table} WHERE {self.where}"
+
+
+def day_label(day):
+    """Epoch day (see database.epoch_day) -> 'yyyy-MM-dd'."""
+    return (date(1970, 1, 1) + timedelta(days=day)).isoformat()
+
+
+def date_range_label(start_day, end_day):
+    return f"{day_label(start_day)} to {day_label(end_day)}"
+
+
+# The customer's current name, or the name on the sale if it has since been deleted.
+SALE_CUSTOMER_NAME = (
+    "COALESCE((SELECT c.name FROM customers c WHERE c.id = sale_lines.customer_id), sale_lines.customer_name)"
+)
+
+
+def sales_report(start_day, end_day):
+    return ReportQuery(
+        "sale_lines",
+        [("ID", "id"), ("Product", "product"), ("Quantity", "quantity"), ("Price", "price"),
+         ("Total", "total"), ("Date", "date"), ("Customer", SALE_CUSTOMER_NAME)],
+        params=(start_day, end_day),
+        sort_keys={5: ("sale_day",)},
+        sort_column=5,
+        range_column="sale_day",
+        description=date_range_label(start_day, end_day),
+    )
+
+
+def purchases_report(start_day, end_day):
+    return ReportQuery(
+        "purchases",
+        [("ID", "id"), ("Product", "product"), ("Quantity", "quantity"), ("Unit Price", "unit_price"),
+         ("Total", "total"), ("Supplier", "supplier"), ("Date", "date")],
+        params=(start_day, end_day),
+        sort_keys={6: ("purchase_day",)},
+        sort_column=6,
+        range_column="purchase_day",
+        description=date_range_label(start_day, end_day),
+    )
+
+
+STOCK_COLUMNS = [("ID", "id"), ("Product", "product"), ("Quantity", "quantity"), ("Reorder Level", "reorder_level")]
+
+
+def stock_report():
+    return ReportQuery("stock", STOCK_COLUMNS, sort_keys={0: ("id",), 1: ("product",)}, sort_column=1)
+
+
+def low_stock_report():
+    return ReportQuery(
+        "stock", STOCK_COLUMNS, where="quantity <= reorder_level", description="At or below reorder level",
+        sort_keys={0: ("id",), 1: ("product",)}, sort_column=1,
+    )
+
+
+# Summaries. SQLite has no GROUP BY ROLLUP, so the detail rows are read
+# once into a product x customer (or supplier) cube and the grouping sets
+# (grand total, per product, per party) are rolled up from that small
+# table in the same statement; only the aggregates leave the database.
+
+SUMMARY_HEADERS = ["Group", "Name", "Lines", "Quantity", "Amount", "Avg / Line", "Min Price", "Max Price"]
+
+
+def rollup_sql(table, day_column, party_column, party_label, price_column, stored_name=None, party_name=None):
+    """
+    `stored_name` is the column holding the party's name on each row when
+    `party_column` is an id; `party_name` is the expression naming a party
+    group, over `party` and MAX(stored_name).
+    """
+    level = "SUM(lines), SUM(quantity), SUM(amount), SUM(amount) / SUM(lines), MIN(min_price), MAX(max_price)"
+    return f"""
+        WITH cube AS MATERIALIZED (
+            SELECT product, {party_column} AS party, MAX({stored_name or party_column}) AS stored_name,
+                   COUNT(*) AS lines, SUM(quantity) AS quantity,
+                   SUM(total) AS amount, MIN({price_column}) AS min_price, MAX({price_column}) AS max_price
+            FROM {table}
+            WHERE {day_column} BETWEEN ?1 AND ?2
+            GROUP BY product, {party_column}
+        )
+        SELECT 0, 'Total', NULL, {level} FROM cube
+        UNION ALL
+        SELECT 1, 'Product', product, {level} FROM cube GROUP BY product
+        UNION ALL
+        SELECT 2, '{party_label}', {party_name or "MAX(stored_name)"}, {level} FROM cube GROUP BY party
+        ORDER BY 1, 6 DESC
+    """
+
+
+# Grouped by customer id, named like SALE_CUSTOMER_NAME.
+SALES_SUMMARY_SQL = rollup_sql(
+    "sale_lines", "sale_day", "customer_id", "Customer", "price", stored_name="customer_name",
+    party_name="COALESCE((SELECT c.name FROM customers c WHERE c.id = party), MAX(stored_name))",
+)
+PURCHASES_SUMMARY_SQL = rollup_sql("purchases", "purchase_day", "supplier", "Supplier", "unit_price")
+
+STOCK_SUMMARY_HEADERS = ["Products", "Total Quantity", "At/Below Reorder", "Min Quantity", "Max Quantity", "Shortfall"]
+
+STOCK_SUMMARY_SQL = """
+    SELECT COUNT(*), SUM(quantity), SUM(quantity <= reorder_level), MIN(quantity), MAX(quantity),
+           SUM(MAX(reorder_level - quantity, 0))
+    FROM stock
+    WHERE {where}
+"""
+
+
+class ReportSummary:
+    """A headline of (label, value) figures plus subtotal rows for the summary panel."""
+
+    def __init__(self, headline, headers=(), rows=()):
+        self.headline = headline
+        self.headers = list(headers)
+        self.rows = list(rows)
+
+
+def grouped_summary(conn, sql, params):
+    rows = conn.execute(sql, params).fetchall()
+    total = rows[0][3:]
+    lines, quantity, amount, average, min_price, max_price = total
+    headline = [
+        ("Lines", lines or 0),
+        ("Quantity", quantity or 0),
+        ("Amount", amount or 0),
+        ("Avg / Line", average or 0),
+        ("Avg Price", (amount or 0) / quantity if quantity else 0),
+        ("Min Price", min_price),
+        ("Max Price", max_price),
+    ]
+    return ReportSummary(headline, SUMMARY_HEADERS, [row[1:] for row in rows[1:]])
+
+
+def sales_summary(conn, start_day, end_day):
+    return grouped_summary(conn, SALES_SUMMARY_SQL, (start_day, end_day))
+
+
+def purchases_summary(conn, start_day, end_day):
+    return grouped_summary(conn, PURCHASES_SUMMARY_SQL, (start_day, end_day))
+
+
+def stock_summary(conn, low_only=False):
+    where = "quantity <= reorder_level" if low_only else "1 = 1"
+    figures = conn.execute(STOCK_SUMMARY_SQL.format(where=where)).fetchone()
+    return ReportSummary([(label, value or 0) for label, value in zip(STOCK_SUMMARY_HEADERS, figures)])
+
+
+# Per-customer documents. Both read one customer's range of the
+# (customer_id, sale_day) indexes in order, so their cost follows the
+# customer's own sales, not the size of the sales tables.
+
+STATEMENT_HEADERS = ["Invoice", "Delivery Note", "Date", "Lines", "Amount", "Running Total"]
+
+CUSTOMER_STATEMENT_SQL = """
+    SELECT invoice_number, delivery_note_number, date, line_count, total,
+           SUM(total) OVER (ORDER BY sale_day, id ROWS UNBOUNDED PRECEDING)
+    FROM sale_headers
+    WHERE customer_id = ?
+    ORDER BY sale_day, id
+"""
+
+HISTORY_HEADERS = ["Date", "Invoice", "Product", "Quantity", "Price", "Total"]
+
+CUSTOMER_HISTORY_SQL = """
+    SELECT date, invoice_number, product, quantity, price, total
+    FROM sale_lines
+    WHERE customer_id = ?
+    ORDER BY sale_day, id
+"""
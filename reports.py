@@ -1,20 +1,85 @@
 import sys
-import csv
-import sqlite3
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QHBoxLayout, QTabWidget,
-    QDateEdit, QMessageBox, QFileDialog
+    QTableView, QHBoxLayout, QTabWidget, QGroupBox, QTableWidget,
+    QTableWidgetItem, QHeaderView, QDateEdit, QMessageBox, QFileDialog
+)
+from PyQt5.QtCore import QDate, Qt
+from database import epoch_day
+from query_executor import query_executor
+from qt_export import PDF_FILTER, ask_csv_path, start_csv_export, start_pdf_export
+from report_model import ReportTableModel
+from report_queries import (
+    low_stock_report, purchases_report, purchases_summary, sales_report, sales_summary,
+    stock_report, stock_summary
 )
-from PyQt5.QtCore import QDate
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
 from themes1 import apply_gradient_theme
 
-def get_connection():
-    return sqlite3.connect('magen.db')
+# Report rows are paged into the tables by ReportTableModel (see
+# report_queries.py) and summaries are aggregated in SQL, both on
+# query_executor workers; summaries are shown in each tab's SummaryPanel.
+
+def format_figure(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+class SummaryPanel(QGroupBox):
+    """Headline figures and per-group subtotals of a ReportSummary."""
+
+    def __init__(self, title="Summary"):
+        super().__init__(title)
+        layout = QVBoxLayout()
+        self.headline = QLabel("Load the report to see its summary.")
+        self.headline.setWordWrap(True)
+        self.subtotals = QTableWidget()
+        self.subtotals.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.subtotals.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.subtotals.setMaximumHeight(180)
+        self.subtotals.hide()
+        layout.addWidget(self.headline)
+        layout.addWidget(self.subtotals)
+        self.setLayout(layout)
+
+    def show_summary(self, summary):
+        self.headline.setText("    ".join(f"<b>{label}:</b> {format_figure(value)}" for label, value in summary.headline))
+        self.subtotals.setVisible(bool(summary.rows))
+        self.subtotals.clear()
+        self.subtotals.setColumnCount(len(summary.headers))
+        self.subtotals.setHorizontalHeaderLabels(summary.headers)
+        self.subtotals.setRowCount(len(summary.rows))
+        for row_idx, row in enumerate(summary.rows):
+            for col_idx, value in enumerate(row):
+                self.subtotals.setItem(row_idx, col_idx, QTableWidgetItem(format_figure(value)))
+
+def report_table(on_error):
+    table = QTableView()
+    model = ReportTableModel(table)
+    model.load_failed.connect(on_error)
+    table.setModel(model)
+    table.setSortingEnabled(True)
+    header = table.horizontalHeader()
+    header.setSortIndicatorShown(True)
+    # The view moves the indicator on any click, but only some columns sort.
+    header.sortIndicatorChanged.connect(lambda column, order: show_sort_indicator(table))
+    return table
+
+def show_sort_indicator(table):
+    """Points the header's sort indicator at the column and direction the loaded report is sorted by."""
+    query = table.model().query
+    if query is None or query.sort_column is None:
+        return
+    order = Qt.DescendingOrder if query.descending else Qt.AscendingOrder
+    header = table.horizontalHeader()
+    if (header.sortIndicatorSection(), header.sortIndicatorOrder()) == (query.sort_column, order):
+        return
+    header.blockSignals(True)
+    header.setSortIndicator(query.sort_column, order)
+    header.blockSignals(False)
 
 class ReportsWindow(QWidget):
     def __init__(self):
@@ -62,9 +127,12 @@ class ReportsWindow(QWidget):
 
         layout.addLayout(date_layout)
 
-        self.sales_table = QTableWidget()
+        self.sales_table = report_table(self.report_failed)
         layout.addWidget(self.sales_table)
 
+        self.sales_summary_panel = SummaryPanel()
+        layout.addWidget(self.sales_summary_panel)
+
         tab.setLayout(layout)
         return tab
 
@@ -97,9 +165,12 @@ class ReportsWindow(QWidget):
 
         layout.addLayout(date_layout)
 
-        self.purchases_table = QTableWidget()
+        self.purchases_table = report_table(self.report_failed)
         layout.addWidget(self.purchases_table)
 
+        self.purchases_summary_panel = SummaryPanel()
+        layout.addWidget(self.purchases_summary_panel)
+
         tab.setLayout(layout)
         return tab
 
@@ -122,9 +193,12 @@ class ReportsWindow(QWidget):
 
         layout.addLayout(btn_layout)
 
-        self.stock_table = QTableWidget()
+        self.stock_table = report_table(self.report_failed)
         layout.addWidget(self.stock_table)
 
+        self.stock_summary_panel = SummaryPanel()
+        layout.addWidget(self.stock_summary_panel)
+
         tab.setLayout(layout)
         return tab
 
@@ -147,149 +221,82 @@ class ReportsWindow(QWidget):
 
         layout.addLayout(btn_layout)
 
-        self.low_stock_table = QTableWidget()
+        self.low_stock_table = report_table(self.report_failed)
         layout.addWidget(self.low_stock_table)
 
+        self.low_stock_summary_panel = SummaryPanel()
+        layout.addWidget(self.low_stock_summary_panel)
+
         tab.setLayout(layout)
         return tab
 
-    def load_sales_report(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        start_date = self.sales_start_date.date().toString("yyyy-MM-dd")
-        end_date = self.sales_end_date.date().toString("yyyy-MM-dd")
-
-        cursor.execute("""
-            SELECT id, product, quantity, price, total, date, customer_name
-            FROM sales
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date ASC
-        """, (start_date, end_date))
-
-        data = cursor.fetchall()
-        headers = ["ID", "Product", "Quantity", "Price", "Total", "Date", "Customer"]
-
-        self.populate_table(self.sales_table, data, headers)
-        conn.close()
-
-        if data:
-            total_sales = sum(float(row[4]) for row in data)
-            total_qty = sum(int(row[2]) for row in data)
-            QMessageBox.information(self, "Sales Summary",
-                                    f"Total Quantity Sold: {total_qty}\nTotal Sales Amount: {total_sales:.2f}")
+    def run_query(self, name, fn, *args, on_result):
+        query_executor().submit(
+            (self, name), fn, *args,
+            on_result=on_result,
+            on_error=self.report_failed,
+        )
 
-    def load_purchases_report(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        start_date = self.purchases_start_date.date().toString("yyyy-MM-dd")
-        end_date = self.purchases_end_date.date().toString("yyyy-MM-dd")
+    def report_failed(self, error):
+        QMessageBox.critical(self, "Database Error", f"Failed to load report:\n{error}")
 
-        cursor.execute("""
-            SELECT id, product, quantity, unit_price, total, supplier, date
-            FROM purchases
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date ASC
-        """, (start_date, end_date))
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        for table in (self.sales_table, self.purchases_table, self.stock_table, self.low_stock_table):
+            table.model().clear()
+        super().closeEvent(event)
 
-        data = cursor.fetchall()
-        headers = ["ID", "Product", "Quantity", "Unit Price", "Total", "Supplier", "Date"]
+    def load_sales_report(self):
+        start_day = epoch_day(self.sales_start_date.date().toString("yyyy-MM-dd"))
+        end_day = epoch_day(self.sales_end_date.date().toString("yyyy-MM-dd"))
+        self.show_report(self.sales_table, sales_report(start_day, end_day))
+        self.run_query("sales_summary", sales_summary, start_day, end_day, on_result=self.sales_summary_panel.show_summary)
 
-        self.populate_table(self.purchases_table, data, headers)
-        conn.close()
+    def load_purchases_report(self):
+        start_day = epoch_day(self.purchases_start_date.date().toString("yyyy-MM-dd"))
+        end_day = epoch_day(self.purchases_end_date.date().toString("yyyy-MM-dd"))
+        self.show_report(self.purchases_table, purchases_report(start_day, end_day))
+        self.run_query(
+            "purchases_summary", purchases_summary, start_day, end_day, on_result=self.purchases_summary_panel.show_summary
+        )
 
     def load_stock_report(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, product, quantity, reorder_level
-            FROM stock
-            ORDER BY product ASC
-        """)
-        data = cursor.fetchall()
-        headers = ["ID", "Product", "Quantity", "Reorder Level"]
-
-        self.populate_table(self.stock_table, data, headers)
-        conn.close()
+        self.show_report(self.stock_table, stock_report())
+        self.run_query("stock_summary", stock_summary, on_result=self.stock_summary_panel.show_summary)
 
     def load_low_stock_alerts(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, product, quantity, reorder_level
-            FROM stock
-            WHERE quantity <= reorder_level
-            ORDER BY product ASC
-        """)
-        data = cursor.fetchall()
-        headers = ["ID", "Product", "Quantity", "Reorder Level"]
-
-        self.populate_table(self.low_stock_table, data, headers)
-        conn.close()
-
-    def populate_table(self, table, data, headers):
-        table.clear()
-        table.setRowCount(len(data))
-        table.setColumnCount(len(headers))
-        table.setHorizontalHeaderLabels(headers)
-        for row_idx, row in enumerate(data):
-            for col_idx, item in enumerate(row):
-                table.setItem(row_idx, col_idx, QTableWidgetItem(str(item)))
+        self.show_report(self.low_stock_table, low_stock_report())
+        self.run_query("low_stock_summary", stock_summary, True, on_result=self.low_stock_summary_panel.show_summary)
+
+    def show_report(self, table, query):
+        model = table.model()
+        model.set_query(query)
+        model.fetchMore()
+        show_sort_indicator(table)
 
     def export_to_csv(self, table, default_filename):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save CSV Report", default_filename, "CSV Files (*.csv)")
+        query = table.model().query
+        if query is None:
+            QMessageBox.warning(self, "Export CSV", "Load the report first.")
+            return
+        file_path = ask_csv_path(self, "Save CSV Report", default_filename)
         if file_path:
-            try:
-                with open(file_path, 'w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    headers = [table.horizontalHeaderItem(i).text() for i in range(table.columnCount())]
-                    writer.writerow(headers)
-                    for row in range(table.rowCount()):
-                        row_data = []
-                        for col in range(table.columnCount()):
-                            item = table.item(row, col)
-                            row_data.append(item.text() if item else "")
-                        writer.writerow(row_data)
-                QMessageBox.information(self, "Success", f"Report exported successfully:\n{file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to export CSV:\n{e}")
+            sql, params = query.export_statement()
+            start_csv_export(self, sql, params, query.headers, file_path, query.count_sql(), query.params)
 
     def export_to_pdf(self, table, default_filename, report_title):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF Report", default_filename, "PDF Files (*.pdf)")
+        query = table.model().query
+        if query is None:
+            QMessageBox.warning(self, "Export PDF", "Load the report first.")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF Report", default_filename, PDF_FILTER)
         if file_path:
-            try:
-                c = canvas.Canvas(file_path, pagesize=A4)
-                width, height = A4
-                c.setFont("Helvetica-Bold", 16)
-                c.drawString(30, height - 50, report_title)
-
-                data = []
-                headers = [table.horizontalHeaderItem(i).text() for i in range(table.columnCount())]
-                data.append(headers)
-                for row in range(table.rowCount()):
-                    row_data = []
-                    for col in range(table.columnCount()):
-                        item = table.item(row, col)
-                        row_data.append(item.text() if item else "")
-                    data.append(row_data)
-
-                table_obj = Table(data, repeatRows=1)
-                table_obj.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ]))
-
-                table_width, table_height = table_obj.wrapOn(c, width - 60, height - 100)
-                table_obj.drawOn(c, 30, height - 80 - table_height)
-
-                c.save()
-                QMessageBox.information(self, "Success", f"Report exported successfully:\n{file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to export PDF:\n{e}")
+            sql, params = query.export_statement()
+            amount_column = query.headers.index("Total") if "Total" in query.headers else None
+            start_pdf_export(
+                self, sql, params, query.headers, file_path, report_title, query.description, amount_column,
+                count_sql=query.count_sql(), count_params=query.params,
+            )
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
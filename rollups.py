@@ -0,0 +1,188 @@
+"""
+Daily sales and purchases rollups.
+
+sales_daily holds one row per (day, product) and purchases_daily one row per
+(day, supplier), with the summed quantity, amount and row count (sale lines
+and purchases respectively). Triggers on sale_lines and purchases keep them
+current inside the same transaction as the
+write, so dashboard totals, the Z report and monthly figures read a handful
+of rollup rows instead of re-aggregating every transaction.
+
+    python rollups.py backfill [path/to/magen.db]
+"""
+import sqlite3
+
+# Days are epoch days, the same as the sale_day / purchase_day columns.
+ROLLUP_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day INTEGER NOT NULL,
+        product TEXT NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS purchases_daily (
+        day INTEGER NOT NULL,
+        supplier TEXT NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, supplier)
+    ) WITHOUT ROWID
+    """,
+]
+
+# (rollup table, source table, day column, key column, amount column)
+ROLLUPS = [
+    ("sales_daily", "sale_lines", "sale_day", "product", "total"),
+    ("purchases_daily", "purchases", "purchase_day", "supplier", "total"),
+]
+
+
+def _add_sql(rollup, key, row, day, key_column, amount, sign):
+    return f"""
+        INSERT INTO {rollup} (day, {key}, quantity, amount, count)
+        VALUES ({row}.{day}, COALESCE({row}.{key_column}, ''),
+                {sign}COALESCE({row}.quantity, 0), {sign}COALESCE({row}.{amount}, 0), {sign}1)
+        ON CONFLICT (day, {key}) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            amount = amount + excluded.amount,
+            count = count + excluded.count;
+    """
+
+
+def rollup_triggers(rollups=ROLLUPS):
+    """CREATE TRIGGER statements keeping every rollup in step with its source table."""
+    statements = []
+    for rollup, source, day, key, amount in rollups:
+        add = _add_sql(rollup, key, "NEW", day, key, amount, "")
+        remove = _add_sql(rollup, key, "OLD", day, key, amount, "-") + f"""
+            DELETE FROM {rollup}
+            WHERE day = OLD.{day} AND {key} = COALESCE(OLD.{key}, '') AND count = 0;
+        """
+        statements += [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_insert AFTER INSERT ON {source}
+            WHEN NEW.{day} IS NOT NULL
+            BEGIN {add} END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_delete AFTER DELETE ON {source}
+            WHEN OLD.{day} IS NOT NULL
+            BEGIN {remove} END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_update_old
+            AFTER UPDATE OF date, {key}, quantity, {amount} ON {source}
+            WHEN OLD.{day} IS NOT NULL
+            BEGIN {remove} END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_update_new
+            AFTER UPDATE OF date, {key}, quantity, {amount} ON {source}
+            WHEN NEW.{day} IS NOT NULL
+            BEGIN {add} END
+            """,
+        ]
+    return statements
+
+
+def create_rollup_tables(conn, rollups=ROLLUPS):
+    for statement in ROLLUP_TABLES + rollup_triggers(rollups):
+        conn.execute(statement)
+
+
+def backfill(conn, rollups=ROLLUPS):
+    """
+    Rebuilds every rollup from its source table in one grouped pass each.
+    Runs on the caller's connection; wrap it in a transaction.
+    Returns {rollup table: rows written}.
+    """
+    written = {}
+    for rollup, source, day, key, amount in rollups:
+        conn.execute(f"DELETE FROM {rollup}")
+        written[rollup] = conn.execute(f"""
+            INSERT INTO {rollup} (day, {key}, quantity, amount, count)
+            SELECT {day}, COALESCE({key}, ''), SUM(COALESCE(quantity, 0)), SUM(COALESCE({amount}, 0)), COUNT(*)
+            FROM {source}
+            WHERE {day} IS NOT NULL
+            GROUP BY {day}, COALESCE({key}, '')
+        """).rowcount
+    return written
+
+
+def summary_totals(conn):
+    """All-time (sales amount, purchases amount)."""
+    sales_total = conn.execute("SELECT SUM(amount) FROM sales_daily").fetchone()[0]
+    purchases_total = conn.execute("SELECT SUM(amount) FROM purchases_daily").fetchone()[0]
+    return sales_total or 0, purchases_total or 0
+
+
+def daily_totals(conn, start_day, end_day):
+    """[(day, sales amount, purchases amount), ...] for every day in the range."""
+    return conn.execute("""
+        WITH RECURSIVE days(day) AS (
+            SELECT ? UNION ALL SELECT day + 1 FROM days WHERE day < ?
+        )
+        SELECT day,
+               (SELECT SUM(amount) FROM sales_daily WHERE sales_daily.day = days.day),
+               (SELECT SUM(amount) FROM purchases_daily WHERE purchases_daily.day = days.day)
+        FROM days
+    """, (start_day, end_day)).fetchall()
+
+
+MONTHLY_SALES_SQL = """
+    SELECT strftime('%Y-%m', day * 86400, 'unixepoch') AS month, product,
+           SUM(quantity), SUM(amount), SUM(count)
+    FROM sales_daily
+    WHERE day BETWEEN ? AND ?
+    GROUP BY month, product
+    ORDER BY month, product
+"""
+
+MONTHLY_PURCHASES_SQL = """
+    SELECT strftime('%Y-%m', day * 86400, 'unixepoch') AS month, supplier,
+           SUM(quantity), SUM(amount), SUM(count)
+    FROM purchases_daily
+    WHERE day BETWEEN ? AND ?
+    GROUP BY month, supplier
+    ORDER BY month, supplier
+"""
+
+
+def monthly_sales(conn, start_day, end_day):
+    """[(yyyy-mm, product, quantity, amount, count), ...]"""
+    return conn.execute(MONTHLY_SALES_SQL, (start_day, end_day)).fetchall()
+
+
+def monthly_purchases(conn, start_day, end_day):
+    """[(yyyy-mm, supplier, quantity, amount, count), ...]"""
+    return conn.execute(MONTHLY_PURCHASES_SQL, (start_day, end_day)).fetchall()
+
+
+if __name__ == "__main__":
+    import sys
+    from database import DB_FILE, configure_connection, ensure_schema
+
+    if sys.argv[1:2] != ["backfill"]:
+        print("Usage: python rollups.py backfill [path/to/magen.db]")
+        sys.exit(2)
+
+    db_file = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    conn = configure_connection(sqlite3.connect(db_file, isolation_level=None))
+    try:
+        ensure_schema(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        written = backfill(conn)
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        print(f"❌ Rollup backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    for table, rows in written.items():
+        print(f"✅ {table}: {rows} rows rebuilt.")
@@ -0,0 +1,133 @@
+from database import transaction
+from events import CUSTOMERS_CHANGED, SALE_RECORDED, publish_on_commit
+from sequences import allocator, INVOICE, DELIVERY_NOTE
+from stock_manager import decrement_stock
+
+CUSTOMER_ID_SQL = "SELECT id FROM customers WHERE name = ?"
+
+BASKET_LINES_SQL = "SELECT id, product, quantity, price, total FROM sale_lines WHERE header_id = ? ORDER BY id"
+
+
+class Basket:
+    """The lines of one customer visit, committed together by record_basket()."""
+
+    def __init__(self):
+        self.lines = []
+
+    def add(self, product, quantity, price):
+        self.lines.append({
+            'product': product,
+            'quantity': quantity,
+            'price': price,
+            'total': quantity * price,
+        })
+
+    def remove(self, index):
+        del self.lines[index]
+
+    def clear(self):
+        self.lines.clear()
+
+    def copy(self):
+        basket = Basket()
+        basket.lines = [dict(line) for line in self.lines]
+        return basket
+
+    def quantities(self):
+        """{product: total quantity}, for stock checks when a product appears on several lines."""
+        totals = {}
+        for line in self.lines:
+            totals[line['product']] = totals.get(line['product'], 0) + line['quantity']
+        return totals
+
+    @property
+    def total(self):
+        return sum(line['total'] for line in self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def record_basket(basket, date, customer_name):
+    """
+    Commits a whole basket in one transaction: customer upsert, one invoice
+    and one delivery note number, the sale header, every line (one
+    executemany) and the stock decrements. Either all of it lands or none
+    of it does.
+    """
+    if not basket.lines:
+        raise ValueError("The basket is empty.")
+
+    allocator.reserve(INVOICE, DELIVERY_NOTE)
+    numbers = {}
+
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+
+            # Add customer if it does not exist
+            cursor.execute(CUSTOMER_ID_SQL, (customer_name,))
+            customer = cursor.fetchone()
+            if customer:
+                customer_id = customer[0]
+            else:
+                cursor.execute("INSERT INTO customers (name) VALUES (?)", (customer_name,))
+                customer_id = cursor.lastrowid
+                publish_on_commit(CUSTOMERS_CHANGED, {'name': customer_name})
+
+            invoice_number = numbers[INVOICE] = allocator.take(conn, INVOICE)
+            delivery_note_number = numbers[DELIVERY_NOTE] = allocator.take(conn, DELIVERY_NOTE)
+
+            cursor.execute("""
+                INSERT INTO sale_headers (
+                    invoice_number, delivery_note_number, customer_id, customer_name, date, total, line_count
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (invoice_number, delivery_note_number, customer_id, customer_name, date, basket.total, len(basket)))
+            header_id = cursor.lastrowid
+
+            cursor.executemany("""
+                INSERT INTO sale_lines (
+                    header_id, product, quantity, price, total, date,
+                    customer_id, customer_name, invoice_number, delivery_note_number
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    header_id, line['product'], line['quantity'], line['price'], line['total'], date,
+                    customer_id, customer_name, invoice_number, delivery_note_number
+                )
+                for line in basket.lines
+            ])
+
+            items = []
+            for line_id, product, quantity, price, total in conn.execute(BASKET_LINES_SQL, (header_id,)):
+                decrement_stock(conn, product, quantity, f"sale:{line_id}")
+                items.append({'id': line_id, 'product': product, 'quantity': quantity, 'price': price, 'total': total})
+
+            sale = {
+                'id': header_id,
+                'invoice_number': invoice_number,
+                'delivery_note_number': delivery_note_number,
+                'total': basket.total,
+                'date': date,
+                'customer_id': customer_id,
+                'customer_name': customer_name,
+                'items': items,
+            }
+            publish_on_commit(SALE_RECORDED, sale)
+    except Exception:
+        for name, number in numbers.items():
+            allocator.put_back(name, number)
+        raise
+
+    return sale
+
+
+def record_sale(product, quantity, price, date, customer_name):
+    """Commits a single-product sale (a one-line basket)."""
+    basket = Basket()
+    basket.add(product, quantity, price)
+    sale = record_basket(basket, date, customer_name)
+    sale.update(basket.lines[0])
+    return sale
@@ -1,19 +1,21 @@
 import sys
 import os
-import sqlite3
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit,
-    QPushButton, QMessageBox, QComboBox, QDateEdit, QFormLayout
+    QPushButton, QMessageBox, QComboBox, QDateEdit, QFormLayout,
+    QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PyQt5.QtCore import QDate
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewDialog
 from PyQt5.QtGui import QPainter
 
-from stock_manager import update_stock_on_sale, can_sell
+from customer_completer import CustomerCompleter
+from query_executor import query_executor
+from qt_events import event_bridge
+from sale_service import Basket, record_basket
+from stock_manager import can_sell
 from themes import apply_gradient_theme
-from pdf_generator import generate_invoice_pdf_document, generate_delivery_note_pdf_document
-
-DB_FILE = 'magen.db'
+from document_service import document_service
 
 class SalesWindow(QWidget):
     def __init__(self):
@@ -23,7 +25,18 @@ class SalesWindow(QWidget):
         self.init_ui()
         apply_gradient_theme(self)
 
+        bridge = event_bridge()
+        bridge.customers_changed.connect(self.on_customers_changed)
+        bridge.database_changed.connect(self.customer_completer.invalidate)
+        bridge.document_ready.connect(self.on_document_ready)
+        bridge.document_failed.connect(self.on_document_failed)
+
+        # job_id -> DocumentJob for PDFs this window is waiting to print
+        self.pending_documents = {}
+
     def init_ui(self):
+        self.basket = Basket()
+
         layout = QVBoxLayout()
         form_layout = QFormLayout()
 
@@ -48,134 +61,157 @@ class SalesWindow(QWidget):
         self.date_input.setCalendarPopup(True)
         form_layout.addRow(QLabel("Select Date:"), self.date_input)
 
-        # Editable Customer Dropdown
-        self.customer_cb = QComboBox()
-        self.customer_cb.setEditable(True)
-        self.load_customers()
-        form_layout.addRow(QLabel("Customer Name:"), self.customer_cb)
+        # Customer name, completed from the database as it is typed
+        self.customer_input = QLineEdit()
+        self.customer_input.setPlaceholderText("Type to search customers")
+        self.customer_completer = CustomerCompleter(self.customer_input)
+        form_layout.addRow(QLabel("Customer Name:"), self.customer_input)
+
+        # Basket lines, all committed under one invoice
+        self.basket_table = QTableWidget(0, 4)
+        self.basket_table.setHorizontalHeaderLabels(["Product", "Quantity", "Price", "Total"])
+        self.basket_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.basket_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.basket_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.basket_total_label = QLabel("Basket Total: 0.00")
+
+        basket_buttons = QHBoxLayout()
+        self.add_btn = QPushButton("Add to Basket")
+        self.add_btn.clicked.connect(self.add_to_basket)
+        self.remove_btn = QPushButton("Remove Line")
+        self.remove_btn.clicked.connect(self.remove_from_basket)
+        basket_buttons.addWidget(self.add_btn)
+        basket_buttons.addWidget(self.remove_btn)
 
         # Submit Button
         self.submit_btn = QPushButton("Record Sale")
         self.submit_btn.clicked.connect(self.record_sale)
 
         layout.addLayout(form_layout)
+        layout.addLayout(basket_buttons)
+        layout.addWidget(self.basket_table)
+        layout.addWidget(self.basket_total_label)
         layout.addWidget(self.submit_btn)
         self.setLayout(layout)
 
-    def load_customers(self):
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM customers ORDER BY name ASC")
-            customers = cursor.fetchall()
-            conn.close()
-
-            self.customer_cb.clear()
-            for cust in customers:
-                self.customer_cb.addItem(cust[0])
-        except Exception as e:
-            QMessageBox.warning(self, "Database Error", f"Failed to load customers:\n{e}")
+    def on_customers_changed(self, payload=None):
+        # A new customer arrives with its name and is slotted into the open
+        # matches; edits and deletions just drop them.
+        if payload and payload.get('name'):
+            self.customer_completer.add_name(payload['name'])
+        else:
+            self.customer_completer.invalidate()
 
-    def record_sale(self):
+    def read_line(self):
+        """(product, quantity, price) from the inputs, or None after warning the user."""
         product = self.product_cb.currentText()
         quantity = self.quantity_input.text().strip()
         price = self.price_input.text().strip()
-        customer_name = self.customer_cb.currentText().strip()
-        date = self.date_input.date().toString("yyyy-MM-dd")
 
-        if not quantity or not price or not customer_name:
-            QMessageBox.warning(self, "Input Error", "Please fill all required fields.")
-            return
+        if not quantity or not price:
+            QMessageBox.warning(self, "Input Error", "Please enter a quantity and a price.")
+            return None
 
         try:
-            quantity = float(quantity)
-            price = float(price)
+            return product, float(quantity), float(price)
         except ValueError:
             QMessageBox.warning(self, "Input Error", "Quantity and Price must be numeric.")
+            return None
+
+    def add_to_basket(self):
+        line = self.read_line()
+        if line is None:
+            return
+        self.basket.add(*line)
+        self.quantity_input.clear()
+        self.price_input.clear()
+        self.refresh_basket()
+
+    def remove_from_basket(self):
+        row = self.basket_table.currentRow()
+        if row < 0:
+            QMessageBox.information(self, "Basket", "Select a line to remove.")
+            return
+        self.basket.remove(row)
+        self.refresh_basket()
+
+    def refresh_basket(self):
+        self.basket_table.setRowCount(len(self.basket))
+        for row, line in enumerate(self.basket.lines):
+            for col, value in enumerate((line['product'], line['quantity'], line['price'], line['total'])):
+                self.basket_table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.basket_total_label.setText(f"Basket Total: {self.basket.total:,.2f}")
+
+    def record_sale(self):
+        customer_name = self.customer_input.text().strip()
+        date = self.date_input.date().toString("yyyy-MM-dd")
+
+        if not customer_name:
+            QMessageBox.warning(self, "Input Error", "Please fill all required fields.")
             return
 
-        can_proceed, current_qty, reorder_level = can_sell(product, quantity)
-        if not can_proceed:
+        # With an empty basket the inputs are sold as a single line, as before.
+        # The checks run on a copy so a refused sale leaves the basket as it was.
+        basket = self.basket.copy()
+        if not len(basket):
+            line = self.read_line()
+            if line is None:
+                return
+            basket.add(*line)
+        elif self.quantity_input.text().strip() or self.price_input.text().strip():
             QMessageBox.warning(
                 self,
-                "Reorder Level Warning",
-                f"Cannot proceed:\n"
-                f"Selling {quantity} {product} would drop stock below reorder level.\n\n"
-                f"Current Stock: {current_qty}\n"
-                f"Reorder Level: {reorder_level}"
+                "Input Error",
+                "The quantity and price have not been added to the basket.\n"
+                "Add the line or clear them before recording the sale."
             )
             return
 
-        total = quantity * price
+        for product, quantity in basket.quantities().items():
+            can_proceed, current_qty, reorder_level = can_sell(product, quantity)
+            if not can_proceed:
+                QMessageBox.warning(
+                    self,
+                    "Reorder Level Warning",
+                    f"Cannot proceed:\n"
+                    f"Selling {quantity} {product} would drop stock below reorder level.\n\n"
+                    f"Current Stock: {current_qty}\n"
+                    f"Reorder Level: {reorder_level}"
+                )
+                return
 
         try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-
-            # Add customer if it does not exist
-            cursor.execute("SELECT id FROM customers WHERE name = ?", (customer_name,))
-            if not cursor.fetchone():
-                cursor.execute("INSERT INTO customers (name) VALUES (?)", (customer_name,))
-                conn.commit()
-
-            cursor.execute("SELECT MAX(invoice_number) FROM sales")
-            last_invoice = cursor.fetchone()[0] or 0
-            invoice_number = last_invoice + 1
-
-            cursor.execute("SELECT MAX(delivery_note_number) FROM sales")
-            last_delivery_note = cursor.fetchone()[0] or 0
-            delivery_note_number = last_delivery_note + 1
-
-            cursor.execute("""
-                INSERT INTO sales (
-                    product, quantity, price, total, date,
-                    customer_name, invoice_number, delivery_note_number
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                product, quantity, price, total, date,
-                customer_name, invoice_number, delivery_note_number
-            ))
-
-            conn.commit()
-            conn.close()
-
-            update_stock_on_sale(product, quantity)
-
-            sale_data = {
-                'product': product,
-                'quantity': quantity,
-                'price': price,
-                'total': total,
-                'date': date,
-                'customer_name': customer_name
-            }
+            sale_data = record_basket(basket, date, customer_name)
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", str(e))
+            return
 
+        # The sale is committed; the PDFs render in the background and open
+        # for printing from on_document_ready.
+        self.clear_inputs()
+        try:
             save_dir = os.path.join(os.getcwd(), "documents")
-            os.makedirs(save_dir, exist_ok=True)
-
-            invoice_pdf_path = os.path.join(save_dir, f"Invoice_{invoice_number}.pdf")
-            delivery_note_pdf_path = os.path.join(save_dir, f"DeliveryNote_{delivery_note_number}.pdf")
-
-            generate_invoice_pdf_document(invoice_number, sale_data, invoice_pdf_path)
-            generate_delivery_note_pdf_document(delivery_note_number, sale_data, delivery_note_pdf_path)
-
-            self.print_pdf_with_preview(invoice_pdf_path)
-            self.print_pdf_with_preview(delivery_note_pdf_path)
+            for job in document_service.submit_sale_documents(sale_data, save_dir):
+                self.pending_documents[job.job_id] = job
+        except Exception as e:
+            QMessageBox.warning(self, "Document Error", f"Sale recorded, but its documents could not be queued:\n{e}")
+            return
 
-            QMessageBox.information(
-                self,
-                "Success",
-                f"Sale recorded successfully.\n\n"
-                f"Invoice: {invoice_pdf_path}\n"
-                f"Delivery Note: {delivery_note_pdf_path}"
-            )
+        QMessageBox.information(
+            self,
+            "Success",
+            f"Sale recorded successfully ({len(sale_data['items'])} line(s), total {sale_data['total']:,.2f}).\n\n"
+            f"Invoice {sale_data['invoice_number']} and delivery note "
+            f"{sale_data['delivery_note_number']} are being prepared for printing."
+        )
 
-            self.clear_inputs()
-            self.load_customers()  # Refresh customer list after new entry
+    def on_document_ready(self, job):
+        if self.pending_documents.pop(job.job_id, None) is not None:
+            self.print_pdf_with_preview(job.file_path)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", str(e))
+    def on_document_failed(self, job):
+        if self.pending_documents.pop(job.job_id, None) is not None:
+            QMessageBox.warning(self, "Document Error", f"Failed to generate {job.file_path}:\n{job.error}")
 
     def print_pdf_with_preview(self, file_path):
         try:
@@ -216,12 +252,19 @@ class SalesWindow(QWidget):
         except ImportError:
             QMessageBox.warning(self, "Missing QtPdf", "Your PyQt5 build lacks QtPdf. Please install it to enable PDF rendering on print preview.")
 
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        query_executor().cancel_owner(self.customer_completer)
+        super().closeEvent(event)
+
     def clear_inputs(self):
         self.quantity_input.clear()
         self.price_input.clear()
-        self.customer_cb.setEditText("")
+        self.customer_input.clear()
         self.date_input.setDate(QDate.currentDate())
         self.product_cb.setCurrentIndex(0)
+        self.basket = Basket()
+        self.refresh_basket()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,180 @@
+"""
+Full-text search over customers and suppliers.
+
+Each table has an external-content FTS5 index using the trigram tokenizer,
+so any fragment of three or more characters (part of a name, the middle of
+a phone number) is found through the index, case-insensitively, and
+results come back ranked by bm25. Triggers keep the index in step with
+the table inside the same transaction as the write.
+
+Customer names are also completed by prefix (the sale window's customer
+box) through a NOCASE index on customers.name, which serves a `LIKE
+'prefix%'` as an index range.
+
+Fragments shorter than three characters have no trigram to look up; a
+search made only of those falls back to a LIKE prefix match, which stops
+as soon as the result limit is reached but scans the table when little
+matches. The search boxes therefore only search as you type from
+MIN_SEARCH_CHARS on; Enter searches shorter text.
+
+    python search_index.py rebuild [path/to/magen.db]
+"""
+import sqlite3
+
+SEARCH_LIMIT = 200
+
+# bm25 costs a few microseconds per matching row, so a fragment as broad as
+# "wan" (tens of thousands of hits) would spend tens of milliseconds ranking
+# rows nobody will scroll to. Only this many matches are ranked; a search
+# narrow enough to match fewer is ranked in full.
+RANK_CANDIDATES = 500
+
+# How long the search boxes wait after the last keystroke before querying,
+# and the shortest text they search for unprompted (one trigram).
+SEARCH_DEBOUNCE_MS = 200
+MIN_SEARCH_CHARS = 3
+
+# Names offered by the customer completer for one prefix.
+COMPLETION_LIMIT = 50
+
+CUSTOMER_COMPLETION_SQL = """
+    SELECT name FROM customers
+    WHERE name LIKE ? ESCAPE '\\'
+    ORDER BY name COLLATE NOCASE
+    LIMIT ?
+"""
+
+# (index table, content table, indexed columns)
+SEARCH_INDEXES = [
+    ("customers_fts", "customers", ["name", "phone", "address"]),
+    ("suppliers_fts", "suppliers", ["supplier_name", "contact_person", "phone", "products_supplied"]),
+]
+
+# Columns shown by the Customers / Suppliers windows, in table order.
+CUSTOMER_COLUMNS = ["id", "name", "phone", "address"]
+SUPPLIER_COLUMNS = ["id", "supplier_name", "contact_person", "phone", "email", "address", "products_supplied"]
+
+
+def search_index_statements(indexes=SEARCH_INDEXES):
+    statements = []
+    for index, table, columns in indexes:
+        cols = ", ".join(columns)
+        new = ", ".join(f"NEW.{col}" for col in columns)
+        old = ", ".join(f"OLD.{col}" for col in columns)
+        statements += [
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {cols}, content='{table}', content_rowid='id', tokenize='trigram'
+            )
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {index} (rowid, {cols}) VALUES (NEW.id, {new});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {cols} ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+                INSERT INTO {index} (rowid, {cols}) VALUES (NEW.id, {new});
+            END
+            """,
+        ]
+    return statements
+
+
+def create_search_indexes(conn, indexes=SEARCH_INDEXES):
+    for statement in search_index_statements(indexes):
+        conn.execute(statement)
+
+
+def rebuild(conn, indexes=SEARCH_INDEXES):
+    """Re-reads every row of the content tables into their indexes."""
+    for index, _, _ in indexes:
+        conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def match_expression(terms):
+    """FTS5 query requiring every term, each quoted so punctuation in phone numbers etc. is literal."""
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def like_prefix(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def search(conn, search_index, columns, text, limit=SEARCH_LIMIT):
+    """
+    Rows of the content table (as `columns`) matching every word of `text`,
+    best match first. Empty text returns the first `limit` rows by id.
+    """
+    index, table, searched = search_index
+    terms = text.split()
+    select = ", ".join(f"t.{col}" for col in columns)
+    indexed = [term for term in terms if len(term) >= 3]
+    short = [term for term in terms if len(term) < 3]
+
+    filters, params = [], []
+    for term in short:
+        filters.append("(" + " OR ".join(f"t.{col} LIKE ? ESCAPE '\\'" for col in searched) + ")")
+        params += [like_prefix(term)] * len(searched)
+
+    if indexed:
+        where = " AND ".join([f"{index} MATCH ?"] + filters)
+        sql = f"""
+            WITH matches AS MATERIALIZED (
+                SELECT f.rowid AS id, f.rank AS rank FROM {index} f JOIN {table} t ON t.id = f.rowid
+                WHERE {where}
+                LIMIT {RANK_CANDIDATES}
+            )
+            SELECT {select} FROM matches m JOIN {table} t ON t.id = m.id
+            ORDER BY m.rank
+            LIMIT ?
+        """
+        params = [match_expression(indexed)] + params
+    else:
+        sql = f"SELECT {select} FROM {table} t WHERE {' AND '.join(filters) or '1 = 1'} ORDER BY t.id LIMIT ?"
+    return conn.execute(sql, params + [limit]).fetchall()
+
+
+def complete_customer_names(conn, prefix, limit=COMPLETION_LIMIT):
+    """Customer names starting with `prefix` (case-insensitive), alphabetically."""
+    return [row[0] for row in conn.execute(CUSTOMER_COMPLETION_SQL, (like_prefix(prefix), limit))]
+
+
+def search_customers(conn, text, limit=SEARCH_LIMIT):
+    return search(conn, SEARCH_INDEXES[0], CUSTOMER_COLUMNS, text, limit)
+
+
+def search_suppliers(conn, text, limit=SEARCH_LIMIT):
+    return search(conn, SEARCH_INDEXES[1], SUPPLIER_COLUMNS, text, limit)
+
+
+if __name__ == "__main__":
+    import sys
+    from database import DB_FILE, configure_connection, ensure_schema
+
+    if sys.argv[1:2] != ["rebuild"]:
+        print("Usage: python search_index.py rebuild [path/to/magen.db]")
+        sys.exit(2)
+
+    db_file = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    conn = configure_connection(sqlite3.connect(db_file, isolation_level=None))
+    try:
+        ensure_schema(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        rebuild(conn)
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        print(f"❌ Search index rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    print("✅ Customer and supplier search indexes rebuilt.")
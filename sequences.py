@@ -0,0 +1,147 @@
+import os
+import socket
+import threading
+
+from database import DB_FILE, get_pool
+
+INVOICE = "invoice"
+DELIVERY_NOTE = "delivery_note"
+LPO = "lpo"
+
+# Where each sequence continues from when the table is first created, so
+# numbering carries on from documents issued before sequences existed.
+SEED_QUERIES = {
+    INVOICE: "SELECT MAX(invoice_number) FROM sales",
+    DELIVERY_NOTE: "SELECT MAX(delivery_note_number) FROM sales",
+    LPO: "SELECT MAX(id) FROM purchases",
+}
+
+TERMINAL_ID = os.environ.get("MAGEN_TERMINAL_ID", socket.gethostname())
+BLOCK_SIZE = int(os.environ.get("MAGEN_DOCUMENT_BLOCK_SIZE", "1"))
+
+
+def create_sequence_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_sequences (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_number_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            terminal_id TEXT NOT NULL,
+            first_value INTEGER NOT NULL,
+            last_value INTEGER NOT NULL,
+            allocated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for name, seed_query in SEED_QUERIES.items():
+        if conn.execute("SELECT 1 FROM document_sequences WHERE name = ?", (name,)).fetchone():
+            continue
+        last_value = conn.execute(seed_query).fetchone()[0] or 0
+        conn.execute(
+            "INSERT INTO document_sequences (name, next_value) VALUES (?, ?)", (name, last_value + 1)
+        )
+
+
+def next_number(conn, name):
+    """
+    Allocates the next number of a sequence on the caller's connection.
+    Must run inside the caller's write transaction so a rollback returns it.
+    """
+    cursor = conn.execute(
+        "UPDATE document_sequences SET next_value = next_value + 1 WHERE name = ?", (name,)
+    )
+    if cursor.rowcount == 0:
+        raise KeyError(f"Unknown document sequence '{name}'")
+    return conn.execute(
+        "SELECT next_value - 1 FROM document_sequences WHERE name = ?", (name,)
+    ).fetchone()[0]
+
+
+def allocate_block(conn, name, size, terminal_id=TERMINAL_ID):
+    """Reserves `size` consecutive numbers for one terminal and returns (first, last)."""
+    cursor = conn.execute(
+        "UPDATE document_sequences SET next_value = next_value + ? WHERE name = ?", (size, name)
+    )
+    if cursor.rowcount == 0:
+        raise KeyError(f"Unknown document sequence '{name}'")
+    last_value = conn.execute(
+        "SELECT next_value - 1 FROM document_sequences WHERE name = ?", (name,)
+    ).fetchone()[0]
+    first_value = last_value - size + 1
+    conn.execute("""
+        INSERT INTO document_number_blocks (name, terminal_id, first_value, last_value)
+        VALUES (?, ?, ?, ?)
+    """, (name, terminal_id, first_value, last_value))
+    return first_value, last_value
+
+
+class DocumentNumberAllocator:
+    """
+    Hands out invoice, delivery note and LPO numbers.
+
+    With a block size of 1 every number comes straight from the sequence
+    table inside the caller's transaction, so numbering stays gapless. With
+    a larger block size (hi/lo) each terminal reserves a range up front in
+    its own short transaction and then numbers from memory, so tills never
+    contend on the same row; unused numbers in a block are left as gaps.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, terminal_id=TERMINAL_ID, db_file=DB_FILE):
+        self.block_size = max(1, block_size)
+        self.terminal_id = terminal_id
+        self.db_file = db_file
+        self._blocks = {}
+        self._returned = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, *names):
+        """
+        Makes sure a number is available in memory for each sequence. Call this
+        before opening the transaction that will take() the numbers.
+        """
+        if self.block_size == 1:
+            return
+        with self._lock:
+            missing = [name for name in names if not self._available(name)]
+        if not missing:
+            return
+        with get_pool(self.db_file).transaction() as conn:
+            blocks = {name: allocate_block(conn, name, self.block_size, self.terminal_id) for name in missing}
+        with self._lock:
+            for name, (first_value, last_value) in blocks.items():
+                self._blocks[name] = iter(range(first_value, last_value + 1))
+
+    def _available(self, name):
+        if self._returned.get(name):
+            return True
+        block = self._blocks.get(name)
+        if block is None:
+            return False
+        peeked = next(block, None)
+        if peeked is None:
+            del self._blocks[name]
+            return False
+        self._returned.setdefault(name, []).append(peeked)
+        return True
+
+    def take(self, conn, name):
+        if self.block_size == 1:
+            return next_number(conn, name)
+        with self._lock:
+            if not self._available(name):
+                raise RuntimeError(f"No reserved '{name}' numbers left; call reserve() first")
+            return self._returned[name].pop()
+
+    def put_back(self, name, number):
+        """Returns a number taken for a transaction that rolled back."""
+        if self.block_size == 1:
+            return
+        with self._lock:
+            self._returned.setdefault(name, []).append(number)
+
+
+allocator = DocumentNumberAllocator()
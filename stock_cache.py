@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+from database import DB_FILE, PRAGMAS, configure_connection, get_pool
+
+
+class StockCache:
+    """
+    Process-wide in-memory copy of the stock table (quantity and reorder
+    level per product).
+
+    Writes made anywhere (other tills, maintenance scripts, this process's
+    own pooled connections) are caught by PRAGMA data_version on a dedicated
+    watch connection that never writes: it changes whenever the database is
+    committed to, so checking it costs a few microseconds and the stock table
+    is only re-read after a write.
+
+    The sale and purchase paths write through instead of paying for that
+    re-read: stamp() inside their transaction and store() once it commits.
+    data_version on the writing connection ignores its own commit, so if it
+    has not moved in between, that commit was the only one and the watch
+    connection's new version is adopted along with the stored balance.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._levels = {}
+
+    def _watch_connection(self):
+        if self._conn is None:
+            # Let the pool bring the schema up to date before reading from it.
+            with get_pool(self.db_file).connection():
+                pass
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            self._conn = configure_connection(
+                conn, {k: v for k, v in PRAGMAS.items() if k != "journal_mode"}
+            )
+        return self._conn
+
+    def _refresh_if_stale(self):
+        conn = self._watch_connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        rows = conn.execute("SELECT product, quantity, reorder_level FROM stock").fetchall()
+        self._levels = {product: [quantity or 0, reorder_level or 0] for product, quantity, reorder_level in rows}
+        self._data_version = data_version
+
+    def get(self, product):
+        """Returns (quantity, reorder_level) or None for an untracked product."""
+        with self._lock:
+            self._refresh_if_stale()
+            entry = self._levels.get(product)
+        return tuple(entry) if entry else None
+
+    def levels(self):
+        """Returns {product: (quantity, reorder_level)}."""
+        with self._lock:
+            self._refresh_if_stale()
+            return {product: tuple(entry) for product, entry in self._levels.items()}
+
+    def stamp(self, conn):
+        """
+        Called inside a write transaction on `conn`, which holds the write
+        lock until it commits. Brings the cache up to date and returns the
+        token store() needs.
+        """
+        with self._lock:
+            self._refresh_if_stale()
+            return self._data_version, conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def store(self, conn, stamp, product, quantity, reorder_level):
+        """
+        Write-through of a balance committed on `conn`. Falls back to a
+        re-read on the next lookup if anything else committed since stamp().
+        """
+        cached_version, conn_version = stamp
+        with self._lock:
+            # Watch connection first: if `conn` still shows no other commit
+            # afterwards, this version covers exactly the cache plus ours.
+            data_version = self._watch_connection().execute("PRAGMA data_version").fetchone()[0]
+            if (self._data_version not in (cached_version, data_version)
+                    or conn.execute("PRAGMA data_version").fetchone()[0] != conn_version):
+                self._data_version = None
+                return
+            self._levels[product] = [quantity, reorder_level]
+            self._data_version = data_version
+
+    def invalidate(self):
+        with self._lock:
+            self._data_version = None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+
+
+stock_cache = StockCache()
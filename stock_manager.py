@@ -1,56 +1,150 @@
-import sqlite3
+from database import connection, transaction, on_commit
+from events import STOCK_CHANGED, publish, publish_on_commit
+from stock_cache import stock_cache
 
-DB_FILE = 'magen.db'
+# A checkpoint of every product's balance is written each time the ledger
+# grows by this many movements, bounding point-in-time queries.
+CHECKPOINT_INTERVAL = 500
+DEFAULT_REORDER_LEVEL = 450
 
-def get_connection():
-    return sqlite3.connect(DB_FILE)
+# get_stock_at(): the latest checkpoint at or before a point in time, then
+# the movements recorded after it.
+CHECKPOINT_BEFORE_SQL = """
+    SELECT movement_id, balance FROM stock_checkpoints
+    WHERE product = ? AND taken_at <= ?
+    ORDER BY taken_at DESC, movement_id DESC
+    LIMIT 1
+"""
+
+MOVEMENTS_SINCE_SQL = """
+    SELECT SUM(quantity) FROM stock_movements
+    WHERE product = ? AND id > ? AND created_at <= ?
+"""
 
 def get_current_stock_levels():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT product, quantity FROM stock")
-    stocks = cursor.fetchall()
-    conn.close()
-    return {product: quantity for product, quantity in stocks}
+    return {product: quantity for product, (quantity, _) in stock_cache.levels().items()}
+
+def record_movement(conn, product, quantity, kind, reference=None, create_missing=False):
+    """
+    Appends one signed movement to the ledger and applies it to the
+    materialized balance in stock, on the caller's connection so both land in
+    the caller's transaction. Returns the movement id.
+    """
+    row = conn.execute(
+        "UPDATE stock SET quantity = quantity + ? WHERE product = ? RETURNING quantity, reorder_level",
+        (quantity, product)
+    ).fetchone()
+    if row is None:
+        if not create_missing:
+            raise ValueError(f"Product '{product}' is not tracked in stock.")
+        conn.execute(
+            "INSERT INTO stock (product, quantity, reorder_level) VALUES (?, ?, ?)",
+            (product, quantity, DEFAULT_REORDER_LEVEL)
+        )
+        row = (quantity, DEFAULT_REORDER_LEVEL)
+
+    movement_id = conn.execute(
+        "INSERT INTO stock_movements (product, kind, quantity, reference) VALUES (?, ?, ?, ?)",
+        (product, kind, quantity, reference)
+    ).lastrowid
+    if movement_id % CHECKPOINT_INTERVAL == 0:
+        write_checkpoint(conn, movement_id)
+
+    # The balance read back inside the transaction already includes every
+    # other till's committed movements, so the cache stores it as-is.
+    stamp = stock_cache.stamp(conn)
+    on_commit(lambda: stock_cache.store(conn, stamp, product, *row))
+    publish_on_commit(STOCK_CHANGED, {'product': product, 'quantity': row[0], 'change': quantity})
+    return movement_id
+
+def write_checkpoint(conn, movement_id):
+    """Snapshots every balance as of `movement_id` (the materialized stock rows)."""
+    taken_at = conn.execute(
+        "SELECT created_at FROM stock_movements WHERE id = ?", (movement_id,)
+    ).fetchone()[0]
+    conn.execute("""
+        INSERT OR REPLACE INTO stock_checkpoints (product, movement_id, balance, taken_at)
+        SELECT product, ?, quantity, ? FROM stock
+    """, (movement_id, taken_at))
+
+def decrement_stock(conn, product, quantity_sold, reference=None):
+    """
+    Atomically subtracts a sold quantity on the caller's connection, so it
+    commits together with the sale that caused it.
+    """
+    return record_movement(conn, product, -quantity_sold, "sale", reference)
+
+def increment_stock(conn, product, quantity_purchased, reference=None):
+    return record_movement(conn, product, quantity_purchased, "purchase", reference, create_missing=True)
 
 def update_stock_on_sale(product, quantity_sold):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT quantity FROM stock WHERE product = ?", (product,))
-    result = cursor.fetchone()
-    if result:
-        current_quantity = result[0]
-        new_quantity = current_quantity - quantity_sold
-        if new_quantity < 0:
-            new_quantity = 0  # Prevent negative quantities; adjust as needed
-        cursor.execute("UPDATE stock SET quantity = ? WHERE product = ?", (new_quantity, product))
-        conn.commit()
-    conn.close()
+    with transaction() as conn:
+        decrement_stock(conn, product, quantity_sold)
 
 def update_stock_on_purchase(product, quantity_purchased):
     """
     Adds purchased quantity to stock.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT quantity FROM stock WHERE product = ?", (product,))
-    result = cursor.fetchone()
-    if result:
-        current_quantity = result[0]
-        new_quantity = current_quantity + quantity_purchased
-        cursor.execute("UPDATE stock SET quantity = ? WHERE product = ?", (new_quantity, product))
-        conn.commit()
-    conn.close()
+    with transaction() as conn:
+        increment_stock(conn, product, quantity_purchased)
+
+def adjust_stock(product, quantity, reason=None):
+    """Records a signed correction, e.g. after a dip reading or a spillage."""
+    with transaction() as conn:
+        return record_movement(conn, product, quantity, "adjustment", reason)
+
+def transfer_stock(from_product, to_product, quantity, reference=None):
+    with transaction() as conn:
+        record_movement(conn, from_product, -quantity, "transfer", reference)
+        record_movement(conn, to_product, quantity, "transfer", reference)
+
+def get_stock_at(product, when):
+    """
+    Balance of `product` as of the timestamp `when` ('yyyy-MM-dd HH:MM:SS').
+    Starts from the latest checkpoint before `when` and only sums the
+    movements recorded after it.
+    """
+    with connection() as conn:
+        checkpoint = conn.execute(CHECKPOINT_BEFORE_SQL, (product, when)).fetchone()
+        after_id, balance = checkpoint if checkpoint else (0, 0)
+        delta = conn.execute(MOVEMENTS_SINCE_SQL, (product, after_id, when)).fetchone()[0]
+    return balance + (delta or 0)
+
+def rebuild_balances():
+    """
+    Recomputes stock balances and checkpoints from the ledger in one
+    streaming pass over stock_movements in id order. Returns {product: balance}.
+    """
+    balances = {}
+    with transaction() as conn:
+        conn.execute("DELETE FROM stock_checkpoints")
+        checkpoints = []
+        reader = conn.execute("SELECT id, product, quantity, created_at FROM stock_movements ORDER BY id")
+        for movement_id, product, quantity, created_at in reader:
+            balances[product] = balances.get(product, 0) + quantity
+            if movement_id % CHECKPOINT_INTERVAL == 0:
+                checkpoints.extend(
+                    (name, movement_id, balance, created_at) for name, balance in balances.items()
+                )
+
+        conn.executemany(
+            "INSERT INTO stock_checkpoints (product, movement_id, balance, taken_at) VALUES (?, ?, ?, ?)",
+            checkpoints
+        )
+        conn.execute("UPDATE stock SET quantity = 0")
+        conn.executemany(
+            "UPDATE stock SET quantity = ? WHERE product = ?",
+            [(balance, product) for product, balance in balances.items()]
+        )
+    stock_cache.invalidate()
+    publish(STOCK_CHANGED)
+    return balances
 
 def can_sell(product, quantity_requested):
     """
     Prevent sales if it will drop stock below reorder level.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT quantity, reorder_level FROM stock WHERE product = ?", (product,))
-    result = cursor.fetchone()
-    conn.close()
+    result = stock_cache.get(product)
     if result:
         current_qty, reorder_level = result
         if current_qty - quantity_requested < reorder_level:
@@ -64,18 +158,18 @@ def get_low_stock_alerts():
     """
     Returns a list of products where current stock <= reorder level.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT product, quantity, reorder_level FROM stock")
-    products = cursor.fetchall()
-    conn.close()
     alerts = []
-    for product, qty, reorder in products:
+    for product, (qty, reorder) in stock_cache.levels().items():
         if qty <= reorder:
             alerts.append(f"{product} is low: {qty}L left (Reorder Level: {reorder}L)")
     return alerts
 
 if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["rebuild"]:
+        print("Rebuilt stock balances from ledger:", rebuild_balances())
+        sys.exit(0)
+
     print("Current stock levels:", get_current_stock_levels())
     alerts = get_low_stock_alerts()
     if alerts:
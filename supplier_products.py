@@ -0,0 +1,123 @@
+"""
+Which suppliers supply which products.
+
+supplier_products holds one (product, supplier_id) row per product a
+supplier delivers, keyed on product first, so "who supplies AGO" is a
+single primary-key range. The Suppliers window still takes a free-text
+"Products Supplied" field; parse_products() turns it into product names
+and set_supplier_products() replaces a supplier's rows whenever it is
+saved. Rows go with their supplier through a delete trigger.
+
+    python supplier_products.py rebuild [path/to/magen.db]
+"""
+import re
+import sqlite3
+
+# "PMS, AGO", "PMS/AGO & IK", "PMS and AGO", one per line...
+SEPARATORS = re.compile(r"[,;/&|+\n]|\band\b", re.IGNORECASE)
+
+SUPPLIER_PRODUCT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS supplier_products (
+        product TEXT NOT NULL,
+        supplier_id INTEGER NOT NULL REFERENCES suppliers(id),
+        PRIMARY KEY (product, supplier_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_supplier_products_supplier ON supplier_products(supplier_id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS supplier_products_delete AFTER DELETE ON suppliers
+    BEGIN
+        DELETE FROM supplier_products WHERE supplier_id = OLD.id;
+    END
+    """,
+]
+
+SUPPLIERS_FOR_PRODUCT_SQL = """
+    SELECT s.supplier_name
+    FROM supplier_products p JOIN suppliers s ON s.id = p.supplier_id
+    WHERE p.product = ?
+    ORDER BY s.supplier_name
+"""
+
+
+def create_supplier_product_tables(conn):
+    for statement in SUPPLIER_PRODUCT_TABLES:
+        conn.execute(statement)
+
+
+def known_products(conn):
+    return [row[0] for row in conn.execute("SELECT product FROM stock")]
+
+
+def parse_products(text, products):
+    """
+    Product names in a free-text list, spelled as in `products` where they
+    match one (case-insensitively). A piece that is not a known product
+    but is made only of known products separated by spaces ("PMS AGO")
+    counts as each of them; anything else is kept as written.
+    """
+    canonical = {product.lower(): product for product in products}
+    found = []
+    for piece in SEPARATORS.split(text or ""):
+        piece = " ".join(piece.split())
+        if not piece:
+            continue
+        words = piece.lower().split()
+        if piece.lower() in canonical:
+            names = [canonical[piece.lower()]]
+        elif all(word in canonical for word in words):
+            names = [canonical[word] for word in words]
+        else:
+            names = [piece]
+        found += [name for name in names if name not in found]
+    return found
+
+
+def set_supplier_products(conn, supplier_id, products_supplied, products=None):
+    """Replaces the supplier's rows with the products named in `products_supplied`."""
+    if products is None:
+        products = known_products(conn)
+    conn.execute("DELETE FROM supplier_products WHERE supplier_id = ?", (supplier_id,))
+    conn.executemany(
+        "INSERT INTO supplier_products (product, supplier_id) VALUES (?, ?)",
+        [(product, supplier_id) for product in parse_products(products_supplied, products)],
+    )
+
+
+def rebuild(conn):
+    """Re-parses every supplier's products_supplied. Returns the number of rows written."""
+    products = known_products(conn)
+    conn.execute("DELETE FROM supplier_products")
+    for supplier_id, products_supplied in conn.execute(
+        "SELECT id, products_supplied FROM suppliers"
+    ).fetchall():
+        set_supplier_products(conn, supplier_id, products_supplied, products)
+    return conn.execute("SELECT COUNT(*) FROM supplier_products").fetchone()[0]
+
+
+def suppliers_for_product(conn, product):
+    return [row[0] for row in conn.execute(SUPPLIERS_FOR_PRODUCT_SQL, (product,))]
+
+
+if __name__ == "__main__":
+    import sys
+    from database import DB_FILE, configure_connection, ensure_schema
+
+    if sys.argv[1:2] != ["rebuild"]:
+        print("Usage: python supplier_products.py rebuild [path/to/magen.db]")
+        sys.exit(2)
+
+    db_file = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    conn = configure_connection(sqlite3.connect(db_file, isolation_level=None))
+    try:
+        ensure_schema(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        written = rebuild(conn)
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        print(f"❌ Supplier products rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f"✅ supplier_products: {written} rows rebuilt.")
@@ -1,13 +1,27 @@
 import sys
-import sqlite3
-import csv
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QFormLayout, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QHBoxLayout, QFileDialog, QLabel
+    QTableWidget, QTableWidgetItem, QMessageBox, QHBoxLayout, QLabel
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
+from database import connection, transaction
+from query_executor import query_executor
+from qt_export import ask_csv_path, start_csv_export
+from search_index import MIN_SEARCH_CHARS, SEARCH_DEBOUNCE_MS, search_suppliers
+from supplier_products import set_supplier_products
 from themes import apply_gradient_theme
 
+SUPPLIERS_SQL = """
+    SELECT id, supplier_name, contact_person, phone, email, address, products_supplied
+    FROM suppliers ORDER BY id
+"""
+
+def fetch_suppliers(conn):
+    return conn.execute(SUPPLIERS_SQL).fetchall()
+
+def fetch_matching_suppliers(conn, keyword):
+    return search_suppliers(conn, keyword)
+
 class SuppliersWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -16,9 +30,6 @@ class SuppliersWindow(QWidget):
         self.setGeometry(200, 200, 750, 500)
         self.init_ui()
 
-    def get_connection(self):
-        return sqlite3.connect('magen.db')
-
     def init_ui(self):
         layout = QVBoxLayout()
 
@@ -60,14 +71,17 @@ class SuppliersWindow(QWidget):
         # Search
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by supplier name, contact, or product...")
-        self.search_button = QPushButton("Search")
+        self.search_input.setPlaceholderText("Search by supplier name, contact, phone or product...")
         self.clear_search_button = QPushButton("Clear")
         search_layout.addWidget(self.search_input)
-        search_layout.addWidget(self.search_button)
         search_layout.addWidget(self.clear_search_button)
         layout.addLayout(search_layout)
 
+        # Searches once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+
         # Table
         self.table = QTableWidget()
         self.table.setColumnCount(7)
@@ -85,8 +99,10 @@ class SuppliersWindow(QWidget):
         self.update_button.clicked.connect(self.update_supplier)
         self.delete_button.clicked.connect(self.delete_supplier)
         self.export_button.clicked.connect(self.export_to_csv)
-        self.search_button.clicked.connect(self.search_suppliers)
-        self.clear_search_button.clicked.connect(self.load_suppliers)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.search_suppliers)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.clear_search_button.clicked.connect(self.search_input.clear)
         self.table.itemSelectionChanged.connect(self.load_selected_supplier)
 
         self.load_suppliers()
@@ -115,32 +131,36 @@ class SuppliersWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Supplier Name and Phone are required.")
             return
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO suppliers (supplier_name, contact_person, phone, email, address, products_supplied)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (supplier_name, contact_person, phone, email, address, products_supplied))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO suppliers (supplier_name, contact_person, phone, email, address, products_supplied)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (supplier_name, contact_person, phone, email, address, products_supplied))
+            set_supplier_products(conn, cursor.lastrowid, products_supplied)
 
         self.clear_inputs()
-        self.load_suppliers()
+        self.search_suppliers()
         QMessageBox.information(self, "Success", "Supplier added successfully.")
 
     def load_suppliers(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM suppliers")
-        suppliers = cursor.fetchall()
-        conn.close()
-
-        self.table.setRowCount(0)
-        for row_data in suppliers:
-            row_index = self.table.rowCount()
-            self.table.insertRow(row_index)
+        self.run_query(fetch_suppliers)
+
+    def run_query(self, fn, *args):
+        query_executor().submit(
+            (self, "suppliers"), fn, *args,
+            on_result=self.show_suppliers,
+            on_error=lambda error: QMessageBox.warning(self, "Database Error", f"Failed to load suppliers:\n{error}"),
+        )
+
+    def show_suppliers(self, suppliers):
+        self.table.setUpdatesEnabled(False)
+        self.table.clearContents()
+        self.table.setRowCount(len(suppliers))
+        for row_index, row_data in enumerate(suppliers):
             for col, data in enumerate(row_data):
-                self.table.setItem(row_index, col, QTableWidgetItem(str(data)))
+                self.table.setItem(row_index, col, QTableWidgetItem("" if data is None else str(data)))
+        self.table.setUpdatesEnabled(True)
 
     def load_selected_supplier(self):
         selected = self.table.selectedItems()
@@ -170,18 +190,17 @@ class SuppliersWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Supplier Name and Phone are required.")
             return
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE suppliers
-            SET supplier_name = ?, contact_person = ?, phone = ?, email = ?, address = ?, products_supplied = ?
-            WHERE id = ?
-        """, (supplier_name, contact_person, phone, email, address, products_supplied, supplier_id))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE suppliers
+                SET supplier_name = ?, contact_person = ?, phone = ?, email = ?, address = ?, products_supplied = ?
+                WHERE id = ?
+            """, (supplier_name, contact_person, phone, email, address, products_supplied, supplier_id))
+            set_supplier_products(conn, supplier_id, products_supplied)
 
         self.clear_inputs()
-        self.load_suppliers()
+        self.search_suppliers()
         QMessageBox.information(self, "Success", "Supplier updated successfully.")
 
     def delete_supplier(self):
@@ -196,52 +215,39 @@ class SuppliersWindow(QWidget):
                                        "Are you sure you want to delete this supplier?",
                                        QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
-            conn.commit()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
 
             self.clear_inputs()
-            self.load_suppliers()
+            self.search_suppliers()
             QMessageBox.information(self, "Deleted", "Supplier deleted successfully.")
 
+    def search_as_you_type(self):
+        keyword = self.search_input.text().strip()
+        if not keyword or len(keyword) >= MIN_SEARCH_CHARS:
+            self.search_suppliers()
+
     def search_suppliers(self):
+        self.search_timer.stop()
         keyword = self.search_input.text().strip()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM suppliers
-            WHERE supplier_name LIKE ? OR contact_person LIKE ? OR products_supplied LIKE ?
-        """, (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"))
-        suppliers = cursor.fetchall()
-        conn.close()
-
-        self.table.setRowCount(0)
-        for row_data in suppliers:
-            row_index = self.table.rowCount()
-            self.table.insertRow(row_index)
-            for col, data in enumerate(row_data):
-                self.table.setItem(row_index, col, QTableWidgetItem(str(data)))
+        if keyword:
+            self.run_query(fetch_matching_suppliers, keyword)
+        else:
+            self.load_suppliers()
+
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
 
     def export_to_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save CSV", "", "CSV Files (*.csv)")
+        path = ask_csv_path(self, "Save CSV")
         if path:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM suppliers")
-            suppliers = cursor.fetchall()
-            conn.close()
-
-            with open(path, "w", newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    "ID", "Supplier Name", "Contact Person",
-                    "Phone", "Email", "Address", "Products Supplied"
-                ])
-                writer.writerows(suppliers)
-
-            QMessageBox.information(self, "Export Complete", f"Supplier data exported to {path}")
+            start_csv_export(
+                self, SUPPLIERS_SQL, (),
+                ["ID", "Supplier Name", "Contact Person", "Phone", "Email", "Address", "Products Supplied"], path,
+                count_sql="SELECT COUNT(*) FROM suppliers",
+            )
 
     def clear_inputs(self):
         self.supplier_name_input.clear()
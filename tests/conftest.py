@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The cheapest bcrypt cost, so seeding the admin user does not slow every test.
+os.environ.setdefault("MAGEN_BCRYPT_ROUNDS", "4")
+
+import database
+from database import DB_FILE, close_all_connections, init_db
+
+
+def reset_connections():
+    close_all_connections()
+    database._pools.clear()
+    from stock_cache import stock_cache
+    stock_cache.close()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    A fresh database at the latest schema. DB_FILE is relative, so running
+    in tmp_path sends every default-path connection there.
+    """
+    monkeypatch.chdir(tmp_path)
+    reset_connections()
+    init_db()
+    yield str(tmp_path / DB_FILE)
+    reset_connections()
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A copy of the repository's magen.db, which predates versioned migrations."""
+    monkeypatch.chdir(tmp_path)
+    reset_connections()
+    with open(os.path.join(ROOT, DB_FILE), "rb") as source, open(tmp_path / DB_FILE, "wb") as copy:
+        copy.write(source.read())
+    yield str(tmp_path / DB_FILE)
+    reset_connections()
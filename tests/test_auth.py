@@ -0,0 +1,78 @@
+import pytest
+
+from auth import authenticate, check_password, hash_legacy_passwords, hash_password, hash_rounds
+from database import connection, init_db, transaction
+
+
+def add_user(username, password="", password_hash=None, role="Cashier"):
+    with transaction() as conn:
+        return conn.execute(
+            "INSERT INTO users (username, password, password_hash, role) VALUES (?, ?, ?, ?)",
+            (username, password, password_hash, role),
+        ).lastrowid
+
+
+def stored(username):
+    with connection() as conn:
+        return conn.execute("SELECT password, password_hash FROM users WHERE username = ?", (username,)).fetchone()
+
+
+def test_valid_credentials_return_the_user(db):
+    user_id = add_user("jane", password_hash=hash_password("s3cret", 4))
+    assert authenticate("jane", "s3cret", rounds=4) == {'id': user_id, 'username': 'jane', 'role': 'Cashier'}
+
+
+@pytest.mark.parametrize("username, password", [("jane", "wrong"), ("jane", ""), ("nobody", "s3cret")])
+def test_invalid_credentials_are_refused(db, username, password):
+    add_user("jane", password_hash=hash_password("s3cret", 4))
+    assert authenticate(username, password, rounds=4) is None
+
+
+def test_login_rehashes_at_the_configured_cost(db):
+    add_user("jane", password_hash=hash_password("s3cret", 4))
+
+    assert authenticate("jane", "s3cret", rounds=5)
+    _, upgraded = stored("jane")
+    assert hash_rounds(upgraded) == 5
+    assert check_password("s3cret", upgraded)
+
+    assert authenticate("jane", "s3cret", rounds=5)
+    assert stored("jane")[1] == upgraded
+
+
+def test_failed_login_does_not_rehash(db):
+    original = hash_password("s3cret", 4)
+    add_user("jane", password_hash=original)
+    assert authenticate("jane", "wrong", rounds=5) is None
+    assert stored("jane") == ("", original)
+
+
+def test_legacy_plaintext_password_is_hashed_on_login(db):
+    add_user("old", password="letmein")
+
+    assert authenticate("old", "nope", rounds=4) is None
+    assert stored("old") == ("letmein", None)
+
+    assert authenticate("old", "letmein", rounds=4)
+    plaintext, password_hash = stored("old")
+    assert plaintext == ""
+    assert hash_rounds(password_hash) == 4 and check_password("letmein", password_hash)
+    assert authenticate("old", "letmein", rounds=4)
+
+
+def test_hash_legacy_passwords_hashes_and_blanks(db):
+    add_user("old", password="letmein")
+    add_user("new", password_hash=hash_password("s3cret", 4))
+    with transaction() as conn:
+        assert hash_legacy_passwords(conn, 4) == 1
+        assert hash_legacy_passwords(conn, 4) == 0
+    plaintext, password_hash = stored("old")
+    assert plaintext == "" and check_password("letmein", password_hash)
+
+
+def test_migration_hashes_the_legacy_admin_password(legacy_db):
+    init_db()
+    plaintext, password_hash = stored("admin")
+    assert plaintext == ""
+    assert check_password("admin123", password_hash)
+    assert authenticate("admin", "admin123")["username"] == "admin"
@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_documents
+from bulk_documents import Journal, build_filters, document_requests, main, open_read_only, parse_args
+from database import epoch_day
+from document_service import DELIVERY_NOTE, INVOICE
+from sale_service import Basket, record_basket
+from stock_manager import update_stock_on_purchase
+
+# (date, customer, [(product, quantity, price), ...]) in header id order.
+SALES = [
+    ("2024-05-01", "Acme", [("PMS", 10, 180), ("AGO", 5, 170), ("PMS", 2, 180)]),
+    ("2024-05-02", "Beta", [("IK", 1, 120)]),
+    ("2024-05-03", "Acme", [("AGO", 3, 170), ("Gas", 1, 3000)]),
+]
+
+
+@pytest.fixture
+def sales(db):
+    for product in ("PMS", "AGO", "IK", "Gas"):
+        update_stock_on_purchase(product, 100)
+    recorded = []
+    for date, customer_name, lines in SALES:
+        basket = Basket()
+        for line in lines:
+            basket.add(*line)
+        recorded.append(record_basket(basket, date, customer_name))
+    return recorded
+
+
+def requests(db, kind, out_dir, *argv):
+    conn = open_read_only(db)
+    try:
+        total, selected = document_requests(conn, kind, out_dir, parse_args([kind, *argv]))
+        return total, list(selected)
+    finally:
+        conn.close()
+
+
+def test_sale_lines_are_grouped_into_one_document_per_sale(db, sales, tmp_path):
+    total, selected = requests(db, INVOICE, str(tmp_path))
+
+    assert total == len(selected) == 3
+    kind, number, data, file_path, options = selected[0]
+    assert (kind, number, options) == (INVOICE, sales[0]['invoice_number'], {})
+    assert file_path == os.path.join(str(tmp_path), f"Invoice_{number}.pdf")
+    assert (data['id'], data['customer_name'], data['total']) == (sales[0]['id'], "Acme", 10 * 180 + 5 * 170 + 2 * 180)
+    assert data['items'] == sales[0]['items']
+    assert [len(request[2]['items']) for request in selected] == [3, 1, 2]
+
+    _, notes = requests(db, DELIVERY_NOTE, str(tmp_path))
+    assert [(kind, number) for kind, number, *_ in notes] == [
+        (DELIVERY_NOTE, sale['delivery_note_number']) for sale in sales
+    ]
+
+
+def test_build_filters_combines_dates_and_ids():
+    args = parse_args(["invoice", "--from", "2024-05-02", "--to", "2024-05-03", "--ids", "1", "2"])
+    assert build_filters("h.sale_day", args, id_column="h.id") == (
+        " AND h.sale_day >= ? AND h.sale_day <= ? AND h.id IN (?, ?)",
+        [epoch_day("2024-05-02"), epoch_day("2024-05-03"), 1, 2],
+    )
+    assert build_filters("purchase_day", parse_args(["lpo"])) == ("", [])
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["--from", "2024-05-02"], [1, 2]),
+    (["--to", "2024-05-02", "--ids", "2", "3"], [1]),
+    (["--from", "2024-05-02", "--to", "2024-05-03", "--ids", "1", "3"], [2]),
+])
+def test_date_and_id_filters_select_sales(db, sales, tmp_path, argv, expected):
+    total, selected = requests(db, INVOICE, str(tmp_path), *argv)
+    assert total == len(expected)
+    assert [data['id'] for _, _, data, _, _ in selected] == [sales[i]['id'] for i in expected]
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """Paths passed to render_batch, rendered in threads instead of worker processes."""
+    paths = []
+
+    def render_batch(batch):
+        paths.extend(file_path for _, _, _, file_path, _ in batch)
+        return [(file_path, None) for _, _, _, file_path, _ in batch]
+
+    monkeypatch.setattr(bulk_documents, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(bulk_documents, "render_batch", render_batch)
+    return paths
+
+
+def test_journal_resume_skips_recorded_files(db, sales, tmp_path, rendered):
+    out_dir = str(tmp_path / "reprints")
+    argv = ["invoice", "--out", out_dir, "--db", db, "--workers", "1", "--batch-size", "2"]
+    files = [os.path.join(out_dir, f"Invoice_{sale['invoice_number']}.pdf") for sale in sales]
+
+    # An earlier run finished the first invoice before it was interrupted.
+    os.makedirs(out_dir)
+    journal = Journal(os.path.join(out_dir, ".bulk_invoice.journal"))
+    journal.record(files[:1])
+    journal.close()
+
+    assert main(argv) == 0
+    assert sorted(rendered) == sorted(files[1:])
+
+    rendered.clear()
+    assert main(argv) == 0
+    assert rendered == []
+    journal = Journal(os.path.join(out_dir, ".bulk_invoice.journal"))
+    journal.close()
+    assert journal.done == set(files)
+
+    assert main(argv + ["--restart"]) == 0
+    assert sorted(rendered) == sorted(files)
@@ -0,0 +1,64 @@
+import csv
+import gzip
+import sqlite3
+
+import pytest
+
+from csv_export import ExportCancelled, export_csv
+
+HEADERS = ["id", "customer", "amount"]
+ROWS = [(i, f"Customer {i}, Ltd" if i % 7 == 0 else f"Customer {i}", i * 1.5) for i in range(1, 26)]
+SQL = "SELECT id, customer, amount FROM sales WHERE id >= ? ORDER BY id"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, customer TEXT, amount REAL)")
+    conn.executemany("INSERT INTO sales VALUES (?, ?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+
+def read_back(handle):
+    rows = list(csv.reader(handle))
+    return rows[0], [(int(id_), customer, float(amount)) for id_, customer, amount in rows[1:]]
+
+
+def test_csv_round_trip(conn, tmp_path):
+    path = str(tmp_path / "sales.csv")
+    batches = []
+
+    assert export_csv(conn, SQL, (1,), HEADERS, path, batch_size=10, progress=batches.append) == len(ROWS)
+
+    with open(path, newline="", encoding="utf-8") as file:
+        assert read_back(file) == (HEADERS, ROWS)
+    assert batches == [10, 20, 25]
+    assert not (tmp_path / "sales.csv.part").exists()
+
+
+def test_gz_path_is_compressed(conn, tmp_path):
+    path = str(tmp_path / "sales.csv.gz")
+
+    assert export_csv(conn, SQL, (11,), HEADERS, path) == 15
+
+    with open(path, "rb") as file:
+        assert file.read(2) == b"\x1f\x8b"
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as file:
+        assert read_back(file) == (HEADERS, ROWS[10:])
+
+
+@pytest.mark.parametrize("name", ["sales.csv", "sales.csv.gz"])
+def test_cancelled_export_removes_the_part_file(conn, tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"previous export")
+    batches = []
+
+    with pytest.raises(ExportCancelled):
+        export_csv(conn, SQL, (1,), HEADERS, str(path), batch_size=10,
+                   progress=batches.append, is_cancelled=lambda: len(batches) == 2)
+
+    assert batches == [10, 20]
+    assert not (tmp_path / f"{name}.part").exists()
+    # The destination is only replaced by a complete export.
+    assert path.read_bytes() == b"previous export"
@@ -0,0 +1,49 @@
+import sqlite3
+
+from database import connection, transaction
+from search_index import CUSTOMER_COMPLETION_SQL, complete_customer_names, like_prefix
+
+NAMES = ["amos Kiprop", "Amina Wanjiru", "AMINA HAULAGE", "Brian Otieno", "50% Fuel Ltd", "500 Motors", "A_B Traders", "AXB Traders"]
+
+
+def complete(prefix, limit=50):
+    with connection() as conn:
+        return complete_customer_names(conn, prefix, limit)
+
+
+def fill():
+    with transaction() as conn:
+        conn.executemany("INSERT INTO customers (name) VALUES (?)", [(name,) for name in NAMES])
+
+
+def test_prefix_is_case_insensitive_and_sorted_without_case(db):
+    fill()
+    assert complete("ami") == ["AMINA HAULAGE", "Amina Wanjiru"]
+    assert complete("AM") == ["AMINA HAULAGE", "Amina Wanjiru", "amos Kiprop"]
+
+
+def test_prefix_only_matches_the_start(db):
+    fill()
+    assert complete("Wanj") == []
+    assert complete("Brian") == ["Brian Otieno"]
+
+
+def test_like_wildcards_in_the_prefix_are_literal(db):
+    fill()
+    assert complete("50%") == ["50% Fuel Ltd"]
+    assert complete("A_B") == ["A_B Traders"]
+
+
+def test_completion_stops_at_the_limit(db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO customers (name) VALUES (?)", [(f"Customer {n:03d}",) for n in range(120)])
+    assert complete("cust", limit=10) == [f"Customer {n:03d}" for n in range(10)]
+
+
+def test_completion_reads_the_nocase_index(db):
+    conn = sqlite3.connect(db)
+    try:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {CUSTOMER_COMPLETION_SQL}", (like_prefix("ami"), 50))]
+    finally:
+        conn.close()
+    assert plan == ["SEARCH customers USING COVERING INDEX idx_customers_name_nocase (name>? AND name<?)"]
@@ -0,0 +1,130 @@
+import sqlite3
+
+import migrations
+from database import DB_FILE, init_db
+from migrations import LATEST_VERSION, get_version
+from query_audit import audit
+
+
+def schema(db_file):
+    """({table or view: {column: type}}, {(type, name) of every index and trigger})"""
+    conn = sqlite3.connect(db_file)
+    try:
+        tables = {
+            name: {row[1]: row[2] for row in conn.execute(f"PRAGMA table_xinfo('{name}')")}
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+            )
+        }
+        objects = set(conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') AND name NOT LIKE 'sqlite_%'"
+        ))
+    finally:
+        conn.close()
+    return tables, objects
+
+
+def fresh_schema(tmp_path):
+    fresh = str(tmp_path / "fresh.db")
+    init_db(fresh)
+    return schema(fresh)
+
+
+def test_fresh_database_starts_at_latest_version(db):
+    conn = sqlite3.connect(db)
+    try:
+        assert get_version(conn) == LATEST_VERSION
+    finally:
+        conn.close()
+    assert init_db() == LATEST_VERSION
+
+
+def test_legacy_database_migrates_through_every_version(legacy_db):
+    assert init_db() == 0
+
+    conn = sqlite3.connect(legacy_db)
+    try:
+        assert get_version(conn) == LATEST_VERSION
+    finally:
+        conn.close()
+    assert init_db() == LATEST_VERSION
+
+
+def test_migrated_schema_matches_fresh_schema(legacy_db, tmp_path):
+    init_db()
+    migrated_tables, migrated_objects = schema(DB_FILE)
+    fresh_tables, fresh_objects = fresh_schema(tmp_path)
+
+    assert migrated_objects == fresh_objects
+    for table, columns in fresh_tables.items():
+        assert table in migrated_tables
+        # Legacy tables may keep extra columns; everything the app uses must exist.
+        assert columns.items() <= migrated_tables[table].items(), table
+
+
+def test_migrated_database_keeps_legacy_rows(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    try:
+        before = conn.execute("SELECT id, username, role FROM users ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+    init_db()
+
+    conn = sqlite3.connect(legacy_db)
+    try:
+        assert conn.execute("SELECT id, username, role FROM users ORDER BY id").fetchall() == before
+    finally:
+        conn.close()
+
+
+def test_hot_queries_use_indexes_after_migration(legacy_db):
+    init_db()
+    conn = sqlite3.connect(legacy_db)
+    try:
+        scans = [name for name, (_, is_scan) in audit(conn).items() if is_scan]
+    finally:
+        conn.close()
+    assert scans == []
+
+
+def test_sale_customer_ids_backfill_from_version_6(legacy_db, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "MIGRATIONS", [item for item in migrations.MIGRATIONS if item[0] <= 6])
+        init_db()
+
+    conn = sqlite3.connect(legacy_db)
+    try:
+        assert get_version(conn) == 6
+        acme = conn.execute("INSERT INTO customers (name) VALUES ('Acme')").lastrowid
+        conn.execute("INSERT INTO customers (name) VALUES ('Beta')")
+        for header_id, customer_name in [(1, "Acme"), (2, "Walk-in Ltd"), (3, ""), (4, None)]:
+            conn.execute(
+                "INSERT INTO sale_headers (id, invoice_number, delivery_note_number, customer_name, date, total) "
+                "VALUES (?, ?, ?, ?, '2024-05-01', 100)",
+                (header_id, header_id, header_id, customer_name),
+            )
+        conn.executemany(
+            "INSERT INTO sale_lines (header_id, product, quantity, price, total, date, customer_name) "
+            "VALUES (?, 'PMS', 1, 100, 100, '2024-05-01', ?)",
+            [(1, "Acme"), (1, "Acme"), (2, "Walk-in Ltd"), (3, ""), (4, None), (None, "Acme")],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert init_db() == 6
+
+    conn = sqlite3.connect(legacy_db)
+    try:
+        walk_in = conn.execute("SELECT id FROM customers WHERE name = 'Walk-in Ltd'").fetchone()[0]
+        assert conn.execute("SELECT COUNT(*) FROM customers WHERE name = ''").fetchone()[0] == 0
+        assert conn.execute("SELECT id, customer_id FROM sale_headers ORDER BY id").fetchall() == [
+            (1, acme), (2, walk_in), (3, None), (4, None),
+        ]
+        # Lines follow their header; a line without one stays unmatched.
+        assert conn.execute("SELECT header_id, customer_id FROM sale_lines ORDER BY id").fetchall() == [
+            (1, acme), (1, acme), (2, walk_in), (3, None), (4, None), (None, None),
+        ]
+    finally:
+        conn.close()
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+import pytest
+
+from database import connection, epoch_day, transaction
+from report_queries import ReportQuery, purchases_report, sales_report, stock_report
+
+FIRST_DAY = date(2023, 1, 1)
+DAYS = 150
+ROWS_PER_DAY = 12
+
+
+@pytest.fixture
+def history(db):
+    """ROWS_PER_DAY sales and purchases a day for DAYS days, inserted out of date order."""
+    rows = [(day, n) for n in range(ROWS_PER_DAY) for day in range(DAYS)]
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO sale_lines (product, quantity, price, total, date, customer_name) VALUES (?, 1, 1, 1, ?, ?)",
+            [(("PMS", "AGO", "IK")[n % 3], (FIRST_DAY + timedelta(days=day)).isoformat(), f"Customer {n}")
+             for day, n in rows],
+        )
+        conn.executemany(
+            "INSERT INTO purchases (product, quantity, unit_price, total, supplier, date) VALUES ('PMS', 1, 1, 1, ?, ?)",
+            [(f"Supplier {n % 4}", (FIRST_DAY + timedelta(days=day)).isoformat()) for day, n in rows],
+        )
+    return db
+
+
+def expected_ids(conn, table, day_column, start_day, end_day, descending):
+    direction = "DESC" if descending else "ASC"
+    return [row[0] for row in conn.execute(
+        f"SELECT id FROM {table} WHERE {day_column} BETWEEN ? AND ? ORDER BY {day_column} {direction}, id {direction}",
+        (start_day, end_day),
+    )]
+
+
+def day(offset):
+    return epoch_day(FIRST_DAY + timedelta(days=offset))
+
+
+@pytest.mark.parametrize("report, table, day_column", [
+    (sales_report, "sale_lines", "sale_day"),
+    (purchases_report, "purchases", "purchase_day"),
+])
+@pytest.mark.parametrize("start, end", [(0, DAYS - 1), (40, 40), (10, 13), (DAYS - 1, DAYS + 30), (-5, -1)])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [5, 200])
+def test_pages_walk_the_range_in_order(history, report, table, day_column, start, end, descending, page_size):
+    query = report(day(start), day(end))
+    query = query.sorted(query.sort_column, descending)
+    with connection() as conn:
+        ids = [row[0] for row in query.iter_rows(conn, page_size)]
+        assert ids == expected_ids(conn, table, day_column, day(start), day(end), descending)
+
+
+def test_a_page_resumes_from_its_key(history):
+    query = sales_report(day(10), day(12))
+    with connection() as conn:
+        first, key = query.fetch_page(conn, limit=15)
+        second, _ = query.fetch_page(conn, key, limit=15)
+        everything, _ = query.fetch_page(conn, limit=30)
+    assert first + second == everything
+    assert key == (day(11), first[-1][0])
+
+
+def test_export_statement_matches_the_pages(history):
+    query = sales_report(day(3), day(9)).sorted(5, descending=True)
+    sql, params = query.export_statement()
+    with connection() as conn:
+        assert conn.execute(sql, params).fetchall() == list(query.iter_rows(conn, 40))
+
+
+def vm_steps(conn, sql, params):
+    steps = [0]
+
+    def count():
+        steps[0] += 1
+
+    conn.set_progress_handler(count, 10)
+    try:
+        conn.execute(sql, params).fetchall()
+    finally:
+        conn.set_progress_handler(None, 0)
+    return steps[0]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_last_page_of_a_narrow_range_stops_at_the_range(history, descending):
+    query = sales_report(day(100), day(100)).sorted(5, descending)
+    with connection() as conn:
+        _, key = query.fetch_page(conn, limit=ROWS_PER_DAY - 5)
+        last_page, _ = query.fetch_page(conn, key, limit=ROWS_PER_DAY - 5)
+        assert len(last_page) == 5
+
+        last_steps = vm_steps(conn, query.page_sql(key), query.params + tuple(key) + (ROWS_PER_DAY - 5,))
+        # Counting the index entries past the range is cheaper per entry than reading them for a page.
+        outside = "sale_day < ?" if descending else "sale_day > ?"
+        outside_steps = vm_steps(conn, f"SELECT COUNT(*) FROM sale_lines WHERE {outside}", (day(100),))
+    assert last_steps < outside_steps
+
+
+def test_page_sql_keeps_the_far_bound_indexed():
+    query = sales_report(1, 2)
+    assert query.page_sql().count("sale_day BETWEEN ? AND ?") == 1
+    assert "(+sale_day >= ? AND sale_day <= ?)" in query.page_sql(after_key=(1, 1))
+    assert "(sale_day >= ? AND +sale_day <= ?)" in query.sorted(5, descending=True).page_sql(after_key=(1, 1))
+
+
+def test_ranged_reports_only_sort_by_their_range_column():
+    sales, purchases = sales_report(1, 2), purchases_report(1, 2)
+    assert [column for column in range(len(sales.columns)) if sales.sortable(column)] == [5]
+    assert [column for column in range(len(purchases.columns)) if purchases.sortable(column)] == [6]
+    assert sales.sorted(1) is None
+    with pytest.raises(ValueError):
+        ReportQuery("sale_lines", [("ID", "id")], params=(1, 2), sort_keys={0: ("id",)}, range_column="sale_day")
+
+
+@pytest.mark.parametrize("column, descending", [(0, False), (0, True), (1, False), (1, True)])
+def test_stock_report_sorts(db, column, descending):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO stock (product, quantity) VALUES (?, 0)", [(f"P{n:02d}",) for n in range(30)])
+    query = stock_report().sorted(column, descending)
+    with connection() as conn:
+        rows = list(query.iter_rows(conn, 4))
+    key = (lambda row: row[0]) if column == 0 else (lambda row: (row[1], row[0]))
+    assert rows == sorted(rows, key=key, reverse=descending)
+    assert len(rows) == 34
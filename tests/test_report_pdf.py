@@ -0,0 +1,60 @@
+import re
+import sqlite3
+
+import pytest
+from pypdf import PdfReader
+
+from csv_export import ExportCancelled
+from report_pdf import PAGES_PER_CHUNK, export_report_pdf, rows_per_page
+
+HEADERS = ["Date", "Product", "Quantity", "Amount"]
+SQL = "SELECT date, product, quantity, amount FROM sales ORDER BY id"
+
+
+@pytest.fixture
+def conn():
+    """A chunk of whole pages plus one row, so the report spans two chunks."""
+    rows = rows_per_page() * PAGES_PER_CHUNK + 1
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, date TEXT, product TEXT, quantity REAL, amount REAL)")
+    conn.executemany(
+        "INSERT INTO sales (date, product, quantity, amount) VALUES ('2024-05-01', 'PMS', ?, ?)",
+        [(i, i * 1.25) for i in range(1, rows + 1)],
+    )
+    yield conn
+    conn.close()
+
+
+def amount(text, label):
+    return float(re.search(rf"{label}:?\s+([\d,]+\.\d\d)", text).group(1).replace(",", ""))
+
+
+def test_grand_total_matches_the_amount_column_across_chunks(conn, tmp_path):
+    path = tmp_path / "sales.pdf"
+    chunks = []
+
+    rows = export_report_pdf(conn, SQL, (), HEADERS, str(path), "Sales", amount_column=3, progress=chunks.append)
+
+    expected = conn.execute("SELECT SUM(amount) FROM sales").fetchone()[0]
+    assert rows == rows_per_page() * PAGES_PER_CHUNK + 1
+    assert chunks == [rows - 1, rows]
+
+    pages = [page.extract_text() for page in PdfReader(path).pages]
+    assert len(pages) == PAGES_PER_CHUNK + 1
+    assert amount(pages[-1], "Grand total") == pytest.approx(expected)
+    assert amount(pages[-1], "Running total") == pytest.approx(expected)
+    assert sum(amount(page, "Page total") for page in pages) == pytest.approx(expected)
+    assert not (tmp_path / "sales.pdf.part").exists()
+
+
+def test_cancelled_report_removes_the_part_file(conn, tmp_path):
+    path = tmp_path / "sales.pdf"
+    chunks = []
+
+    with pytest.raises(ExportCancelled):
+        export_report_pdf(conn, SQL, (), HEADERS, str(path), "Sales", amount_column=3,
+                          progress=chunks.append, is_cancelled=lambda: bool(chunks))
+
+    assert len(chunks) == 1
+    assert not path.exists()
+    assert not (tmp_path / "sales.pdf.part").exists()
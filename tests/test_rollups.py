@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from database import connection, epoch_day, transaction
+from rollups import ROLLUPS, backfill
+
+SALES, PURCHASES = ROLLUPS
+
+
+def rollup_rows(conn, rollup):
+    table, _, _, key, _ = rollup
+    return conn.execute(f"SELECT day, {key}, quantity, amount, count FROM {table} ORDER BY 1, 2").fetchall()
+
+
+def recomputed_rows(conn, rollup):
+    _, source, day, key, amount = rollup
+    return conn.execute(f"""
+        SELECT {day}, COALESCE({key}, ''), SUM(COALESCE(quantity, 0)), SUM(COALESCE({amount}, 0)), COUNT(*)
+        FROM {source}
+        WHERE {day} IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """).fetchall()
+
+
+def add_sale(conn, product, quantity, date):
+    return conn.execute(
+        "INSERT INTO sale_lines (product, quantity, price, total, date) VALUES (?, ?, 100, ?, ?)",
+        (product, quantity, quantity * 100, date),
+    ).lastrowid
+
+
+def test_sales_rollup_follows_insert_update_and_delete(db):
+    with transaction() as conn:
+        first = add_sale(conn, "PMS", 10, "2024-01-05")
+        second = add_sale(conn, "PMS", 5, "2024-01-05")
+    day = epoch_day("2024-01-05")
+
+    with connection() as conn:
+        assert rollup_rows(conn, SALES) == [(day, "PMS", 15, 1500, 2)]
+
+        conn.execute("UPDATE sale_lines SET quantity = 8, total = 800 WHERE id = ?", (first,))
+        assert rollup_rows(conn, SALES) == [(day, "PMS", 13, 1300, 2)]
+
+        conn.execute("UPDATE sale_lines SET product = 'AGO', date = '2024-01-06' WHERE id = ?", (second,))
+        assert rollup_rows(conn, SALES) == [(day, "PMS", 8, 800, 1), (day + 1, "AGO", 5, 500, 1)]
+
+        conn.execute("DELETE FROM sale_lines WHERE id = ?", (second,))
+        assert rollup_rows(conn, SALES) == [(day, "PMS", 8, 800, 1)]
+
+        # The last line of a day takes its rollup row with it.
+        conn.execute("DELETE FROM sale_lines WHERE id = ?", (first,))
+        assert rollup_rows(conn, SALES) == []
+
+
+def test_purchases_rollup_follows_supplier_changes(db):
+    with connection() as conn:
+        purchase = conn.execute(
+            "INSERT INTO purchases (product, quantity, unit_price, total, supplier, date) "
+            "VALUES ('PMS', 1000, 150, 150000, 'Total', '2024-02-01')"
+        ).lastrowid
+        conn.execute("UPDATE purchases SET supplier = NULL WHERE id = ?", (purchase,))
+        assert rollup_rows(conn, PURCHASES) == [(epoch_day("2024-02-01"), "", 1000, 150000, 1)]
+
+        conn.execute("UPDATE purchases SET supplier = 'Rubis', total = 140000 WHERE id = ?", (purchase,))
+        assert rollup_rows(conn, PURCHASES) == [(epoch_day("2024-02-01"), "Rubis", 1000, 140000, 1)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rollups_match_the_source_after_random_writes(db, seed):
+    rng = random.Random(seed)
+    products, suppliers = ["PMS", "AGO", "IK"], ["Total", "Rubis", None]
+    dates = [f"2024-03-{day:02d}" for day in range(1, 6)] + [None]
+
+    with transaction() as conn:
+        for _ in range(300):
+            op = rng.random()
+            sale_ids = [row[0] for row in conn.execute("SELECT id FROM sale_lines")]
+            purchase_ids = [row[0] for row in conn.execute("SELECT id FROM purchases")]
+            if op < 0.35 or not sale_ids:
+                add_sale(conn, rng.choice(products), rng.randint(1, 50), rng.choice(dates))
+            elif op < 0.5:
+                conn.execute(
+                    "INSERT INTO purchases (product, quantity, unit_price, total, supplier, date) VALUES (?, ?, 1, ?, ?, ?)",
+                    (rng.choice(products), rng.randint(1, 50), rng.randint(1, 50), rng.choice(suppliers), rng.choice(dates)),
+                )
+            elif op < 0.7:
+                conn.execute(
+                    "UPDATE sale_lines SET product = ?, quantity = ?, total = ?, date = ? WHERE id = ?",
+                    (rng.choice(products), rng.randint(1, 50), rng.randint(1, 5000), rng.choice(dates), rng.choice(sale_ids)),
+                )
+            elif op < 0.8 and purchase_ids:
+                conn.execute(
+                    "UPDATE purchases SET supplier = ?, date = ? WHERE id = ?",
+                    (rng.choice(suppliers), rng.choice(dates), rng.choice(purchase_ids)),
+                )
+            elif op < 0.9:
+                conn.execute("DELETE FROM sale_lines WHERE id = ?", (rng.choice(sale_ids),))
+            elif purchase_ids:
+                conn.execute("DELETE FROM purchases WHERE id = ?", (rng.choice(purchase_ids),))
+
+    with connection() as conn:
+        for rollup in ROLLUPS:
+            assert rollup_rows(conn, rollup) == recomputed_rows(conn, rollup)
+        maintained = [rollup_rows(conn, rollup) for rollup in ROLLUPS]
+        backfill(conn)
+        assert [rollup_rows(conn, rollup) for rollup in ROLLUPS] == maintained
@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+
+import events
+from database import connection
+from events import SALE_RECORDED
+from sale_service import Basket, record_basket, record_sale
+from stock_manager import get_current_stock_levels, update_stock_on_purchase
+
+
+@pytest.fixture
+def stocked(db):
+    update_stock_on_purchase("PMS", 1000)
+    update_stock_on_purchase("AGO", 500)
+    return db
+
+
+@pytest.fixture
+def recorded(stocked):
+    """Every SALE_RECORDED payload, with the sale_headers count another connection saw at delivery."""
+    delivered = []
+
+    def on_sale(sale):
+        other = sqlite3.connect(stocked)
+        try:
+            committed = other.execute("SELECT COUNT(*) FROM sale_headers").fetchone()[0]
+        finally:
+            other.close()
+        delivered.append((sale, committed))
+
+    events.subscribe(SALE_RECORDED, on_sale)
+    yield delivered
+    events.unsubscribe(SALE_RECORDED, on_sale)
+
+
+def basket(*lines):
+    result = Basket()
+    for line in lines:
+        result.add(*line)
+    return result
+
+
+def counts():
+    with connection() as conn:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sale_headers", "sale_lines", "customers")
+        }
+
+
+def test_basket_commits_header_lines_stock_and_numbers_together(recorded):
+    sale = record_basket(basket(("PMS", 100, 180), ("AGO", 50, 170), ("PMS", 20, 180)), "2024-05-01", "Acme")
+
+    with connection() as conn:
+        header = conn.execute(
+            "SELECT invoice_number, delivery_note_number, customer_id, total, line_count FROM sale_headers WHERE id = ?",
+            (sale['id'],),
+        ).fetchone()
+        lines = conn.execute(
+            "SELECT product, quantity, invoice_number, delivery_note_number, customer_id FROM sale_lines "
+            "WHERE header_id = ? ORDER BY id",
+            (sale['id'],),
+        ).fetchall()
+        customer_id = conn.execute("SELECT id FROM customers WHERE name = 'Acme'").fetchone()[0]
+
+    numbers = (sale['invoice_number'], sale['delivery_note_number'])
+    assert header == (*numbers, customer_id, 100 * 180 + 50 * 170 + 20 * 180, 3)
+    assert lines == [
+        ("PMS", 100, *numbers, customer_id),
+        ("AGO", 50, *numbers, customer_id),
+        ("PMS", 20, *numbers, customer_id),
+    ]
+    levels = get_current_stock_levels()
+    assert (levels["PMS"], levels["AGO"]) == (880, 450)
+    assert [item['product'] for item in sale['items']] == ["PMS", "AGO", "PMS"]
+
+    following = record_sale("AGO", 10, 170, "2024-05-01", "Acme")
+    assert (following['invoice_number'], following['delivery_note_number']) == (numbers[0] + 1, numbers[1] + 1)
+
+
+def test_failing_line_rolls_back_the_whole_basket(recorded):
+    first = record_sale("PMS", 10, 180, "2024-05-01", "Acme")
+    recorded.clear()
+    before, levels = counts(), get_current_stock_levels()
+
+    with pytest.raises(ValueError):
+        record_basket(basket(("PMS", 100, 180), ("Kerosene", 10, 120)), "2024-05-01", "New Customer")
+
+    assert counts() == before
+    assert get_current_stock_levels() == levels
+    assert recorded == []
+
+    # Neither number was used up by the failed basket.
+    following = record_sale("PMS", 10, 180, "2024-05-01", "Acme")
+    assert (following['invoice_number'], following['delivery_note_number']) == (
+        first['invoice_number'] + 1, first['delivery_note_number'] + 1
+    )
+
+
+def test_sale_recorded_is_published_after_commit(recorded):
+    sale = record_basket(basket(("PMS", 100, 180), ("AGO", 50, 170)), "2024-05-01", "Acme")
+
+    assert len(recorded) == 1
+    payload, committed = recorded[0]
+    assert payload == sale
+    # Another connection already saw the header when the event arrived.
+    assert committed == 1
+
+
+def test_empty_basket_is_refused(recorded):
+    with pytest.raises(ValueError):
+        record_basket(Basket(), "2024-05-01", "Acme")
+    assert recorded == []
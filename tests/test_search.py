@@ -0,0 +1,84 @@
+import pytest
+
+from database import connection, transaction
+from search_index import rebuild, search_customers, search_suppliers
+
+CUSTOMERS = [
+    ("Amina Wanjiru", "0722 814 100", "Nairobi"),
+    ("Brian Otieno", "0733 205 911", "Kisumu"),
+    ("Chebet Wanjala", "0711 400 321", "Eldoret"),
+    ("David Kamau", "0722 999 000", "Thika Road"),
+    ("Transwan Haulage", "0700 000 001", "Mombasa"),
+]
+
+
+@pytest.fixture
+def customers(db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO customers (name, phone, address) VALUES (?, ?, ?)", CUSTOMERS)
+    return db
+
+
+def names(rows):
+    return sorted(row[1] for row in rows)
+
+
+def search(text, limit=200):
+    with connection() as conn:
+        return search_customers(conn, text, limit)
+
+
+def test_any_fragment_of_three_characters_matches(customers):
+    assert names(search("wan")) == ["Amina Wanjiru", "Chebet Wanjala", "Transwan Haulage"]
+    assert names(search("NJIR")) == ["Amina Wanjiru"]
+    assert names(search("814")) == ["Amina Wanjiru"]
+    assert names(search("Thika")) == ["David Kamau"]
+
+
+def test_every_word_must_match(customers):
+    assert names(search("wan eldoret")) == ["Chebet Wanjala"]
+    assert names(search("0722 kam")) == ["David Kamau"]
+    assert search("wan zzz") == []
+
+
+def test_short_words_match_by_prefix(customers):
+    assert names(search("Br")) == ["Brian Otieno"]
+    assert names(search("wan Ch")) == ["Chebet Wanjala"]
+
+
+def test_empty_search_lists_customers_by_id(customers):
+    assert [row[1] for row in search("", limit=3)] == [name for name, _, _ in CUSTOMERS[:3]]
+
+
+def test_punctuation_is_searched_literally(customers):
+    assert search('0722 "814') == []
+    assert search("wan*") == []
+    assert search("(wanj)") == []
+
+
+def test_index_follows_updates_and_deletes(customers):
+    with transaction() as conn:
+        conn.execute("UPDATE customers SET name = 'Amina Achieng' WHERE name = 'Amina Wanjiru'")
+        conn.execute("DELETE FROM customers WHERE name = 'Transwan Haulage'")
+
+    assert names(search("wan")) == ["Chebet Wanjala"]
+    assert names(search("achieng")) == ["Amina Achieng"]
+
+
+def test_rebuild_keeps_results(customers):
+    before = search("wan")
+    with transaction() as conn:
+        rebuild(conn)
+    assert search("wan") == before
+
+
+def test_suppliers_are_found_by_products_supplied(db):
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO suppliers (supplier_name, contact_person, phone, email, address, products_supplied) "
+            "VALUES (?, ?, ?, '', '', ?)",
+            [("Rubis", "Jane", "0700 1", "PMS, AGO"), ("Gulf Energy", "Otieno", "0700 2", "Gas")],
+        )
+    with connection() as conn:
+        assert [row[1] for row in search_suppliers(conn, "AGO")] == ["Rubis"]
+        assert [row[1] for row in search_suppliers(conn, "otieno")] == ["Gulf Energy"]
@@ -0,0 +1,58 @@
+import pytest
+
+from database import transaction
+from sequences import INVOICE, LPO, DocumentNumberAllocator
+
+
+def take(allocator, name):
+    allocator.reserve(name)
+    with transaction() as conn:
+        return allocator.take(conn, name)
+
+
+def test_single_numbers_are_gapless_across_rollbacks(db):
+    allocator = DocumentNumberAllocator(block_size=1)
+    first = take(allocator, INVOICE)
+
+    with pytest.raises(RuntimeError):
+        with transaction() as conn:
+            allocator.take(conn, INVOICE)
+            raise RuntimeError("sale failed")
+
+    assert take(allocator, INVOICE) == first + 1
+
+
+def test_block_numbers_come_from_memory_in_order(db):
+    allocator = DocumentNumberAllocator(block_size=5, terminal_id="till-1")
+    numbers = [take(allocator, LPO) for _ in range(7)]
+
+    assert numbers == list(range(numbers[0], numbers[0] + 7))
+    with transaction() as conn:
+        blocks = conn.execute(
+            "SELECT terminal_id, first_value, last_value FROM document_number_blocks WHERE name = ? ORDER BY id",
+            (LPO,),
+        ).fetchall()
+    assert blocks == [("till-1", numbers[0], numbers[0] + 4), ("till-1", numbers[0] + 5, numbers[0] + 9)]
+
+
+def test_put_back_number_is_reused_before_the_block_continues(db):
+    allocator = DocumentNumberAllocator(block_size=5)
+    first = take(allocator, INVOICE)
+    second = take(allocator, INVOICE)
+
+    allocator.put_back(INVOICE, second)
+
+    assert take(allocator, INVOICE) == second
+    assert take(allocator, INVOICE) == second + 1
+    assert first == second - 1
+
+
+def test_terminals_get_disjoint_blocks(db):
+    till_1 = DocumentNumberAllocator(block_size=3, terminal_id="till-1")
+    till_2 = DocumentNumberAllocator(block_size=3, terminal_id="till-2")
+
+    numbers_1 = [take(till_1, INVOICE) for _ in range(4)]
+    numbers_2 = [take(till_2, INVOICE) for _ in range(4)]
+
+    assert not set(numbers_1) & set(numbers_2)
+    assert len(set(numbers_1 + numbers_2)) == 8
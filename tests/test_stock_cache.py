@@ -0,0 +1,31 @@
+import sqlite3
+
+from stock_cache import stock_cache
+from stock_manager import transfer_stock, update_stock_on_purchase, update_stock_on_sale
+
+
+def test_own_sales_are_written_through_without_reloading(db):
+    update_stock_on_purchase("PMS", 1000)
+    loaded = stock_cache.levels()
+    table = stock_cache._levels
+
+    update_stock_on_sale("PMS", 250)
+    transfer_stock("PMS", "AGO", 50)
+
+    assert stock_cache.get("PMS")[0] == 700
+    assert stock_cache.get("AGO")[0] == loaded["AGO"][0] + 50
+    assert stock_cache._levels is table
+
+
+def test_commits_from_other_connections_reload_the_table(db):
+    update_stock_on_purchase("PMS", 1000)
+    stock_cache.levels()
+    table = stock_cache._levels
+
+    other_till = sqlite3.connect(db)
+    other_till.execute("UPDATE stock SET quantity = quantity - 400 WHERE product = 'PMS'")
+    other_till.commit()
+    other_till.close()
+
+    assert stock_cache.get("PMS")[0] == 600
+    assert stock_cache._levels is not table
@@ -0,0 +1,114 @@
+import pytest
+
+import stock_manager
+from database import connection, transaction
+from stock_manager import (
+    adjust_stock, can_sell, get_current_stock_levels, get_stock_at, rebuild_balances, transfer_stock,
+    update_stock_on_purchase, update_stock_on_sale,
+)
+
+# (product, kind, quantity, created_at), in id order.
+LEDGER = [
+    ("PMS", "purchase", 1000, "2024-01-01 08:00:00"),
+    ("AGO", "purchase", 500, "2024-01-01 09:00:00"),
+    ("PMS", "sale", -200, "2024-01-02 10:00:00"),
+    ("PMS", "sale", -150, "2024-01-03 10:00:00"),
+    ("AGO", "adjustment", -20, "2024-01-03 18:00:00"),
+    ("PMS", "purchase", 400, "2024-01-04 08:00:00"),
+    ("PMS", "transfer", -50, "2024-01-05 12:00:00"),
+    ("AGO", "transfer", 50, "2024-01-05 12:00:00"),
+]
+
+
+@pytest.fixture
+def ledger(db, monkeypatch):
+    """LEDGER written straight into stock_movements, with a checkpoint every three movements."""
+    monkeypatch.setattr(stock_manager, "CHECKPOINT_INTERVAL", 3)
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO stock_movements (product, kind, quantity, created_at) VALUES (?, ?, ?, ?)", LEDGER
+        )
+    return rebuild_balances()
+
+
+def balances():
+    with connection() as conn:
+        return dict(conn.execute("SELECT product, quantity FROM stock WHERE product IN ('PMS', 'AGO')"))
+
+
+def test_rebuild_balances_sums_the_ledger(ledger):
+    assert ledger == {"PMS": 1000, "AGO": 530}
+    assert balances() == {"PMS": 1000, "AGO": 530}
+
+
+def test_rebuild_balances_writes_checkpoints(ledger):
+    with connection() as conn:
+        checkpoints = conn.execute(
+            "SELECT product, movement_id, balance, taken_at FROM stock_checkpoints ORDER BY movement_id, product"
+        ).fetchall()
+    assert checkpoints == [
+        ("AGO", 3, 500, "2024-01-02 10:00:00"),
+        ("PMS", 3, 800, "2024-01-02 10:00:00"),
+        ("AGO", 6, 480, "2024-01-04 08:00:00"),
+        ("PMS", 6, 1050, "2024-01-04 08:00:00"),
+    ]
+
+
+def test_rebuild_balances_repairs_a_drifted_balance(ledger):
+    with transaction() as conn:
+        conn.execute("UPDATE stock SET quantity = 1 WHERE product = 'PMS'")
+    assert rebuild_balances()["PMS"] == 1000
+    assert balances()["PMS"] == 1000
+    assert get_current_stock_levels()["PMS"] == 1000
+
+
+@pytest.mark.parametrize("when, pms, ago", [
+    ("2023-12-31 23:59:59", 0, 0),
+    ("2024-01-01 08:00:00", 1000, 0),
+    ("2024-01-02 10:00:00", 800, 500),      # exactly at a checkpoint
+    ("2024-01-03 12:00:00", 650, 500),      # after a checkpoint, before the next
+    ("2024-01-04 09:00:00", 1050, 480),
+    ("2030-01-01 00:00:00", 1000, 530),
+])
+def test_get_stock_at_a_point_in_time(ledger, when, pms, ago):
+    assert get_stock_at("PMS", when) == pms
+    assert get_stock_at("AGO", when) == ago
+
+
+def test_stock_changes_are_recorded_in_the_ledger(db):
+    update_stock_on_purchase("PMS", 1000)
+    update_stock_on_sale("PMS", 300)
+    adjust_stock("PMS", -5, "spillage")
+    transfer_stock("PMS", "AGO", 100)
+    update_stock_on_purchase("Diesel", 40)
+
+    with connection() as conn:
+        movements = conn.execute("SELECT product, kind, quantity, reference FROM stock_movements ORDER BY id").fetchall()
+    assert movements == [
+        ("PMS", "purchase", 1000, None),
+        ("PMS", "sale", -300, None),
+        ("PMS", "adjustment", -5, "spillage"),
+        ("PMS", "transfer", -100, None),
+        ("AGO", "transfer", 100, None),
+        ("Diesel", "purchase", 40, None),
+    ]
+    levels = get_current_stock_levels()
+    assert (levels["PMS"], levels["AGO"], levels["Diesel"]) == (595, 100, 40)
+    assert rebuild_balances() == {"PMS": 595, "AGO": 100, "Diesel": 40}
+
+
+def test_sale_of_an_untracked_product_is_refused(db):
+    with pytest.raises(ValueError):
+        update_stock_on_sale("Kerosene", 10)
+    with connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0] == 0
+
+
+def test_can_sell_keeps_stock_above_the_reorder_level(db):
+    with transaction() as conn:
+        conn.execute("UPDATE stock SET reorder_level = 100 WHERE product = 'PMS'")
+    update_stock_on_purchase("PMS", 500)
+
+    assert can_sell("PMS", 400) == (True, 500, 100)
+    assert can_sell("PMS", 401) == (False, 500, 100)
+    assert can_sell("Kerosene", 1) == (False, 0, 0)
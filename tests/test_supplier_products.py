@@ -0,0 +1,66 @@
+import pytest
+
+from database import connection, transaction
+from supplier_products import parse_products, rebuild, set_supplier_products, suppliers_for_product
+
+PRODUCTS = ["PMS", "AGO", "IK", "Gas"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    (None, []),
+    ("", []),
+    ("  ,\n ; / ", []),
+    ("PMS, AGO", ["PMS", "AGO"]),
+    ("pms/ago & ik", ["PMS", "AGO", "IK"]),
+    ("PMS and AGO;IK | gas + PMS", ["PMS", "AGO", "IK", "Gas"]),
+    ("PMS\nAGO\n\nIK", ["PMS", "AGO", "IK"]),
+    ("ago, AGO, Ago", ["AGO"]),
+    ("PMS AGO", ["PMS", "AGO"]),
+    ("PMS  AND  ik", ["PMS", "IK"]),
+    ("Lubricants, pms", ["Lubricants", "PMS"]),
+    ("Jet   A1", ["Jet A1"]),
+])
+def test_parse_products(text, expected):
+    assert parse_products(text, PRODUCTS) == expected
+
+
+def add_supplier(conn, name, products_supplied):
+    supplier_id = conn.execute(
+        "INSERT INTO suppliers (supplier_name, products_supplied) VALUES (?, ?)", (name, products_supplied)
+    ).lastrowid
+    set_supplier_products(conn, supplier_id, products_supplied)
+    return supplier_id
+
+
+def test_suppliers_for_product(db):
+    with transaction() as conn:
+        total = add_supplier(conn, "Total", "PMS, AGO")
+        add_supplier(conn, "Rubis", "ago / ik")
+        add_supplier(conn, "Astrol", "Lubricants")
+
+    with connection() as conn:
+        assert suppliers_for_product(conn, "AGO") == ["Rubis", "Total"]
+        assert suppliers_for_product(conn, "PMS") == ["Total"]
+        assert suppliers_for_product(conn, "Lubricants") == ["Astrol"]
+        assert suppliers_for_product(conn, "Gas") == []
+
+    with transaction() as conn:
+        set_supplier_products(conn, total, "Gas")
+    with connection() as conn:
+        assert suppliers_for_product(conn, "AGO") == ["Rubis"]
+        assert suppliers_for_product(conn, "Gas") == ["Total"]
+
+    with transaction() as conn:
+        conn.execute("DELETE FROM suppliers WHERE id = ?", (total,))
+    with connection() as conn:
+        assert suppliers_for_product(conn, "Gas") == []
+        assert conn.execute("SELECT COUNT(*) FROM supplier_products WHERE supplier_id = ?", (total,)).fetchone()[0] == 0
+
+
+def test_rebuild_reparses_every_supplier(db):
+    with transaction() as conn:
+        conn.execute("INSERT INTO suppliers (supplier_name, products_supplied) VALUES ('Total', 'pms & AGO')")
+        conn.execute("INSERT INTO suppliers (supplier_name, products_supplied) VALUES ('Rubis', NULL)")
+        assert rebuild(conn) == 2
+        assert suppliers_for_product(conn, "PMS") == ["Total"]
+        assert suppliers_for_product(conn, "AGO") == ["Total"]
@@ -1,14 +1,28 @@
 import sys
 import sqlite3
-import bcrypt
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import (
     QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget,
     QMessageBox, QComboBox, QFormLayout, QListWidget
 )
+from auth import hash_password
+from database import connection
+from query_executor import query_executor
 from themes import apply_gradient_theme
 
-DATABASE_NAME = "magen.db"
+USERS_SQL = "SELECT id, username, role FROM users"
+
+
+def load_users(conn):
+    return conn.execute(USERS_SQL).fetchall()
+
+
+def hash_new_user_password(conn, username, password):
+    """None if `username` is taken, else the bcrypt hash of `password` (slow: run it off the GUI thread)."""
+    if conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+        return None
+    return hash_password(password)
+
 
 class UserManager(QWidget):
     def __init__(self):
@@ -50,19 +64,16 @@ class UserManager(QWidget):
         self.setLayout(layout)
 
     def create_users_table(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
 
     def add_user(self):
         username = self.username_input.text().strip()
@@ -73,16 +84,27 @@ class UserManager(QWidget):
             QMessageBox.warning(self, "Missing Data", "Username and password are required.")
             return
 
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # The bcrypt hash takes the whole cost factor, so it runs on a query
+        # thread; insert_user() finishes on the GUI thread.
+        self.add_button.setEnabled(False)
+        self.run_query(
+            "add_user", hash_new_user_password, username, password,
+            on_result=lambda password_hash: self.insert_user(username, role, password_hash),
+            on_error=self.add_failed,
+        )
+
+    def insert_user(self, username, role, password_hash):
+        self.add_button.setEnabled(True)
+        if password_hash is None:
+            QMessageBox.warning(self, "Error", "Username already exists.")
+            return
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO users (username, password_hash, role)
-                VALUES (?, ?, ?)
-            """, (username, password_hash.decode('utf-8'), role))
-            conn.commit()
-            conn.close()
+            with connection() as conn:
+                # password is blank: older databases declare it NOT NULL.
+                conn.execute("""
+                    INSERT INTO users (username, password, password_hash, role)
+                    VALUES (?, '', ?, ?)
+                """, (username, password_hash, role))
             QMessageBox.information(self, "Success", f"User '{username}' added successfully.")
             self.username_input.clear()
             self.password_input.clear()
@@ -94,15 +116,18 @@ class UserManager(QWidget):
             print(f"General Error: {e}")
             QMessageBox.critical(self, "Error", f"Failed to add user: {e}")
 
+    def add_failed(self, error):
+        self.add_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to add user: {error}")
+
     def refresh_user_list(self):
+        self.run_query("users", load_users, on_result=self.show_users)
+
+    def show_users(self, rows):
         self.users_list.clear()
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, username, role FROM users")
-        for row in cursor.fetchall():
+        for row in rows:
             user_id, username, role = row
             self.users_list.addItem(f"{user_id}: {username} ({role})")
-        conn.close()
 
     def delete_user(self):
         selected_item = self.users_list.currentItem()
@@ -121,16 +146,27 @@ class UserManager(QWidget):
         )
         if confirm == QMessageBox.Yes:
             try:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                conn.commit()
-                conn.close()
+                with connection() as conn:
+                    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
                 QMessageBox.information(self, "Deleted", "User deleted successfully.")
                 self.refresh_user_list()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete user: {e}")
 
+    def run_query(self, name, fn, *args, on_result, on_error=None):
+        query_executor().submit(
+            (self, name), fn, *args,
+            on_result=on_result,
+            on_error=on_error or self.report_failed,
+        )
+
+    def report_failed(self, error):
+        QMessageBox.critical(self, "Database Error", f"Failed to load users:\n{error}")
+
+    def closeEvent(self, event):
+        query_executor().cancel_owner(self)
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     window = UserManager()